@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Single-task owner of the game state for the counting bot."""
+
+import asyncio
+
+
+class StateActor:
+    """
+    Runs game state commands one at a time on the event loop.
+
+    A command is a plain (synchronous) function such as
+    game_logic.commit_answer. Coroutines queue commands with call() or
+    submit() and a single task applies them in arrival order, so state is
+    only ever touched by that task: no thread locks, and the event loop
+    never blocks waiting for one. Commands must not block or await.
+    """
+
+    def __init__(self):
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        """Start processing commands (done automatically on first use)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def submit(self, fn, *args):
+        """Queue fn(*args) and return a future for its result, without waiting."""
+        self.start()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((fn, args, future))
+        return future
+
+    async def call(self, fn, *args):
+        """Run fn(*args) on the actor and return its result (or raise its error)."""
+        return await self.submit(fn, *args)
+
+    async def stop(self):
+        """Finish the queued commands, then stop."""
+        if self._task is not None and not self._task.done():
+            self._queue.put_nowait(None)
+            await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            fn, args, future = item
+            # Run even if the caller was cancelled, so queued changes are never lost
+            try:
+                result = fn(*args)
+            except Exception as e:
+                print(f"❌ Error in state command {fn.__name__}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+                continue
+            if not future.done():
+                future.set_result(result)
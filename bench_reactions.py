@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Benchmark adding reactions against a local fake of Discord's REST API.
+
+The fake server enforces the per-channel reaction rate limit (answering
+429 with retry_after like Discord) and adds a fixed latency to every
+request. The same burst of correct answers is reacted to one awaited call
+at a time, as the bot used to, and through the ReactionDispatcher with and
+without dropping cosmetic reactions.
+
+    python bench_reactions.py --messages 20 --latency 0.15
+"""
+
+import argparse
+import asyncio
+import time
+from urllib.parse import quote
+from aiohttp import web, ClientSession
+from output import ReactionDispatcher, REACTION_INTERVAL
+
+# Reactions of a correct multilingual answer: essential first, then cosmetic
+ANSWER_REACTIONS = [('✅', False), ('🔢', True), ('🇳🇱', True), ('🇩🇪', True),
+                    ('🇫🇷', True), ('🌍', True), ('🔤', True), ('🔢', True)]
+
+
+class FakeDiscord:
+    """Fake reaction endpoint with Discord's per-channel limit and a fixed latency."""
+
+    def __init__(self, latency, interval=REACTION_INTERVAL):
+        self.latency = latency
+        self.interval = interval
+        self.last_accepted = {}  # channel id -> time of the last accepted reaction
+        self.accepted = 0
+        self.rate_limited = 0
+
+    async def add_reaction(self, request):
+        channel_id = request.match_info['channel_id']
+        now = time.monotonic()
+        wait = self.last_accepted.get(channel_id, 0) + self.interval - now
+        if wait > 0:
+            self.rate_limited += 1
+            return web.json_response({'message': 'You are being rate limited.', 'retry_after': wait},
+                                     status=429)
+        self.last_accepted[channel_id] = now
+        await asyncio.sleep(self.latency)
+        self.accepted += 1
+        return web.Response(status=204)
+
+    def app(self):
+        app = web.Application()
+        app.router.add_put('/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me',
+                           self.add_reaction)
+        return app
+
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+
+class RestMessage:
+    """Message whose add_reaction calls the fake API, retrying on 429 like discord.py."""
+
+    def __init__(self, session, base_url, channel_id, message_id):
+        self.session = session
+        self.base_url = base_url
+        self.channel = FakeChannel(channel_id)
+        self.id = message_id
+
+    async def add_reaction(self, emoji):
+        url = (f"{self.base_url}/channels/{self.channel.id}/messages/{self.id}"
+               f"/reactions/{quote(emoji)}/@me")
+        while True:
+            async with self.session.put(url) as response:
+                if response.status != 429:
+                    return
+                retry_after = (await response.json())['retry_after']
+            await asyncio.sleep(retry_after)
+
+
+async def sequential(messages):
+    """The old way: await every reaction of every answer in turn."""
+    for message in messages:
+        for emoji, _ in ANSWER_REACTIONS:
+            await message.add_reaction(emoji)
+
+
+async def dispatched(messages, **options):
+    """Hand every answer's reactions to a ReactionDispatcher."""
+    dispatcher = ReactionDispatcher(**options)
+    for message in messages:
+        dispatcher.dispatch(message, ANSWER_REACTIONS)
+    await dispatcher.drain()
+    return dispatcher
+
+
+async def dispatched_all(messages):
+    """ReactionDispatcher that never drops cosmetic reactions."""
+    return await dispatched(messages, cosmetic_backlog=float('inf'))
+
+
+async def run_benchmark(args):
+    results = []
+    strategies = (('sequential', sequential), ('dispatch all', dispatched_all), ('dispatcher', dispatched))
+    for name, strategy in strategies:
+        fake = FakeDiscord(args.latency)
+        runner = web.AppRunner(fake.app())
+        await runner.setup()
+        site = web.TCPSite(runner, '127.0.0.1', 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+
+        async with ClientSession() as session:
+            messages = [RestMessage(session, f"http://127.0.0.1:{port}", channel, message_id)
+                        for message_id in range(args.messages)
+                        for channel in range(args.channels)]
+            started = time.monotonic()
+            dispatcher = await strategy(messages)
+            elapsed = time.monotonic() - started
+        await runner.cleanup()
+
+        dropped = dispatcher.dropped if dispatcher else 0
+        results.append((name, elapsed, fake.accepted, fake.rate_limited, dropped))
+
+    print(f"{len(ANSWER_REACTIONS)} reactions x {args.messages} answers x {args.channels} channel(s), "
+          f"{args.latency * 1000:.0f} ms latency")
+    print(f"{'strategy':<14}{'seconds':>8}{'reactions':>11}{'429s':>7}{'dropped':>9}{'per second':>12}")
+    for name, elapsed, accepted, rate_limited, dropped in results:
+        print(f"{name:<14}{elapsed:>8.2f}{accepted:>11}{rate_limited:>7}{dropped:>9}"
+              f"{accepted / elapsed:>12.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=10, help="answers per channel")
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--latency', type=float, default=0.15, help="seconds per request")
+    asyncio.run(run_benchmark(parser.parse_args()))
+
+
+if __name__ == '__main__':
+    main()
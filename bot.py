@@ -3,16 +3,20 @@
 """Discord bot client and message handling."""
 
 import os
+import time
 import discord
 import asyncio
-import random
-from datetime import datetime
+from collections import namedtuple
 from constants import LANGUAGE_FLAGS, ACHIEVEMENT_EMOJIS
-from parser import parse_number_with_context, parse_multiple_numbers_with_context
-from utils import (get_mistake_message, get_streak_message, check_user_timeout,
-                   apply_timeout)
+from parser import interpret_message, parse_executor, starts_with_parseable
+from utils import get_mistake_message, check_user_timeout
+from actor import StateActor
+from output import Reply, OutputStage
+from ingest import Ingest, INGEST_QUEUE_LIMIT, INGEST_CHATTER_LIMIT, INGEST_CONCURRENCY
+from commands import CommandContext, find_command, run_command, command_metrics
+from shadow import ShadowParser
+from monitor import LoopMonitor, LOOP_LAG_THRESHOLD
 import game_logic
-from game_logic import TimedLock
 
 # Load environment variables
 from dotenv import load_dotenv
@@ -22,125 +26,83 @@ load_dotenv('.env')
 TOKEN = os.getenv("TOKEN_DEV") if os.getenv("ENVIRONMENT") == "dev" else os.getenv("TOKEN_PROD")
 CHANNEL_ID = int(os.getenv("CHANNEL_DEV")) if os.getenv("ENVIRONMENT") == "dev" else int(os.getenv("CHANNEL_PROD"))
 
+# Further channels to count in (comma-separated ids, in any server). Every
+# channel has its own game, read from the database when it is first used.
+CHANNEL_IDS = {CHANNEL_ID} | {int(channel_id) for channel_id in os.getenv("COUNTING_CHANNELS", "").split(",")
+                              if channel_id.strip()}
+
+# Gateway shard of this process, set by main.py's supervisor for its
+# workers; unset means one connection for every guild
+SHARD_ID = int(os.getenv("SHARD_ID")) if os.getenv("SHARD_ID") else None
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if SHARD_ID is not None else None
+
 # Discord client setup
 intents = discord.Intents.default()
 intents.message_content = True
-client = discord.Client(intents=intents)
+client = discord.Client(intents=intents, shard_id=SHARD_ID, shard_count=SHARD_COUNT)
 
 # Bot state
 bot_ready = False
-processing_lock = asyncio.Lock()
-
-def format_leaderboard_embed():
-    """Format the leaderboard as a Discord embed."""
-    embed = discord.Embed(
-        title="📊 **COUNTING LEADERBOARD** 📊",
-        description="Top 10 performers in the counting game",
-        color=discord.Color.gold(),
-        timestamp=datetime.now()
-    )
-    
-    game_state = game_logic.get_game_state()
-    user_stats = game_state['user_stats']
-    
-    if not user_stats:
-        embed.add_field(
-            name="No Data",
-            value="No statistics available yet! Start counting!",
-            inline=False
-        )
-        return embed
-    
-    sorted_users = sorted(
-        user_stats.items(),
-        key=lambda x: (x[1]['correct'], 
-                      x[1]['correct'] / (x[1]['correct'] + x[1]['wrong']) 
-                      if (x[1]['correct'] + x[1]['wrong']) > 0 else 0),
-        reverse=True
-    )
-    
-    leaderboard_lines = []
-    for i, (_, s) in enumerate(sorted_users[:10], 1):
-        total = s['correct'] + s['wrong']
-        percentage = (s['correct'] / total * 100) if total > 0 else 0
-        leaderboard_lines.append(
-          # Temporary version without emojis
-          f"**{i}.** {s['username']} \u2022 \u2705 **{s['correct']}** \u2022 "
-          f"\u274C {s['wrong']} \u2022 {percentage:.1f}%"
-        )
-    
-    if leaderboard_lines:
-        embed.add_field(
-            name="🏆 **Rankings**",
-            value="\n".join(leaderboard_lines),
-            inline=False
-        )
-    
-    total_attempts = sum(s['correct'] + s['wrong'] for s in user_stats.values())
-    total_correct_stats = sum(s['correct'] for s in user_stats.values())
-    
-    embed.add_field(
-        name="📈 **Statistics**",
-        value=f"**Total Attempts:** {total_attempts}\n"
-              f"**Total Players:** {len(user_stats)}\n"
-              f"**Total Accuracy:** {(total_correct_stats / total_attempts * 100) if total_attempts > 0 else 0:.1f}%",
-        inline=False
-    )
-    
-    if game_state['testing_mode']:
-        embed.add_field(
-            name="🧪 **Testing Mode Active**",
-            value="Same player can answer repeatedly",
-            inline=False
-        )
-    
-    embed.set_footer(text="Keep counting! Use !stats to see this again")
-    return embed
 
+# Seconds between status reports to the supervisor (when run as a worker)
+HEARTBEAT_INTERVAL = 30
 
-def format_profile_embed(username, stats):
-    """Format user profile as a Discord embed."""
-    embed = discord.Embed(
-        title=f"📊 Profile for {username}",
-        color=discord.Color.blue(),
-        timestamp=datetime.now()
-    )
-    
-    correct = stats.get('correct', 0)
-    wrong = stats.get('wrong', 0)
-    total = correct + wrong
-    accuracy = (correct / total * 100) if total > 0 else 0
-    
-    embed.add_field(
-        name="📈 Statistics",
-        value=f"**Correct:** {correct}\n**Wrong:** {wrong}\n**Accuracy:** {accuracy:.1f}%",
-        inline=True
-    )
-    
-    embed.add_field(
-        name="🔥 Streaks",
-        value=f"**Current:** {stats.get('streak', 0)}\n**Best Ever:** {stats.get('best_streak', 0)}",
-        inline=True
-    )
-    
-    unlocked_achievements = stats.get('achievements', set())
-    if unlocked_achievements:
-        sorted_achievements = sorted(list(unlocked_achievements))
-        achievement_emojis = [ACHIEVEMENT_EMOJIS.get(ach, '') for ach in sorted_achievements]
-        embed.add_field(
-            name="🏆 Achievements",
-            value=' '.join(emoji for emoji in achievement_emojis if emoji),
-            inline=False
-        )
-    else:
-        embed.add_field(
-            name="🏆 Achievements",
-            value="No achievements unlocked yet. Keep counting!",
-            inline=False
-        )
-    
-    embed.set_footer(text="Type !profile to see your own stats.")
-    return embed
+# Times an answer is tried while its author keeps being evicted before it
+# can be judged; then it is skipped rather than stall the channel
+COMMIT_ATTEMPTS = 3
+status_queue = None
+
+# Applies changes to the user stats shared by all channels, one command at a time
+state_actor = StateActor()
+
+# Applies each channel's game changes, so channels never queue behind each other
+channel_actors = {}
+
+# Sends replies in order, outside the critical section. A non-zero window
+# (seconds) merges the announcements of answers that arrive within it.
+output = OutputStage(coalesce_window=float(os.getenv('OUTPUT_COALESCE_WINDOW', 0)))
+
+# Candidate parser engine checked against the live one on real messages
+# (see shadow.ENGINES), with divergences appended to SHADOW_PARSER_LOG
+shadow = (ShadowParser(os.getenv('SHADOW_PARSER'), log_path=os.getenv('SHADOW_PARSER_LOG'))
+          if os.getenv('SHADOW_PARSER') else None)
+
+# Measures event loop lag and captures the stack of calls that block it
+loop_monitor = LoopMonitor(threshold=float(os.getenv('LOOP_LAG_THRESHOLD', LOOP_LAG_THRESHOLD)))
+
+
+def channel_actor(channel_id):
+    """Return the StateActor of a channel's game."""
+    actor = channel_actors.get(channel_id)
+    if actor is None:
+        actor = channel_actors[channel_id] = StateActor()
+    return actor
+
+
+async def ensure_channel_active(channel_id):
+    """Read a channel's game from the database if the channel has not been used yet."""
+    if not game_logic.is_channel_active(channel_id):
+        loop = asyncio.get_event_loop()
+        # game_logic.executor runs the read after any pending writes
+        state = await loop.run_in_executor(game_logic.executor, game_logic.read_channel_state, channel_id)
+        await channel_actor(channel_id).call(game_logic.activate_channel, channel_id, state)
+
+
+async def ensure_user_loaded(user_id):
+    """
+    Fetch a user's stats from the database if they are not resident yet.
+    Returns the user's current stats, or None if they have none.
+    """
+    if not game_logic.is_user_loaded(user_id):
+        loop = asyncio.get_event_loop()
+        write = game_logic.pending_user_write(user_id)
+        if write is not None:
+            # Evicted with changes: read the row back only once they are written
+            await asyncio.wrap_future(write)
+        # Reads have their own threads, so they never queue behind the writes
+        stats = await loop.run_in_executor(game_logic.read_executor, game_logic.fetch_user_stats, user_id)
+        await state_actor.call(game_logic.install_user_stats, user_id, stats)
+    return game_logic.get_snapshot().user_stats.get(user_id)
 
 
 async def periodic_save_task():
@@ -148,336 +110,320 @@ async def periodic_save_task():
     await client.wait_until_ready()
     while not client.is_closed():
         await asyncio.sleep(300)
-        # Run save_state in a thread to avoid blocking the event loop
-        loop = asyncio.get_event_loop()
-        await loop.run_in_executor(None, game_logic.save_state)
+        # save_state only queues the writes on game_logic.executor
+        await state_actor.call(game_logic.save_state)
+        report = command_metrics.report()
+        if report:
+            print(f"📈 Command metrics:\n{report}")
+        report = ingest.report()
+        if report:
+            print(f"📥 Ingest queues:\n{report}")
+        if shadow is not None:
+            print(f"🔍 Shadow parser:\n{shadow.report()}")
+        print(f"⏱️ Event loop:\n{loop_monitor.report()}")
+
+
+def status():
+    """Health and load figures of this process, for the supervisor."""
+    queues = ingest.queues.values()
+    commands = [stats for _, stats in command_metrics]
+    return {
+        'shard': SHARD_ID,
+        'pid': os.getpid(),
+        'ready': bot_ready,
+        'latency': client.latency,
+        'channels': len(game_logic.games),
+        'users': len(game_logic.user_stats),
+        'queued': sum(queue.depth() for queue in queues),
+        'shed': sum(queue.shed for queue in queues),
+        'pending_replies': output.pending(),
+        'commands': sum(stats.count for stats in commands),
+        'command_errors': sum(stats.errors for stats in commands),
+        'loop_lag': loop_monitor.lag.max,
+        'loop_stalls': loop_monitor.slow,
+    }
+
+
+async def heartbeat_task():
+    """Background task that reports status() to the supervisor."""
+    while not client.is_closed():
+        status_queue.put(status())
+        await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+
+async def load_user_stats_task():
+    """Background task that streams all user stats in after startup."""
+    loop = asyncio.get_event_loop()
+    chunks = game_logic.stream_user_stats()
+    try:
+        while True:
+            # Each chunk is read and converted in a thread, then installed here
+            chunk = await loop.run_in_executor(None, next, chunks, None)
+            if chunk is None:
+                break
+            await state_actor.call(game_logic.install_loaded_users, chunk)
+    except Exception as e:
+        print(f"⚠️ Could not load all user stats, loading the rest on demand. Reason: {e}")
+        return
+    await state_actor.call(game_logic.finish_user_load)
 
 
 @client.event
 async def on_ready():
     """Handle bot ready event."""
     global bot_ready
-    bot_ready = True
     env_mode = os.getenv("ENVIRONMENT", "unknown")
     print(f'✅ Logged in as {client.user} (Environment: {env_mode})')
-    game_logic.load_state()
-    client.loop.create_task(periodic_save_task())
+    if bot_ready:
+        # Reconnected; the in-memory state is still current
+        return
     
+    # Counting can start as soon as the game state is in; user stats that
+    # are not streamed in yet are fetched on demand. With shards the channel
+    # is only visible to (and played by) the shard that has its guild.
     channel = client.get_channel(CHANNEL_ID)
+    loop = asyncio.get_event_loop()
+    loaded = await loop.run_in_executor(None, game_logic.read_game_state, CHANNEL_ID if channel else None)
+    await state_actor.call(game_logic.apply_game_state, loaded)
+    bot_ready = True
+    loop_monitor.start()
+    if game_logic.is_loading_users():
+        client.loop.create_task(load_user_stats_task())
+    client.loop.create_task(periodic_save_task())
+    if status_queue is not None:
+        client.loop.create_task(heartbeat_task())
+    
     if channel:
-        game_state = game_logic.get_game_state()
         await channel.send(
             f"🤖 **Questje's Counting Bot is ready!** Let's count together! "
-            f"The next number is **{game_state['next_number']}**! 🎯"
+            f"The next number is **{game_logic.get_snapshot(CHANNEL_ID).next_number}**! 🎯"
         )
         print(f'📢 Sent greeting to channel {CHANNEL_ID}')
-    else:
+    elif SHARD_ID is None:
         print(f'❌ Could not find channel with ID {CHANNEL_ID}')
 
 
-@client.event
-async def on_message(message):
-    """Handle incoming messages."""
-    if message.author == client.user or message.channel.id != CHANNEL_ID:
+def build_answer_reply(reply, author_name, content, selection, outcome):
+    """Add the reactions and announcements for a judged answer to reply."""
+    parsed_numbers, types_used, parse_method, random_info, languages, count = selection
+    
+    # Handle random info announcements
+    if random_info:
+        announcements = [f"random({int(min_v)},{int(max_v)}) = {result}" 
+                       for min_v, max_v, result in random_info]
+        if announcements:
+            reply.send(f"🎲 Random rolls: {', '.join(announcements)}")
+    
+    if parse_method == 'evaluation_timeout':
+        reply.react('🤯')
+        reply.send(
+            f"🧠 {author_name}, that calculation was too complex "
+            f"or took too long to process!"
+        )
         return
     
-    async with processing_lock:
-        game_state = game_logic.get_game_state()
-        user_stats = game_state['user_stats']
-        user_stat = user_stats.get(message.author.id, {})
+    if outcome is None:
+        print(f'🔸 Ignoring non-parseable message: "{content}"')
+        return
+    
+    if parse_method in ('single', 'multiple_consecutive'):
+        sent = f"{parsed_numbers} which {'were' if len(parsed_numbers) > 1 else 'was'}"
+    else:
+        sent = f"`{parsed_numbers[0]}` which was"
+    
+    if outcome.result == 'back_to_back':
+        reply.react('🚫')
         
-        is_timeout, remaining = check_user_timeout(user_stat)
-        if is_timeout:
-            await message.add_reaction('⏰')
-            await message.channel.send(
-                f"⏰ {message.author.display_name}, you're in timeout for {remaining} more seconds!"
+        if outcome.timed_out:
+            reply.send(
+                f"⏰ {author_name}, you're in timeout! "
+                f"30 seconds for answering back-to-back 5 times!"
             )
-            return
-        
-        content = message.content.strip()
-        
-        # Handle commands
-        if content.lower() == '!testing':
-            try:
-                with TimedLock(game_logic.SHARED_DATA_LOCK, timeout=2.0):
-                    game_logic.testing_mode = not game_logic.testing_mode
-                    status = "enabled" if game_logic.testing_mode else "disabled"
-            except TimeoutError:
-                await message.channel.send("⚠️ System is busy, please try again.")
-                return
-            await message.channel.send(f"🧪 **Testing mode {status}!**")
-            # Run save_state in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, game_logic.save_state)
-            return
-        
-        if content.lower() in ['!lb', '!stats', '!leaderboard']:
-            embed = format_leaderboard_embed()
-            await message.channel.send(embed=embed)
-            # Run save_state in executor to avoid blocking
-            loop = asyncio.get_event_loop()
-            await loop.run_in_executor(None, game_logic.save_state)
-            return
-        
-        if content.lower().startswith('!profile'):
-            parts = content.split()
-            target_user = None
-            
-            if message.mentions:
-                mentioned_user = message.mentions[0]
-                if mentioned_user.id in user_stats:
-                    target_user = (user_stats[mentioned_user.id]['username'], 
-                                 user_stats[mentioned_user.id])
-            elif len(parts) == 1:
-                if message.author.id in user_stats:
-                    target_user = (user_stats[message.author.id]['username'], 
-                                 user_stats[message.author.id])
-            else:
-                target_name = ' '.join(parts[1:]).lower().lstrip('@')
-                for uid, stats in user_stats.items():
-                    if stats['username'].lower() == target_name:
-                        target_user = (stats['username'], stats)
-                        break
-            
-            if target_user:
-                embed = format_profile_embed(target_user[0], target_user[1])
-                await message.channel.send(embed=embed)
-            else:
-                search_term = ""
-                if message.mentions:
-                    search_term = message.mentions[0].display_name
-                elif len(parts) > 1:
-                    search_term = ' '.join(parts[1:])
-                
-                if search_term:
-                    await message.channel.send(
-                        f"🤔 Couldn't find a user with stats named `{search_term}`. "
-                        f"They need to count at least once!"
-                    )
-                else:
-                    await message.channel.send(
-                        "🤔 You don't have any stats yet! Start counting to build your profile."
-                    )
-            return
-        
-        # Try parsing multiple numbers first
-        current_expected = game_state['next_number']
-        parsed_numbers, types_used, parse_method, random_info, languages, count = parse_multiple_numbers_with_context(
-            content, current_expected
-        )
+        else:
+            error_detail = f"(You sent {sent} correct, but you went twice in a row)"
+            reply.send(
+                f"⚠️ Hey {author_name}! You can't answer twice in a row. "
+                f"That counts as a wrong answer!\n"
+                f"📊 {error_detail}"
+            )
+        return
+    
+    if outcome.result == 'wrong':
+        parsed_number = parsed_numbers[0]
+        reply.react('❌')
+        pun_message = get_mistake_message(outcome.previous_stats)
         
-        # Handle random info announcements
-        if random_info:
-            announcements = [f"random({int(min_v)},{int(max_v)}) = {result}" 
-                           for min_v, max_v, result in random_info]
-            if announcements:
-                await message.channel.send(f"🎲 Random rolls: {', '.join(announcements)}")
+        # Add explanation of what went wrong
+        error_explanation = f"📊 **Mistake Details:** You sent `{parsed_number}` but we needed `{outcome.expected}`."
+        full_message = f"{pun_message}\n{error_explanation}"
+        reply.send(full_message)
         
-        if parse_method == 'evaluation_timeout':
-            await message.add_reaction('🤯')
-            await message.channel.send(
-                f"🧠 {message.author.display_name}, that calculation was too complex "
-                f"or took too long to process!"
+        if outcome.should_reset:
+            reply.send(
+                f"🪙 **Coin flip: HEADS!** 💀 The game resets! Start from **1** again!"
             )
-            return
-        
-        if parsed_numbers is not None and len(parsed_numbers) > 0:
-            try:
-                with TimedLock(game_logic.SHARED_DATA_LOCK, timeout=2.0):
-                    # Check for back-to-back answers
-                    if (game_state['last_correct_user'] == message.author.id 
-                        and not game_state['testing_mode']):
-                        
-                        violations = user_stat.get('back_to_back_violations', 0) + 1
-                        game_logic.update_user_stats(message.author.id, message.author.display_name, False)
-                        game_logic.user_stats[message.author.id]['back_to_back_violations'] = violations
-                        
-                        await message.add_reaction('🚫')
-                        
-                        if violations >= 5:
-                            game_logic.user_stats[message.author.id] = apply_timeout(
-                                game_logic.user_stats[message.author.id], 30
-                            )
-                            await message.channel.send(
-                                f"⏰ {message.author.display_name}, you're in timeout! "
-                                f"30 seconds for answering back-to-back 5 times!"
-                            )
-                        else:
-                            error_detail = f"(You sent {parsed_numbers} which {'were' if len(parsed_numbers) > 1 else 'was'} correct, but you went twice in a row)"
-                            await message.channel.send(
-                                f"⚠️ Hey {message.author.display_name}! You can't answer twice in a row. "
-                                f"That counts as a wrong answer!\n"
-                                f"📊 {error_detail}"
-                            )
-                        return
-                
-                # Process all correct consecutive numbers
-                for num in parsed_numbers:
-                    game_logic.process_correct_answer(
-                        message.author.id, message.author.display_name,
-                        num, content, types_used, parse_method, languages
-                    )
-                
-                # Add reactions
-                await message.add_reaction('✅')
-                
-                # Add special reaction for multiple numbers
-                if count > 1:
-                    await message.add_reaction('🔢')
-                
-                # Add language flag reactions for all detected languages
-                for lang in languages:
-                    if lang in LANGUAGE_FLAGS:
-                        await message.add_reaction(LANGUAGE_FLAGS[lang])
-                
-                # Check for polyglot achievement (4+ languages)
-                if len(languages) >= 4:
-                    await message.channel.send(
-                        f"🗣️ **POLYGLOT!** {message.author.display_name} just used {len(languages)} different languages in one expression! Amazing linguistic skills! 🌍"
-                    )
-                
-                # Check for multiple numbers achievement
-                if count > 1:
-                    await message.channel.send(
-                        f"🔢 **MULTIPLE!** {message.author.display_name} just answered {count} consecutive numbers at once! Impressive! 🎯"
-                    )
-                
-                # Add achievement emoji reactions based on types used
-                added_emojis = set()
-                
-                for type_used in types_used:
-                    if type_used in ACHIEVEMENT_EMOJIS and ACHIEVEMENT_EMOJIS[type_used] not in added_emojis:
-                        try:
-                            await message.add_reaction(ACHIEVEMENT_EMOJIS[type_used])
-                            added_emojis.add(ACHIEVEMENT_EMOJIS[type_used])
-                        except discord.errors.HTTPException:
-                            pass
-                
-                streak_message, new_milestone = get_streak_message(
-                    game_logic.total_correct, game_logic.last_streak_milestone
-                )
-                if streak_message:
-                    game_logic.last_streak_milestone = new_milestone
-                    await message.channel.send(streak_message)
-                
-                if count > 1:
-                    print(f'✅ Correct (Multiple x{count}): "{content}" → {parsed_numbers} by {message.author.display_name}')
-                else:
-                    print(f'✅ Correct: "{content}" → {parsed_numbers[0]} by {message.author.display_name}')
-                print(f'   Types used: {types_used}')
-                print(f'   Languages: {languages}')
-            except TimeoutError:
-                await message.channel.send("⚠️ System is busy, please try again.")
-                return
         else:
-            # Try single number parsing as fallback
-            parsed_number, types_used, parse_method, random_info, languages = parse_number_with_context(
-                content, current_expected
+            reply.send(
+                f"🪙 **Coin flip: TAILS!** 😅 Phew, the counting continues!"
             )
-            
-            if parsed_number is not None:
-                try:
-                    with TimedLock(game_logic.SHARED_DATA_LOCK, timeout=2.0):
-                        is_correct = (parsed_number == current_expected)
-                        
-                        if (is_correct and game_state['last_correct_user'] == message.author.id 
-                            and not game_state['testing_mode']):
-                            
-                            violations = user_stat.get('back_to_back_violations', 0) + 1
-                            game_logic.update_user_stats(message.author.id, message.author.display_name, False)
-                            game_logic.user_stats[message.author.id]['back_to_back_violations'] = violations
-                            
-                            await message.add_reaction('🚫')
-                            
-                            if violations >= 5:
-                                game_logic.user_stats[message.author.id] = apply_timeout(
-                                    game_logic.user_stats[message.author.id], 30
-                                )
-                                await message.channel.send(
-                                    f"⏰ {message.author.display_name}, you're in timeout! "
-                                    f"30 seconds for answering back-to-back 5 times!"
-                                )
-                            else:
-                                error_detail = f"(You sent `{parsed_number}` which was correct, but you went twice in a row)"
-                                await message.channel.send(
-                                    f"⚠️ Hey {message.author.display_name}! You can't answer twice in a row. "
-                                    f"That counts as a wrong answer!\n"
-                                    f"📊 {error_detail}"
-                                )
-                            return
-                        
-                        if is_correct:
-                            game_logic.process_correct_answer(
-                                message.author.id, message.author.display_name,
-                                parsed_number, content, types_used, parse_method, languages
-                            )
-                            
-                            await message.add_reaction('✅')
-                            
-                            for lang in languages:
-                                if lang in LANGUAGE_FLAGS:
-                                    await message.add_reaction(LANGUAGE_FLAGS[lang])
-                            
-                            if len(languages) >= 4:
-                                await message.channel.send(
-                                    f"🗣️ **POLYGLOT!** {message.author.display_name} just used {len(languages)} different languages in one expression! Amazing linguistic skills! 🌍"
-                                )
-                            
-                            added_emojis = set()
-                            
-                            for type_used in types_used:
-                                if type_used in ACHIEVEMENT_EMOJIS and ACHIEVEMENT_EMOJIS[type_used] not in added_emojis:
-                                    try:
-                                        await message.add_reaction(ACHIEVEMENT_EMOJIS[type_used])
-                                        added_emojis.add(ACHIEVEMENT_EMOJIS[type_used])
-                                    except discord.errors.HTTPException:
-                                        pass
-                            
-                            streak_message, new_milestone = get_streak_message(
-                                game_logic.total_correct, game_logic.last_streak_milestone
-                            )
-                            if streak_message:
-                                game_logic.last_streak_milestone = new_milestone
-                                await message.channel.send(streak_message)
-                            
-                            print(f'✅ Correct: "{content}" → {parsed_number} by {message.author.display_name}')
-                            print(f'   Types used: {types_used}')
-                            print(f'   Languages: {languages}')
-                        
-                        else:
-                            should_reset = random.choice([True, False])
-                            game_logic.process_wrong_answer(
-                                message.author.id, message.author.display_name, should_reset
-                            )
-                            
-                            await message.add_reaction('❌')
-                            pun_message = get_mistake_message(user_stat)
-                            
-                            # Add explanation of what went wrong
-                            error_explanation = f"📊 **Mistake Details:** You sent `{parsed_number}` but we needed `{current_expected}`."
-                            full_message = f"{pun_message}\n{error_explanation}"
-                            await message.channel.send(full_message)
-                            
-                            if should_reset:
-                                await message.channel.send(
-                                    f"🪙 **Coin flip: HEADS!** 💀 The game resets! Start from **1** again!"
-                                )
-                            else:
-                                await message.channel.send(
-                                    f"🪙 **Coin flip: TAILS!** 😅 Phew, the counting continues!"
-                                )
-                            
-                            print(f'❌ Wrong: "{content}" → {parsed_number}, expected {current_expected} '
-                                  f'by {message.author.display_name}')
-                except TimeoutError:
-                    await message.channel.send("⚠️ System is busy, please try again.")
-                    return
-            else:
-                print(f'🔸 Ignoring non-parseable message: "{content}"')
-
-
-def run():
-    """Run the Discord bot."""
+        
+        print(f'❌ Wrong: "{content}" → {parsed_number}, expected {outcome.expected} '
+              f'by {author_name}')
+        return
+    
+    # Add reactions
+    reply.react('✅')
+    
+    # Add special reaction for multiple numbers
+    # The rest are cosmetic and may be dropped when reactions back up
+    if count > 1:
+        reply.react('🔢', cosmetic=True)
+    
+    # Add language flag reactions for all detected languages
+    for lang in languages:
+        if lang in LANGUAGE_FLAGS:
+            reply.react(LANGUAGE_FLAGS[lang], cosmetic=True)
+    
+    # Check for polyglot achievement (4+ languages)
+    if len(languages) >= 4:
+        reply.send(
+            f"🗣️ **POLYGLOT!** {author_name} just used {len(languages)} different languages in one expression! Amazing linguistic skills! 🌍"
+        )
+    
+    # Check for multiple numbers achievement
+    if count > 1:
+        reply.send(
+            f"🔢 **MULTIPLE!** {author_name} just answered {count} consecutive numbers at once! Impressive! 🎯"
+        )
+    
+    # Add achievement emoji reactions based on types used (the
+    # dispatcher skips duplicates)
+    for type_used in types_used:
+        if type_used in ACHIEVEMENT_EMOJIS:
+            reply.react(ACHIEVEMENT_EMOJIS[type_used], cosmetic=True)
+    
+    if outcome.streak_message:
+        reply.send(outcome.streak_message)
+    
+    if count > 1:
+        print(f'✅ Correct (Multiple x{count}): "{content}" → {parsed_numbers} by {author_name}')
+    else:
+        print(f'✅ Correct: "{content}" → {parsed_numbers[0]} by {author_name}')
+    print(f'   Types used: {types_used}')
+    print(f'   Languages: {languages}')
+
+
+def is_chatter(message):
+    """Return True for a message that can be neither a count nor a command."""
+    content = message.content.strip()
+    return not content.startswith('!') and not starts_with_parseable(content)
+
+
+# What prepare_message hands to commit_message: the command the message
+# invokes, or else the message interpreted without context and how many
+# seconds that took
+PreparedMessage = namedtuple('PreparedMessage', 'command parsed parse_seconds')
+
+
+def interpret_timed(content):
+    """interpret_message(), also returning the seconds it took (run in parse_executor)."""
+    started = time.perf_counter()
+    parsed = interpret_message(content)
+    return parsed, time.perf_counter() - started
+
+
+async def prepare_message(message):
+    """
+    Ingest stage run for several messages at once: interpret the message
+    and load the author's stats. Nothing here may depend on the messages
+    before it, as they may not be committed yet.
+    """
+    content = message.content.strip()
+    author = message.author
+    
+    parsed = parse_seconds = None
+    command = find_command(content)
+    if command is None:
+        loop = asyncio.get_event_loop()
+        parsed, parse_seconds = await loop.run_in_executor(parse_executor, interpret_timed, content)
+    await ensure_channel_active(message.channel.id)
+    await ensure_user_loaded(author.id)
+    state_actor.submit(game_logic.touch_user, author.id)
+    return PreparedMessage(command, parsed, parse_seconds)
+
+
+async def commit_message(message, prepared):
+    """
+    Ingest stage run one message at a time, in arrival order: check the
+    author's timeout, then run the command or judge the answer, and queue
+    the reply. Replies go out in the order the messages arrived, without
+    waiting on Discord, and every message sees the effect of the ones
+    before it (a timeout, a testing mode toggle, the count).
+    """
+    content = message.content.strip()
+    author = message.author
+    channel_id = message.channel.id
+    reply = Reply(message)
+    
+    user_stat = await ensure_user_loaded(author.id)
+    is_timeout, remaining = check_user_timeout(user_stat)
+    if is_timeout:
+        reply.react('⏰')
+        reply.send(f"⏰ {author.display_name}, you're in timeout for {remaining} more seconds!")
+        output.emit(reply)
+        return
+    
+    if prepared.command is not None:
+        ctx = CommandContext(message, content, reply, channel_actor(channel_id), ensure_user_loaded)
+        await run_command(prepared.command, ctx)
+        output.emit(reply)
+        return
+    
+    for _ in range(COMMIT_ATTEMPTS):
+        committed = await channel_actor(channel_id).call(
+            game_logic.commit_parsed, author.id, author.display_name, prepared.parsed, content, channel_id
+        )
+        if committed is not None:
+            build_answer_reply(reply, author.display_name, content, *committed)
+            output.emit(reply)
+            if shadow is not None:
+                _, outcome = committed
+                # Without an answer the game did not move on
+                expected = outcome.expected if outcome is not None else game_logic.get_snapshot(channel_id).next_number
+                shadow.observe(content, expected, prepared.parsed, prepared.parse_seconds)
+            return
+        # The author's stats were evicted while waiting; load them again
+        await ensure_user_loaded(author.id)
+    print(f"❌ Could not keep the stats of {author.display_name} loaded, skipped {content!r}")
+
+
+# Orders and bounds the work on each channel's messages
+ingest = Ingest(
+    prepare_message, commit_message, is_chatter=is_chatter,
+    limit=int(os.getenv('INGEST_QUEUE_LIMIT', INGEST_QUEUE_LIMIT)),
+    chatter_limit=int(os.getenv('INGEST_CHATTER_LIMIT', INGEST_CHATTER_LIMIT)),
+    concurrency=int(os.getenv('INGEST_CONCURRENCY', INGEST_CONCURRENCY)),
+)
+
+
+@client.event
+async def on_message(message):
+    """Handle incoming messages."""
+    if message.author == client.user or message.channel.id not in CHANNEL_IDS:
+        return
+    if not bot_ready:
+        # The game state is still loading
+        return
+    
+    if not ingest.offer(message):
+        print(f'🔸 Overloaded, dropping message {message.id} in channel {message.channel.id}')
+
+
+def run(status_to=None):
+    """Run the Discord bot; status_to is a queue for status() reports."""
+    global status_queue
+    status_queue = status_to
     env_mode = os.getenv("ENVIRONMENT", "unknown")
-    print(f'🚀 Starting Discord Counting Bot (Environment: {env_mode})...')
+    shard = f", shard {SHARD_ID}/{SHARD_COUNT}" if SHARD_ID is not None else ""
+    print(f'🚀 Starting Discord Counting Bot (Environment: {env_mode}{shard})...')
     client.run(TOKEN)
\ No newline at end of file
@@ -0,0 +1,292 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Bot commands for the counting bot.
+
+A command is the first word of a message starting with '!'. Handlers are
+registered in COMMANDS with the @command decorator and found with a
+single dict lookup, so counts never go through a chain of comparisons.
+Every run is timed in command_metrics.
+
+Read commands only look at the published snapshot and never write to the
+database. Commands that change state do so through the state actor, and
+the game_logic command queues a write of just the rows it changed.
+"""
+
+import asyncio
+import discord
+from collections import OrderedDict, namedtuple
+from datetime import datetime
+from models import achievement_emojis
+from metrics import Metrics
+import game_logic
+
+# What a command handler gets: the Discord message, its stripped text, the
+# Reply to fill in, the StateActor of the message's channel and a coroutine function that loads a
+# user's stats on demand (returning them, or None)
+CommandContext = namedtuple('CommandContext', 'message content reply actor load_user')
+
+# A registered command: its main name (used for metrics) and handler coroutine
+Command = namedtuple('Command', 'name handler')
+
+# Command word (lower case, with the '!') -> Command
+COMMANDS = {}
+
+# Calls, latency and errors of each command, by main name
+command_metrics = Metrics()
+
+# Rendered embeds, reused until what they show changes
+PROFILE_EMBED_CACHE_SIZE = 256
+_leaderboard_embed = (None, None)  # ((leaderboard version, testing mode), embed)
+_profile_embeds = OrderedDict()  # user id -> (stats record, rank, embed)
+
+
+def format_leaderboard_embed(channel_id=None):
+    """Format the leaderboard (as seen from a channel) as a Discord embed."""
+    embed = discord.Embed(
+        title="📊 **COUNTING LEADERBOARD** 📊",
+        description="Top 10 performers in the counting game",
+        color=discord.Color.gold()
+    )
+    
+    snapshot = game_logic.get_snapshot(channel_id)
+    user_stats = snapshot.user_stats
+    
+    if not user_stats:
+        embed.add_field(
+            name="No Data",
+            value="No statistics available yet! Start counting!",
+            inline=False
+        )
+        return embed
+    
+    leaderboard_lines = []
+    for i, (_, s) in enumerate(game_logic.get_leaderboard(10), 1):
+        total = s.correct + s.wrong
+        percentage = (s.correct / total * 100) if total > 0 else 0
+        leaderboard_lines.append(
+          # Temporary version without emojis
+          f"**{i}.** {s.username} \u2022 \u2705 **{s.correct}** \u2022 "
+          f"\u274C {s.wrong} \u2022 {percentage:.1f}%"
+        )
+    
+    if leaderboard_lines:
+        embed.add_field(
+            name="🏆 **Rankings**",
+            value="\n".join(leaderboard_lines),
+            inline=False
+        )
+    
+    leaderboard = game_logic.leaderboard
+    total_attempts = leaderboard.total_attempts
+    total_correct_stats = leaderboard.total_correct
+    
+    embed.add_field(
+        name="📈 **Statistics**",
+        value=f"**Total Attempts:** {total_attempts}\n"
+              f"**Total Players:** {len(leaderboard)}\n"
+              f"**Total Accuracy:** {(total_correct_stats / total_attempts * 100) if total_attempts > 0 else 0:.1f}%",
+        inline=False
+    )
+    
+    if snapshot.testing_mode:
+        embed.add_field(
+            name="🧪 **Testing Mode Active**",
+            value="Same player can answer repeatedly",
+            inline=False
+        )
+    
+    embed.set_footer(text="Keep counting! Use !stats to see this again")
+    return embed
+
+
+def format_profile_embed(username, stats, rank=None):
+    """Format user profile as a Discord embed."""
+    embed = discord.Embed(
+        title=f"📊 Profile for {username}",
+        color=discord.Color.blue()
+    )
+    
+    correct = stats.correct
+    wrong = stats.wrong
+    total = correct + wrong
+    accuracy = (correct / total * 100) if total > 0 else 0
+    
+    statistics = f"**Correct:** {correct}\n**Wrong:** {wrong}\n**Accuracy:** {accuracy:.1f}%"
+    if rank is not None:
+        statistics += f"\n**Rank:** #{rank}"
+    embed.add_field(
+        name="📈 Statistics",
+        value=statistics,
+        inline=True
+    )
+    
+    embed.add_field(
+        name="🔥 Streaks",
+        value=f"**Current:** {stats.streak}\n**Best Ever:** {stats.best_streak}",
+        inline=True
+    )
+    
+    unlocked_emojis = achievement_emojis(stats.achievements)
+    if unlocked_emojis:
+        embed.add_field(
+            name="🏆 Achievements",
+            value=unlocked_emojis,
+            inline=False
+        )
+    else:
+        embed.add_field(
+            name="🏆 Achievements",
+            value="No achievements unlocked yet. Keep counting!",
+            inline=False
+        )
+    
+    embed.set_footer(text="Type !profile to see your own stats.")
+    return embed
+
+
+def get_leaderboard_embed(channel_id=None):
+    """
+    Return the leaderboard embed, rendered again only after the leaderboard
+    changed. The rankings are shared; only the testing mode note depends
+    on the channel. Cached embeds carry no timestamp, which would go stale.
+    """
+    global _leaderboard_embed
+    key, embed = _leaderboard_embed
+    current = (game_logic.leaderboard.version, game_logic.get_snapshot(channel_id).testing_mode)
+    if key != current:
+        embed = format_leaderboard_embed(channel_id)
+        _leaderboard_embed = (current, embed)
+    return embed
+
+
+def get_profile_embed(user_id, stats):
+    """
+    Return a user's profile embed, rendered again only when their stats or
+    rank changed (stats records are replaced on every update, never mutated).
+    """
+    rank = game_logic.get_user_rank(user_id)
+    cached = _profile_embeds.get(user_id)
+    if cached is not None and cached[0] is stats and cached[1] == rank:
+        _profile_embeds.move_to_end(user_id)
+        return cached[2]
+    
+    embed = format_profile_embed(stats.username, stats, rank)
+    _profile_embeds[user_id] = (stats, rank, embed)
+    if len(_profile_embeds) > PROFILE_EMBED_CACHE_SIZE:
+        _profile_embeds.popitem(last=False)
+    return embed
+
+
+def command(name, *aliases):
+    """Register the decorated handler coroutine as !name (and its aliases)."""
+    def register(handler):
+        entry = Command(name, handler)
+        for word in (name,) + aliases:
+            COMMANDS[word] = entry
+        return handler
+    return register
+
+
+def find_command(content):
+    """Return the Command a message invokes, or None (e.g. for a count)."""
+    if not content.startswith('!'):
+        return None
+    return COMMANDS.get(content.split(None, 1)[0].lower())
+
+
+async def run_command(entry, ctx):
+    """Run a command's handler, recording its latency and any error."""
+    with command_metrics.time(entry.name):
+        await entry.handler(ctx)
+
+
+@command('!testing')
+async def toggle_testing(ctx):
+    """!testing: flip the channel's testing mode (only its game state row is written)."""
+    enabled = await ctx.actor.call(game_logic.toggle_testing_mode, ctx.message.channel.id)
+    status = "enabled" if enabled else "disabled"
+    ctx.reply.send(f"🧪 **Testing mode {status}!**")
+
+
+@command('!lb', '!stats', '!leaderboard')
+async def show_leaderboard(ctx):
+    """!lb, !stats, !leaderboard: show the top 10."""
+    ctx.reply.send(embed=get_leaderboard_embed(ctx.message.channel.id))
+
+
+@command('!who')
+async def who_counted(ctx):
+    """!who <number>: show who counted a number in this channel and when."""
+    parts = ctx.content.split()
+    if len(parts) != 2 or not parts[1].isdigit():
+        ctx.reply.send("🤔 Usage: `!who <number>`")
+        return
+    
+    number = int(parts[1])
+    record = game_logic.find_count(number, ctx.message.channel.id)
+    if record is None:
+        ctx.reply.send(f"🤔 I have no record of who counted **{number}**.")
+    else:
+        counter_stats = await ctx.load_user(record.user_id)
+        counter = counter_stats.username if counter_stats else "an unknown player"
+        when = datetime.fromtimestamp(record.timestamp).strftime('%Y-%m-%d %H:%M')
+        ctx.reply.send(f"🔎 **{number}** was counted by **{counter}** on {when}.")
+
+
+@command('!profile')
+async def show_profile(ctx):
+    """!profile [name or mention]: show a user's stats."""
+    parts = ctx.content.split()
+    target_id = target_stats = None
+    
+    if ctx.message.mentions:
+        target_id = ctx.message.mentions[0].id
+        target_stats = await ctx.load_user(target_id)
+    elif len(parts) == 1:
+        target_id = ctx.message.author.id
+        target_stats = game_logic.get_snapshot().user_stats.get(target_id)
+    else:
+        target_name = ' '.join(parts[1:]).lstrip('@')
+        target_id = game_logic.find_user_by_name(target_name)
+        if target_id is not None:
+            target_stats = game_logic.get_snapshot().user_stats.get(target_id)
+        elif not game_logic.users_fully_loaded():
+            # Not resident; ask the database who it is, then load them
+            loop = asyncio.get_event_loop()
+            found_id = await loop.run_in_executor(
+                game_logic.read_executor, game_logic.fetch_user_id_by_name, target_name
+            )
+            if found_id is not None:
+                target_id = found_id
+                target_stats = await ctx.load_user(found_id)
+
+    if target_stats is not None:
+        embed = get_profile_embed(target_id, target_stats)
+        ctx.reply.send(embed=embed)
+    else:
+        search_term = ""
+        if ctx.message.mentions:
+            search_term = ctx.message.mentions[0].display_name
+        elif len(parts) > 1:
+            search_term = ' '.join(parts[1:])
+
+        suggestions = []
+        if not ctx.message.mentions and search_term:
+            suggestions = game_logic.suggest_usernames(search_term.lstrip('@'))
+
+        if suggestions:
+            ctx.reply.send(
+                f"🤔 Couldn't find a user with stats named `{search_term}`. "
+                f"Did you mean: {', '.join(f'`{name}`' for name in suggestions)}?"
+            )
+        elif search_term:
+            ctx.reply.send(
+                f"🤔 Couldn't find a user with stats named `{search_term}`. "
+                f"They need to count at least once!"
+            )
+        else:
+            ctx.reply.send(
+                "🤔 You don't have any stats yet! Start counting to build your profile."
+            )
+
@@ -39,6 +39,30 @@ ACHIEVEMENT_EMOJIS = {
     'multiple': '🔢',
 }
 
+# Stable bit positions for achievements, persisted in user_stats.achievement_bits.
+# Never renumber or reuse a position; give new achievements the next free bit.
+ACHIEVEMENT_BIT_POSITIONS = {
+    'en': 0, 'nl': 1, 'fr': 2, 'de': 3, 'se': 4, 'tr': 5, 'dk': 6, 'cy': 7,
+    'es': 8, 'no': 9, 'ja': 10, 'la': 11,
+    'math': 12, 'factorial': 13, 'constants': 14, 'sqrt': 15, 'random': 16,
+    'decimal': 17, 'polyglot': 18, 'text': 19, 'multiple': 20,
+    # Input types without an emoji
+    'integer': 21, 'roman': 22, 'multilang': 23,
+}
+ACHIEVEMENT_BITS = {key: 1 << bit for key, bit in ACHIEVEMENT_BIT_POSITIONS.items()}
+
+# Stable codes for parse methods stored in the count history (index = code).
+# Append new methods at the end; unknown methods are stored as 'unknown'.
+PARSE_METHODS = [
+    'unknown', 'simple_integer', 'simple_decimal', 'single', 'multiple_consecutive',
+    'context_match_written', 'context_match_hyphenated_math', 'context_match_math_expression',
+    'context_match_factorial_math', 'context_match_extracted', 'context_match_constant',
+    'context_match_multilang', 'context_match_roman',
+    'priority_written', 'priority_hyphenated_math', 'priority_math_expression',
+    'priority_factorial_math', 'priority_constant', 'priority_extracted', 'priority_multilang',
+    'fallback_roman',
+]
+
 # Language flags
 LANGUAGE_FLAGS = {
     'nl': '🇳🇱',
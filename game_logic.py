@@ -4,13 +4,20 @@
 
 import os
 import json
-import threading
+import random
 import time
+from collections import namedtuple, deque, OrderedDict
 from datetime import datetime
+from types import MappingProxyType
 from dotenv import load_dotenv
 import pymysql
 from pymysql.cursors import DictCursor
 import concurrent.futures
+from utils import apply_timeout, get_streak_message
+from indexes import LeaderboardIndex, UsernameIndex
+from models import UserStats, HistoryRecord, achievements_to_mask
+from history import HistoryWriter, HistoryFile
+from constants import ACHIEVEMENT_BITS
 
 # Load environment variables
 load_dotenv('.env')
@@ -26,6 +33,30 @@ DB_CONFIG = {
     'cursorclass': DictCursor
 }
 
+# Number of recent counts kept in memory
+HISTORY_CAPACITY = int(os.getenv('HISTORY_CAPACITY', 1000))
+
+# Optional directory for the local fixed-width history file (disabled if unset)
+HISTORY_FILE_DIR = os.getenv('HISTORY_FILE_DIR')
+
+# Maximum number of users kept in memory. 0 loads every user at startup;
+# otherwise users are loaded on first access and least recently used ones
+# are written back and evicted.
+USER_CACHE_SIZE = int(os.getenv('USER_CACHE_SIZE', 0))
+
+# Users per chunk when streaming all user stats at startup, and how often
+# (in seconds) to report progress
+LOAD_CHUNK_SIZE = int(os.getenv('LOAD_CHUNK_SIZE', 5000))
+LOAD_PROGRESS_INTERVAL = 5.0
+
+# Leaderboard entries shown, always kept resident (and prefetched) in lazy mode
+LEADERBOARD_SIZE = 10
+
+# The pinned leaderboard top would leave no room for anybody else
+if 0 < USER_CACHE_SIZE <= LEADERBOARD_SIZE:
+    raise ValueError(f"USER_CACHE_SIZE must be 0 or above LEADERBOARD_SIZE ({LEADERBOARD_SIZE}), "
+                     f"not {USER_CACHE_SIZE}")
+
 # Check if we're in development mode (be defensive if ENVIRONMENT is not set)
 _env_val = os.getenv('ENVIRONMENT', '')
 IS_DEV_MODE = _env_val.lower() in ('dev', 'development', 'local')
@@ -33,36 +64,204 @@ IS_DEV_MODE = _env_val.lower() in ('dev', 'development', 'local')
 if IS_DEV_MODE:
     print("⚠️  DEVELOPMENT MODE - Database writes are DISABLED")
 
-# State variables (cache)
-next_number = 1
-user_stats = {}
-number_history = []
-last_correct_user = None
-last_streak_milestone = 0
-total_correct = 0
-testing_mode = False
-
-# Thread safety
-SHARED_DATA_LOCK = threading.RLock()  # Use RLock to allow recursive locking
+# Channel whose game is used when no channel is given. It is the channel of
+# the single-channel bot, so it inherits the legacy game_state row (id = 1)
+# and the history file at the root of HISTORY_FILE_DIR.
+DEFAULT_CHANNEL_ID = int(os.getenv('CHANNEL_DEV' if IS_DEV_MODE else 'CHANNEL_PROD') or 0)
+
+# User stats are shared by every channel (one profile per user)
+user_stats = OrderedDict()  # Least recently used first
+
+# Leaderboard order and running totals, maintained as user stats change
+leaderboard = LeaderboardIndex()
+usernames = UsernameIndex()
+
+# Counts not written to the database yet, by user id: [correct, wrong,
+# back_to_back_violations]. Writes add these to the stored counts rather
+# than overwrite them, so shards counting for the same user do not lose
+# each other's answers. A shard's in-memory stats still miss the other
+# shards' answers: they are read only at startup, or again after an
+# eviction in lazy mode (see main.SHARD_COUNT).
+_unsaved_counts = {}
+
+# User stats writes that failed, as (user_id, row, counts): appended by the
+# database thread, handed back to _unsaved_counts by the next user write or
+# save_state() (see _requeue_failed_user_writes) rather than lost
+_failed_user_writes = deque()
+
+# Users known not to have stats in the database yet (lazy mode)
+_missing_users = set()
+MISSING_USERS_LIMIT = 1024
+
+# True while user stats are still being streamed in after apply_game_state()
+_loading_users = False
+
+# Read-only view of user_stats handed out with snapshots. It is live: it
+# always shows the current records, whatever the snapshot's version. The
+# records themselves are replaced rather than mutated once published.
+_user_stats_view = MappingProxyType(user_stats)
+
+# Active channel games by channel id, loaded when a channel is first used
+games = {}
+
+# Bumped by every published change, in any channel or to any user
+_version = 0
+
+# Time of history records and timeouts; replay.py sets the log's clock
+clock = time.time
+
+# The state above is owned by the event loop: once the bot runs, mutate it
+# only through commands run by state actors (see actor.py), never from
+# other threads. Commands are synchronous, so commands queued on different
+# actors (one per channel) never interleave. Database writes run on this
+# executor, in submission order.
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
 
+# On-demand reads of user stats, which must not wait behind the write
+# backlog on executor
+read_executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
 
-class TimedLock:
-    """Context manager for acquiring locks with timeout."""
-    def __init__(self, lock, timeout=5.0):
-        self.lock = lock
-        self.timeout = timeout
-        self.acquired = False
-    
-    def __enter__(self):
-        self.acquired = self.lock.acquire(timeout=self.timeout)
-        if not self.acquired:
-            raise TimeoutError(f"Could not acquire lock within {self.timeout} seconds")
-        return self
-    
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        if self.acquired:
-            self.lock.release()
+# Futures of the user stats writes queued in lazy mode, by user id, so an
+# evicted user is not read back before their last write has landed
+_user_writes = {}
+
+
+GameSnapshot = namedtuple('GameSnapshot', [
+    'version',
+    'next_number',
+    'last_correct_user',
+    'total_correct',
+    'last_streak_milestone',
+    'testing_mode',
+    'user_stats',
+])
+GameSnapshot.__doc__ = """Versioned view of a channel's game state.
+
+A new snapshot is swapped in after every mutation, so the game fields of a
+snapshot a reader fetched stay as they were, without copying anything.
+``user_stats`` is not frozen with them: it is a live read-only mapping of the
+current records (with USER_CACHE_SIZE set, of the resident users), so users
+changed or evicted after the snapshot show up changed or missing. Records
+are replaced, never mutated, once published: look a user up once and keep
+the record for a stable view of that user.
+"""
+
+
+
+class ChannelGame:
+    """The counting game of one channel; change it only through game_logic commands."""
+
+    __slots__ = ('channel_id', 'next_number', 'last_correct_user', 'total_correct',
+                 'last_streak_milestone', 'testing_mode', 'history', 'history_file', 'snapshot')
+
+    def __init__(self, channel_id, state=None):
+        self.channel_id = channel_id
+        self.next_number = 1
+        self.last_correct_user = None
+        self.total_correct = 0
+        self.last_streak_milestone = 0
+        self.testing_mode = False
+        if state:
+            self.next_number = state['next_number']
+            self.last_correct_user = state['last_correct_user']
+            self.total_correct = state['total_correct']
+            self.last_streak_milestone = state['last_streak_milestone']
+            self.testing_mode = state['testing_mode']
+        self.history = deque(maxlen=HISTORY_CAPACITY)  # HistoryRecord ring buffer, oldest first
+        self.history_file = None
+        if HISTORY_FILE_DIR:
+            directory = HISTORY_FILE_DIR
+            if channel_id != DEFAULT_CHANNEL_ID:
+                directory = os.path.join(HISTORY_FILE_DIR, f'channel-{channel_id}')
+            self.history_file = HistoryFile(directory)
+        self.snapshot = None
+        self.publish()
+
+    def publish(self):
+        """Atomically swap in a snapshot reflecting the game's current state."""
+        self.snapshot = GameSnapshot(
+            _bump_version(),
+            self.next_number,
+            self.last_correct_user,
+            self.total_correct,
+            self.last_streak_milestone,
+            self.testing_mode,
+            _user_stats_view,
+        )
+
+
+def _bump_version():
+    global _version
+    _version += 1
+    return _version
+
+
+def _game(channel_id=None):
+    """Return a channel's game, starting a fresh one if it is not active."""
+    if channel_id is None:
+        channel_id = DEFAULT_CHANNEL_ID
+    game = games.get(channel_id)
+    if game is None:
+        game = games[channel_id] = ChannelGame(channel_id)
+    return game
+
+
+def _publish_snapshot(game=None):
+    """Publish a change: to a channel's game, or (game None) to user stats only."""
+    if game is not None:
+        game.publish()
+    else:
+        _bump_version()
+
+
+def get_snapshot(channel_id=None):
+    """
+    Return the current snapshot of a channel's game (no locking or copying).
+    An inactive channel gets a snapshot of a new game without activating it,
+    so reading never makes this process save a game it does not play.
+    """
+    game = games.get(DEFAULT_CHANNEL_ID if channel_id is None else channel_id)
+    if game is None:
+        return GameSnapshot(_version, 1, None, 0, 0, False, _user_stats_view)
+    return game.snapshot
+
+
+def get_leaderboard(limit=LEADERBOARD_SIZE):
+    """Return [(user_id, stats), ...] for the top users in leaderboard order."""
+    # The top LEADERBOARD_SIZE users are never evicted, but skip anyone who is
+    # not resident rather than block on the database here.
+    return [(uid, user_stats[uid]) for uid in leaderboard.top(limit) if uid in user_stats]
+
+
+def get_user_rank(user_id):
+    """
+    Return the 1-based leaderboard rank of a user, or None. Ranks are not
+    known (None) while some players are only counted in the totals, as
+    they are in lazy mode until every player has been loaded.
+    """
+    if leaderboard.untracked:
+        return None
+    return leaderboard.rank(user_id)
+
+
+def find_user_by_name(name):
+    """
+    Return the id of the user currently named name (case-insensitive), or None.
+    If several users share the name, the best ranked one wins.
+    """
+    user_ids = usernames.lookup(name)
+    if not user_ids:
+        return None
+    return min(user_ids, key=leaderboard.rank)
+
+
+def suggest_usernames(prefix, limit=5):
+    """Return up to limit display names starting with prefix (case-insensitive)."""
+    suggestions = []
+    for name in usernames.search_prefix(prefix, limit):
+        user_id = find_user_by_name(name)
+        suggestions.append(user_stats[user_id].username)
+    return suggestions
 
 
 def get_db_connection():
@@ -74,8 +273,11 @@ def get_db_connection():
         raise
 
 
-def _write_game_state_to_db(game_state_copy):
-    """Write game state to database (run in thread to avoid blocking)."""
+# Streams every accepted and rejected count into the count_history table
+history_writer = None if IS_DEV_MODE else HistoryWriter(get_db_connection)
+
+def _write_game_state_to_db(channel_id, game_state_copy):
+    """Write a channel's game state to database (run in thread to avoid blocking)."""
     if IS_DEV_MODE:
         print(f"🔧 DEV MODE: Skipping game state save to database")
         return
@@ -84,14 +286,18 @@ def _write_game_state_to_db(game_state_copy):
         conn = get_db_connection()
         with conn.cursor() as cursor:
             cursor.execute("""
-                UPDATE game_state 
-                SET next_number = %s,
-                    last_correct_user = %s,
-                    total_correct = %s,
-                    last_streak_milestone = %s,
-                    testing_mode = %s
-                WHERE id = 1
+                INSERT INTO game_state
+                (channel_id, next_number, last_correct_user, total_correct,
+                 last_streak_milestone, testing_mode)
+                VALUES (%s, %s, %s, %s, %s, %s)
+                ON DUPLICATE KEY UPDATE
+                    next_number = VALUES(next_number),
+                    last_correct_user = VALUES(last_correct_user),
+                    total_correct = VALUES(total_correct),
+                    last_streak_milestone = VALUES(last_streak_milestone),
+                    testing_mode = VALUES(testing_mode)
             """, (
+                channel_id,
                 game_state_copy['next_number'],
                 game_state_copy['last_correct_user'],
                 game_state_copy['total_correct'],
@@ -100,52 +306,254 @@ def _write_game_state_to_db(game_state_copy):
             ))
             conn.commit()
         conn.close()
-        print(f"💾 Game state saved to database at {datetime.now().isoformat()}")
+        print(f"💾 Game state of channel {channel_id} saved to database at {datetime.now().isoformat()}")
     except Exception as e:
         print(f"❌ Error saving game state to database: {e}")
 
 
-def _write_user_stats_to_db(user_id, stats):
-    """Write user stats to database (run in thread to avoid blocking)."""
+# user_stats columns in UserStats constructor order, for tuple cursors
+USER_STATS_COLUMNS = ("user_id, username, correct, wrong, streak, best_streak, achievement_bits, "
+                      "consecutive_wrong, back_to_back_violations, timeout_until")
+
+
+def _write_user_stats_to_db(user_id, row, counts):
+    """
+    Write packed user stats (UserStats.pack()) to database (run in thread to
+    avoid blocking). An existing row gets the unsaved counts (see
+    _unsaved_counts) added, keeps its best streak, achievements and timeout
+    if they are higher, and takes the rest from row.
+    """
     if IS_DEV_MODE:
         print(f"🔧 DEV MODE: Skipping user stats save for user {user_id}")
         return
     
+    (username, correct, wrong, streak, best_streak, achievements,
+     consecutive_wrong, back_to_back_violations, timeout_until) = row
+    added_correct, added_wrong, added_violations = counts
+    
     try:
         conn = get_db_connection()
         with conn.cursor() as cursor:
-            achievements_json = json.dumps(list(stats.get('achievements', set())))
             cursor.execute("""
                 INSERT INTO user_stats 
                 (user_id, username, correct, wrong, streak, best_streak, 
-                 achievements, consecutive_wrong, back_to_back_violations, timeout_until)
+                 achievement_bits, consecutive_wrong, back_to_back_violations, timeout_until)
                 VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 ON DUPLICATE KEY UPDATE
                     username = VALUES(username),
-                    correct = VALUES(correct),
-                    wrong = VALUES(wrong),
+                    correct = correct + %s,
+                    wrong = wrong + %s,
                     streak = VALUES(streak),
-                    best_streak = VALUES(best_streak),
-                    achievements = VALUES(achievements),
+                    best_streak = GREATEST(best_streak, VALUES(best_streak)),
+                    achievement_bits = achievement_bits | VALUES(achievement_bits),
                     consecutive_wrong = VALUES(consecutive_wrong),
-                    back_to_back_violations = VALUES(back_to_back_violations),
-                    timeout_until = VALUES(timeout_until)
+                    back_to_back_violations = back_to_back_violations + %s,
+                    timeout_until = GREATEST(timeout_until, VALUES(timeout_until))
             """, (
                 user_id,
-                stats.get('username', ''),
-                stats.get('correct', 0),
-                stats.get('wrong', 0),
-                stats.get('streak', 0),
-                stats.get('best_streak', 0),
-                achievements_json,
-                stats.get('consecutive_wrong', 0),
-                stats.get('back_to_back_violations', 0),
-                stats.get('timeout_until', 0)
+                username,
+                correct,
+                wrong,
+                streak,
+                best_streak,
+                achievements,
+                consecutive_wrong,
+                back_to_back_violations,
+                timeout_until,
+                added_correct,
+                added_wrong,
+                added_violations
             ))
             conn.commit()
         conn.close()
     except Exception as e:
-        print(f"❌ Error saving user stats to database: {e}")
+        _failed_user_writes.append((user_id, row, counts))
+        print(f"❌ Error saving user stats to database, will retry: {e}")
+
+
+def _requeue_failed_user_writes():
+    """
+    Add the counts of failed user writes to _unsaved_counts again, so the
+    next write carries them. A user evicted meanwhile gets the failed record
+    written again.
+    """
+    while _failed_user_writes:
+        user_id, row, counts = _failed_user_writes.popleft()
+        if user_id in user_stats:
+            unsaved = _unsaved_counts.setdefault(user_id, [0, 0, 0])
+            for index, count in enumerate(counts):
+                unsaved[index] += count
+        else:
+            write = executor.submit(_write_user_stats_to_db, user_id, row, counts)
+            if USER_CACHE_SIZE:
+                _user_writes[user_id] = write
+
+
+def _game_state_row(snapshot):
+    """Extract the persisted game state fields from a snapshot."""
+    return {
+        'next_number': snapshot.next_number,
+        'last_correct_user': snapshot.last_correct_user,
+        'total_correct': snapshot.total_correct,
+        'last_streak_milestone': snapshot.last_streak_milestone,
+        'testing_mode': snapshot.testing_mode,
+    }
+
+
+def migrate_game_state_channels(conn):
+    """
+    Key the game_state table by channel: add a unique `channel_id` column
+    and give the legacy single row (id = 1) to DEFAULT_CHANNEL_ID. Safe to
+    run on every start; it does nothing once the migration is done.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'game_state'
+        """)
+        columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+        if 'channel_id' in columns:
+            return
+        
+        cursor.execute("""
+            ALTER TABLE game_state
+                MODIFY id INT NOT NULL AUTO_INCREMENT,
+                ADD COLUMN channel_id BIGINT NULL,
+                ADD UNIQUE KEY uq_game_state_channel (channel_id)
+        """)
+        cursor.execute("UPDATE game_state SET channel_id = %s WHERE id = 1", (DEFAULT_CHANNEL_ID,))
+        conn.commit()
+        print(f"✅ Migrated game_state to one row per channel (id 1 is channel {DEFAULT_CHANNEL_ID}).")
+
+
+def migrate_count_history_channels(conn):
+    """
+    Add a `channel_id` column to count_history, indexed with `number`, and
+    give the rows written before it to DEFAULT_CHANNEL_ID. Safe to run on
+    every start; it does nothing once the migration is done or while the
+    table does not exist (HistoryWriter creates it with the column).
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COLUMN_NAME FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'count_history'
+        """)
+        columns = {row['COLUMN_NAME'] for row in cursor.fetchall()}
+        if not columns or 'channel_id' in columns:
+            return
+        
+        cursor.execute(f"""
+            ALTER TABLE count_history
+                ADD COLUMN channel_id BIGINT NOT NULL DEFAULT {int(DEFAULT_CHANNEL_ID)} AFTER id,
+                ADD INDEX idx_count_history_channel_number (channel_id, number),
+                DROP INDEX idx_count_history_number
+        """)
+        cursor.execute("ALTER TABLE count_history ALTER COLUMN channel_id DROP DEFAULT")
+        conn.commit()
+        print(f"✅ Migrated count_history to per channel rows (earlier rows are channel {DEFAULT_CHANNEL_ID}).")
+
+
+def _read_channel_row(conn, channel_id):
+    """Return a channel's persisted game state as a dict, or None."""
+    with conn.cursor() as cursor:
+        cursor.execute("SELECT * FROM game_state WHERE channel_id = %s", (channel_id,))
+        game_state = cursor.fetchone()
+    if not game_state:
+        return None
+    return {
+        'next_number': game_state['next_number'],
+        'last_correct_user': game_state['last_correct_user'],
+        'total_correct': game_state['total_correct'],
+        'last_streak_milestone': game_state['last_streak_milestone'],
+        'testing_mode': bool(game_state['testing_mode'])
+    }
+
+
+def migrate_achievements_column(conn):
+    """
+    Move achievements from the legacy JSON `achievements` column to the
+    `achievement_bits` BIGINT column (bit positions from ACHIEVEMENT_BITS).
+
+    The JSON column is kept, renamed to `achievements_legacy`, and only once
+    every row converted cleanly. If a row cannot be parsed or holds keys
+    without a bit, those rows are logged and the column stays as it is, so
+    the migration runs again (harmlessly) on the next start. Either way the
+    JSON column is made nullable, as new rows are written without it. Safe
+    to run on every start; it does nothing once the migration is done.
+    """
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE FROM information_schema.COLUMNS
+            WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'user_stats'
+        """)
+        columns = {row['COLUMN_NAME']: row for row in cursor.fetchall()}
+        
+        if 'achievement_bits' not in columns:
+            cursor.execute("ALTER TABLE user_stats ADD COLUMN achievement_bits BIGINT NOT NULL DEFAULT 0")
+        
+        for legacy in ('achievements', 'achievements_legacy'):
+            column = columns.get(legacy)
+            if column is not None and column['IS_NULLABLE'] == 'NO':
+                cursor.execute(f"ALTER TABLE user_stats MODIFY COLUMN {legacy} {column['COLUMN_TYPE']} NULL")
+                print(f"✅ Made the {legacy} column nullable.")
+        
+        if 'achievements' not in columns:
+            return
+        
+        cursor.execute("SELECT user_id, achievements FROM user_stats WHERE achievements IS NOT NULL")
+        updates = []
+        problems = []
+        for row in cursor.fetchall():
+            try:
+                keys = json.loads(row['achievements']) or []
+                if not isinstance(keys, list):
+                    raise TypeError(f"expected a list, got {type(keys).__name__}")
+                unknown = sorted(str(key) for key in keys if key not in ACHIEVEMENT_BITS)
+            except (ValueError, TypeError) as e:
+                problems.append((row['user_id'], f"unreadable achievements {row['achievements']!r}: {e}"))
+                continue
+            if unknown:
+                problems.append((row['user_id'], f"unknown achievements {', '.join(unknown)}"))
+            mask = achievements_to_mask(key for key in keys if key in ACHIEVEMENT_BITS)
+            if mask:
+                updates.append((mask, row['user_id']))
+        
+        if updates:
+            cursor.executemany(
+                "UPDATE user_stats SET achievement_bits = achievement_bits | %s WHERE user_id = %s",
+                updates
+            )
+        conn.commit()
+        print(f"✅ Migrated achievements of {len(updates)} users to achievement_bits.")
+        
+        if problems:
+            for user_id, problem in problems:
+                print(f"⚠️ User {user_id}: {problem}")
+            print(f"⚠️ Keeping the achievements column: {len(problems)} rows could not be fully "
+                  f"migrated (see above).")
+            return
+        cursor.execute("ALTER TABLE user_stats RENAME COLUMN achievements TO achievements_legacy")
+        print("✅ Renamed the achievements column to achievements_legacy.")
+
+
+def migrate_database():
+    """
+    Run the schema migrations (blocks). Safe to run on every start. Errors
+    are logged rather than raised, so the bot still starts (fresh, if the
+    database is unreachable) and the migrations run again next time.
+    """
+    if IS_DEV_MODE:
+        return
+    try:
+        conn = get_db_connection()
+        try:
+            migrate_achievements_column(conn)
+            migrate_game_state_channels(conn)
+            migrate_count_history_channels(conn)
+        finally:
+            conn.close()
+    except Exception as e:
+        print(f"⚠️ Could not migrate the database, starting anyway. Reason: {e}")
 
 
 def save_state():
@@ -154,85 +562,72 @@ def save_state():
         print(f"🔧 DEV MODE: Skipping save_state()")
         return
     
-    # Try to acquire lock with timeout to prevent deadlocks
-    lock_acquired = SHARED_DATA_LOCK.acquire(timeout=5.0)
-    if not lock_acquired:
-        print(f"⚠️ Warning: Could not acquire lock for save_state after 5 seconds, skipping save")
-        return
-    
-    try:
-        # Copy all data while holding the lock once
-        game_state_copy = {
-            'next_number': next_number,
-            'last_correct_user': last_correct_user,
-            'total_correct': total_correct,
-            'last_streak_milestone': last_streak_milestone,
-            'testing_mode': testing_mode,
-        }
-        user_stats_copy = {uid: stats.copy() for uid, stats in user_stats.items()}
-    finally:
-        SHARED_DATA_LOCK.release()
+    # Only users changed since they were last saved: rewriting the others
+    # would overwrite what other shards wrote for them meanwhile
+    _requeue_failed_user_writes()
+    unsaved = list(_unsaved_counts.items())
+    _unsaved_counts.clear()
+    if USER_CACHE_SIZE:
+        for uid in [uid for uid, write in _user_writes.items() if write is None or write.done()]:
+            del _user_writes[uid]
     
-    # Save game state (without holding lock)
-    executor.submit(_write_game_state_to_db, game_state_copy)
-    
-    # Save all user stats (without holding lock)
-    for uid, stats in user_stats_copy.items():
-        executor.submit(_write_user_stats_to_db, uid, stats)
+    for channel_id, game in games.items():
+        executor.submit(_write_game_state_to_db, channel_id, _game_state_row(game.snapshot))
+    for uid, counts in unsaved:
+        stats = user_stats.get(uid)
+        if stats is None:
+            continue
+        # Records are never mutated once published, so no copy is needed
+        write = executor.submit(_write_user_stats_to_db, uid, stats.pack(), counts)
+        if USER_CACHE_SIZE:
+            _user_writes[uid] = write
 
 
-def load_state():
-    """Load game state and user stats from database."""
-    global next_number, user_stats, last_correct_user, total_correct, last_streak_milestone, testing_mode
-    
+def read_game_state(channel_id):
+    """
+    Read a channel's game state from the database (run in executor, it blocks).
+    With channel_id None only the user stats are read.
+
+    With USER_CACHE_SIZE set this also reads the totals and the leaderboard
+    top, which is all lazy mode needs. Returns the data for
+    apply_game_state(), or None to keep the defaults.
+    """
     if IS_DEV_MODE:
-        print(f"🔧 DEV MODE: Skipping load_state() from database, using defaults")
-        return
+        print(f"🔧 DEV MODE: Skipping read_game_state() from database, using defaults")
+        return None
     
     # Load data from database first (without holding lock)
     loaded_game_state = None
     loaded_user_stats = {}
+    loaded_totals = None
     
     try:
         conn = get_db_connection()
         
         # Load game state
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM game_state WHERE id = 1")
-            game_state = cursor.fetchone()
-            
-            if game_state:
-                loaded_game_state = {
-                    'next_number': game_state['next_number'],
-                    'last_correct_user': game_state['last_correct_user'],
-                    'total_correct': game_state['total_correct'],
-                    'last_streak_milestone': game_state['last_streak_milestone'],
-                    'testing_mode': bool(game_state['testing_mode'])
-                }
-                print(f"✅ Loaded game state from database.")
+        if channel_id is not None:
+            loaded_game_state = _read_channel_row(conn, channel_id)
+            if loaded_game_state:
+                print(f"✅ Loaded game state of channel {channel_id} from database.")
             else:
-                print("⚠️ No game state found in database, using defaults.")
+                print(f"⚠️ No game state found in database for channel {channel_id}, using defaults.")
         
-        # Load user stats
-        with conn.cursor() as cursor:
-            cursor.execute("SELECT * FROM user_stats")
-            users = cursor.fetchall()
-            
-            for user in users:
-                user_id = user['user_id']
-                achievements = set(json.loads(user['achievements'])) if user['achievements'] else set()
-                
-                loaded_user_stats[user_id] = {
-                    'username': user['username'],
-                    'correct': user['correct'],
-                    'wrong': user['wrong'],
-                    'streak': user['streak'],
-                    'best_streak': user['best_streak'],
-                    'achievements': achievements,
-                    'consecutive_wrong': user['consecutive_wrong'],
-                    'back_to_back_violations': user['back_to_back_violations'],
-                    'timeout_until': user['timeout_until']
-                }
+        if USER_CACHE_SIZE:
+            # Lazy mode: only the totals and the leaderboard top, the rest on demand
+            with conn.cursor() as cursor:
+                cursor.execute("""
+                    SELECT COUNT(*) AS players, COALESCE(SUM(correct), 0) AS correct,
+                           COALESCE(SUM(wrong), 0) AS wrong
+                    FROM user_stats
+                """)
+                loaded_totals = cursor.fetchone()
+                cursor.execute("""
+                    SELECT * FROM user_stats
+                    ORDER BY correct DESC, correct / GREATEST(correct + wrong, 1) DESC
+                    LIMIT %s
+                """, (2 * LEADERBOARD_SIZE,))
+                for user in cursor.fetchall():
+                    loaded_user_stats[user['user_id']] = UserStats.from_row(user)
             
             print(f"✅ Loaded {len(loaded_user_stats)} user records from database.")
         
@@ -240,184 +635,499 @@ def load_state():
         
     except Exception as e:
         print(f"⚠️ Could not load state from database, starting fresh. Reason: {e}")
-        return
+        return None
     
-    # Now update the shared state with the loaded data (holding lock briefly)
-    try:
-        with TimedLock(SHARED_DATA_LOCK, timeout=5.0):
-            if loaded_game_state:
-                next_number = loaded_game_state['next_number']
-                last_correct_user = loaded_game_state['last_correct_user']
-                total_correct = loaded_game_state['total_correct']
-                last_streak_milestone = loaded_game_state['last_streak_milestone']
-                testing_mode = loaded_game_state['testing_mode']
-            
-            user_stats.clear()
-            user_stats.update(loaded_user_stats)
-    except TimeoutError as e:
-        print(f"❌ Error: {e} - Could not update game state after loading from database")
+    return channel_id, loaded_game_state, loaded_totals, loaded_user_stats
 
 
-def reset_game(preserve_stats=True):
-    """Reset the game state."""
-    global next_number, last_correct_user, last_streak_milestone, total_correct
+def apply_game_state(loaded):
+    """
+    Install data returned by read_game_state() (a state command): the
+    channel's game and the user stats shared by every channel.
+
+    Without USER_CACHE_SIZE user stats are still missing afterwards: stream
+    them in with stream_user_stats(); until then unloaded users are fetched
+    on demand (see is_user_loaded).
+    """
+    global _loading_users
+    
+    if loaded is None:
+        return
+    channel_id, loaded_game_state, loaded_totals, loaded_user_stats = loaded
     
+    if loaded_game_state:
+        _close_history(games.pop(channel_id, None))
+        games[channel_id] = ChannelGame(channel_id, loaded_game_state)
+    
+    user_stats.clear()
+    leaderboard.clear()
+    usernames.clear()
+    _unsaved_counts.clear()
+    _failed_user_writes.clear()
+    _missing_users.clear()
+    _user_writes.clear()
+    _loading_users = not USER_CACHE_SIZE
+    if loaded_totals:
+        leaderboard.add_untracked(int(loaded_totals['players']),
+                                  int(loaded_totals['correct']),
+                                  int(loaded_totals['wrong']))
+    for uid, stats in loaded_user_stats.items():
+        _install_user(uid, stats)
+    _publish_snapshot()
+
+
+def read_channel_state(channel_id):
+    """
+    Read one channel's game state from the database (run in executor, it
+    blocks). Returns the data for activate_channel(); None means defaults.
+    Errors are raised, so a channel is never started over by mistake.
+    """
+    if IS_DEV_MODE:
+        return None
+    conn = get_db_connection()
     try:
-        with TimedLock(SHARED_DATA_LOCK, timeout=5.0):
-            next_number = 1
-            last_correct_user = None
-            last_streak_milestone = 0
-            total_correct = 0
-            
-            if not preserve_stats:
-                user_stats.clear()
-                number_history.clear()
-    except TimeoutError as e:
-        print(f"❌ Error: {e} - Could not reset game")
+        return _read_channel_row(conn, channel_id)
+    finally:
+        conn.close()
+
+
+def is_channel_active(channel_id):
+    """Return False if a channel's game must be read with read_channel_state() first."""
+    return channel_id in games
+
+
+def activate_channel(channel_id, state):
+    """Start a channel's game from read_channel_state() data (a state command)."""
+    if channel_id in games:
+        # Activated (or already counting) while the read was in flight
         return
+    games[channel_id] = ChannelGame(channel_id, state)
+    print(f"🎮 Activated the game in channel {channel_id} (next number {games[channel_id].next_number}).")
+
+
+def _close_history(game):
+    if game is not None and game.history_file is not None:
+        game.history_file.close()
+
+
+def close_history_files():
+    """Close every channel's history file (at shutdown)."""
+    for game in games.values():
+        _close_history(game)
+
+
+def stream_user_stats(chunk_size=LOAD_CHUNK_SIZE):
+    """
+    Stream every user's stats from the database, chunk_size users at a time.
+
+    A generator yielding lists of (user_id, UserStats); each next() blocks on
+    the database, so run it in an executor and hand the chunks to
+    install_loaded_users(). Rows come from an unbuffered cursor as tuples,
+    so only one chunk is held in memory at a time. Errors are raised.
+    """
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT COUNT(*) AS players FROM user_stats")
+            expected = cursor.fetchone()['players']
+        
+        loaded = 0
+        started = last_report = time.monotonic()
+        with conn.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(f"SELECT {USER_STATS_COLUMNS} FROM user_stats")
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                # Columns are in UserStats constructor order after user_id
+                yield [(row[0], UserStats(*row[1:])) for row in rows]
+                
+                loaded += len(rows)
+                now = time.monotonic()
+                if now - last_report >= LOAD_PROGRESS_INTERVAL:
+                    print(f"⏳ Loaded {loaded}/{expected} user records...")
+                    last_report = now
+        
+        print(f"✅ Loaded {loaded} user records from database in {time.monotonic() - started:.1f}s.")
+    finally:
+        conn.close()
+
+
+def install_loaded_users(chunk):
+    """Make a chunk from stream_user_stats() resident, keeping newer records."""
+    for uid, stats in chunk:
+        # Users fetched on demand or created while streaming are newer
+        if uid not in user_stats:
+            _install_user(uid, stats)
+            _missing_users.discard(uid)
+    _publish_snapshot()
+
+
+def finish_user_load():
+    """Mark the streamed user stats as complete (all users are resident)."""
+    global _loading_users
+    _loading_users = False
+    _missing_users.clear()
+
+
+def is_loading_users():
+    """Return True if apply_game_state() left user stats to stream_user_stats()."""
+    return _loading_users
+
+
+def users_fully_loaded():
+    """Return True if every user with stats is resident."""
+    return not USER_CACHE_SIZE and not _loading_users
+
+
+def reset_game(preserve_stats=True, channel_id=None):
+    """Reset a channel's game; without preserve_stats every channel and user is cleared."""
+    if not preserve_stats:
+        user_stats.clear()
+        leaderboard.clear()
+        usernames.clear()
+        _unsaved_counts.clear()
+        _failed_user_writes.clear()
+        _missing_users.clear()
+        for game in games.values():
+            game.history.clear()
+    
+    game = _game(channel_id)
+    game.next_number = 1
+    game.last_correct_user = None
+    game.last_streak_milestone = 0
+    game.total_correct = 0
+    _publish_snapshot(game)
     
-    # Call save_state after releasing the lock
     if not IS_DEV_MODE:
         save_state()
     else:
         print(f"🔧 DEV MODE: Skipping save after reset")
 
 
-def update_user_stats(user_id, username, correct):
-    """Update statistics for a user."""
-    if user_id not in user_stats:
-        user_stats[user_id] = {
-            'correct': 0,
-            'wrong': 0,
-            'username': username,
-            'streak': 0,
-            'best_streak': 0,
-            'achievements': set(),
-            'consecutive_wrong': 0,
-            'back_to_back_violations': 0,
-            'timeout_until': 0
-        }
+def _install_user(user_id, stats):
+    """Make stats loaded from the database resident and indexed."""
+    user_stats[user_id] = stats
+    leaderboard.track(user_id, stats.correct, stats.wrong)
+    usernames.update(user_id, stats.username)
+
+
+def _evict_users(keep=None):
+    """
+    Write back and drop least recently used users beyond USER_CACHE_SIZE,
+    except user keep (the one just made resident).
+    """
+    if not USER_CACHE_SIZE:
+        return
     
-    stats = user_stats[user_id]
-    stats['username'] = username
+    skipped = 0
+    while len(user_stats) > USER_CACHE_SIZE and skipped < len(user_stats):
+        user_id = next(iter(user_stats))
+        rank = leaderboard.rank(user_id)
+        if user_id == keep or (rank is not None and rank <= LEADERBOARD_SIZE):
+            # Keep the leaderboard top resident, and the user who is needed now
+            user_stats.move_to_end(user_id)
+            skipped += 1
+            continue
+        
+        stats = user_stats.pop(user_id)
+        # The leaderboard entry stays so totals and ranks remain complete
+        usernames.remove(user_id)
+        counts = _unsaved_counts.pop(user_id, None)
+        if counts is not None and not IS_DEV_MODE:
+            _user_writes[user_id] = executor.submit(_write_user_stats_to_db, user_id, stats.pack(), counts)
+
+
+def is_user_loaded(user_id):
+    """Return False if the user's stats must be fetched from the database first."""
+    return users_fully_loaded() or user_id in user_stats or user_id in _missing_users
+
+
+def _fetch_user_row(where, args):
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute(f"SELECT * FROM user_stats WHERE {where} ORDER BY correct DESC LIMIT 1", args)
+            return cursor.fetchone()
+    finally:
+        conn.close()
+
+
+def pending_user_write(user_id):
+    """Return the future of a user's unfinished stats write, or None."""
+    write = _user_writes.get(user_id)
+    if write is None or write.done():
+        _user_writes.pop(user_id, None)
+        return None
+    return write
+
+
+def fetch_user_stats(user_id):
+    """
+    Read one user's stats from the database (run in read_executor, it
+    blocks). Returns UserStats, or None if the user has no stats yet.
+    Wait for pending_user_write(user_id) first, so the row is current.
+    Errors are raised: None must only ever mean the user is new.
+    """
+    if IS_DEV_MODE:
+        return None
+    row = _fetch_user_row("user_id = %s", (user_id,))
+    return UserStats.from_row(row) if row else None
+
+
+def fetch_user_id_by_name(name):
+    """
+    Find the best user named name in the database (run in read_executor).
+    Returns their user id, or None if nobody has that name. Errors are raised.
+    """
+    if IS_DEV_MODE or users_fully_loaded():
+        return None
+    row = _fetch_user_row("username = %s", (name,))
+    return row['user_id'] if row else None
+
+
+def install_user_stats(user_id, stats):
+    """Make stats returned by fetch_user_stats() resident."""
+    if user_id in user_stats:
+        # Already loaded (or created) while the fetch was in flight
+        user_stats.move_to_end(user_id)
+        return
+    if stats is None:
+        if len(_missing_users) >= max(USER_CACHE_SIZE, MISSING_USERS_LIMIT):
+            _missing_users.clear()
+        _missing_users.add(user_id)
+        return
+    _install_user(user_id, stats)
+    _evict_users(keep=user_id)
+    _publish_snapshot()
+
+
+def touch_user(user_id):
+    """Mark a resident user as recently used."""
+    if user_id in user_stats:
+        user_stats.move_to_end(user_id)
+
+
+def _update_user_stats(user_id, username, correct):
+    """
+    Build and store a new stats record for a user, without publishing.
+    With USER_CACHE_SIZE set the user must be loaded first (see is_user_loaded).
+    """
+    old_stats = user_stats.get(user_id)
+    stats = old_stats.copy() if old_stats else UserStats(username)
+    stats.username = username
     
+    counts = _unsaved_counts.setdefault(user_id, [0, 0, 0])
     if correct:
-        stats['correct'] += 1
-        stats['streak'] += 1
-        stats['consecutive_wrong'] = 0
+        counts[0] += 1
+        stats.correct += 1
+        stats.streak += 1
+        stats.consecutive_wrong = 0
         
-        if stats['streak'] > stats.get('best_streak', 0):
-            stats['best_streak'] = stats['streak']
+        if stats.streak > stats.best_streak:
+            stats.best_streak = stats.streak
     else:
-        stats['wrong'] += 1
-        stats['streak'] = 0
-        stats['consecutive_wrong'] += 1
+        counts[1] += 1
+        stats.wrong += 1
+        stats.streak = 0
+        stats.consecutive_wrong += 1
     
-    # Save to database asynchronously (only if not in dev mode)
+    user_stats[user_id] = stats
+    user_stats.move_to_end(user_id)
+    leaderboard.update(user_id, stats.correct, stats.wrong)
+    usernames.update(user_id, username)
+    if old_stats is None:
+        _missing_users.discard(user_id)
+        _evict_users(keep=user_id)
+    return stats
+
+
+def _persist_user_stats(user_id, stats):
+    """Queue a database write for a published (immutable) stats record."""
     if not IS_DEV_MODE:
-        executor.submit(_write_user_stats_to_db, user_id, stats.copy())
+        if USER_CACHE_SIZE:
+            # Write-back: saved on eviction or by the next save_state()
+            return
+        _requeue_failed_user_writes()
+        counts = _unsaved_counts.pop(user_id, None)
+        if counts is not None:
+            executor.submit(_write_user_stats_to_db, user_id, stats.pack(), counts)
     else:
-        print(f"🔧 DEV MODE: Skipping user stats update for {username}")
+        _unsaved_counts.pop(user_id, None)
+        print(f"🔧 DEV MODE: Skipping user stats update for {stats.username}")
 
 
-def add_to_history(number, username, input_text, types_used, parse_method):
-    """Add an entry to the number history."""
-    global number_history
-    
-    number_history.append({
-        'number': number,
-        'username': username,
-        'input': input_text,
-        'types': list(types_used) if types_used else ['integer'],
-        'method': parse_method,
-        'timestamp': datetime.now().isoformat()
-    })
-    
-    if len(number_history) > 100:
-        number_history = number_history[-100:]
+def _persist_game_state(game):
+    """Queue a database write for a channel's current game state."""
+    if not IS_DEV_MODE:
+        executor.submit(_write_game_state_to_db, game.channel_id, _game_state_row(game.snapshot))
+    else:
+        print(f"🔧 DEV MODE: Skipping game state save")
 
 
-def get_game_state():
-    """Get current game state (thread-safe)."""
-    try:
-        with TimedLock(SHARED_DATA_LOCK, timeout=5.0):
-            return {
-                'next_number': next_number,
-                'last_correct_user': last_correct_user,
-                'total_correct': total_correct,
-                'testing_mode': testing_mode,
-                'user_stats': dict(user_stats),
-                'history': list(number_history),
-                'is_dev_mode': IS_DEV_MODE
-            }
-    except TimeoutError as e:
-        print(f"❌ Error: {e} - Could not get game state")
-        return None
+def record_back_to_back_violation(user_id, username, timeout_threshold=5, timeout_seconds=30):
+    """
+    Count a back-to-back answer as wrong and track the violation.
+    Returns (violations, timed_out).
+    """
+    stats = _update_user_stats(user_id, username, False)
+    stats.back_to_back_violations += 1
+    _unsaved_counts[user_id][2] += 1
+    timed_out = stats.back_to_back_violations >= timeout_threshold
+    if timed_out:
+        apply_timeout(stats, timeout_seconds, clock())
+    _publish_snapshot()
+    _persist_user_stats(user_id, stats)
+    return stats.back_to_back_violations, timed_out
+
+
+def toggle_testing_mode(channel_id=None):
+    """Flip a channel's testing mode and return the new value."""
+    game = _game(channel_id)
+    game.testing_mode = not game.testing_mode
+    _publish_snapshot(game)
+    _persist_game_state(game)
+    return game.testing_mode
+
 
+def set_last_streak_milestone(milestone, channel_id=None):
+    """Record the last streak milestone that was announced in a channel."""
+    game = _game(channel_id)
+    game.last_streak_milestone = milestone
+    _publish_snapshot(game)
 
-def process_correct_answer(user_id, username, parsed_number, content, types_used, parse_method, languages):
+
+def add_to_history(number, user_id, types_used, parse_method, input_text='', channel_id=None):
+    """Add an entry to a channel's number history (oldest entries fall off the end)."""
+    game = _game(channel_id)
+    record = HistoryRecord.create(number, user_id, types_used, parse_method, clock())
+    game.history.append(record)
+    if game.history_file is not None:
+        game.history_file.append(record)
+    if history_writer is not None:
+        history_writer.record(game.channel_id, record.number, record.user_id, True, input_text,
+                              record.types, record.method, record.timestamp)
+
+
+def get_history(channel_id=None):
+    """Return an iterator over a channel's recent HistoryRecords, oldest first (no copy)."""
+    return iter(_game(channel_id).history)
+
+
+def find_count(number, channel_id=None):
+    """
+    Return the HistoryRecord of the most recent time number was counted in
+    a channel, or None. Uses the history file when enabled, otherwise the
+    in-memory history.
+    """
+    game = _game(channel_id)
+    if game.history_file is not None:
+        return game.history_file.reader().find(number)
+    for record in reversed(game.history):
+        if record.number == number:
+            return record
+    return None
+
+
+def process_correct_answer(user_id, username, parsed_number, content, types_used, parse_method, languages,
+                           channel_id=None):
     """Process a correct answer."""
-    global next_number, last_correct_user, total_correct
-    
-    last_correct_user = user_id
-    update_user_stats(user_id, username, True)
+    game = _game(channel_id)
+    game.last_correct_user = user_id
+    stats = _update_user_stats(user_id, username, True)
     
     # Unlock achievements
-    user_achievements = user_stats[user_id].get('achievements', set())
-    for type_used in types_used:
-        user_achievements.add(type_used)
-    for lang_used in languages:
-        user_achievements.add(lang_used)
+    stats.achievements |= achievements_to_mask(types_used) | achievements_to_mask(languages)
     
     # Check for polyglot achievement (4+ languages in one expression)
     if len(languages) >= 4:
-        user_achievements.add('polyglot')
-    
-    user_stats[user_id]['achievements'] = user_achievements
+        stats.achievements |= ACHIEVEMENT_BITS['polyglot']
     
-    total_correct += 1
-    add_to_history(parsed_number, username, content, types_used, parse_method)
-    next_number += 1
+    game.total_correct += 1
+    add_to_history(parsed_number, user_id, types_used, parse_method, content, game.channel_id)
+    game.next_number += 1
+    _publish_snapshot(game)
     
-    # Save game state to database (only if not in dev mode)
-    if not IS_DEV_MODE:
-        executor.submit(_write_game_state_to_db, {
-            'next_number': next_number,
-            'last_correct_user': last_correct_user,
-            'total_correct': total_correct,
-            'last_streak_milestone': last_streak_milestone,
-            'testing_mode': testing_mode,
-        })
-    else:
-        print(f"🔧 DEV MODE: Skipping game state save after correct answer")
+    _persist_user_stats(user_id, stats)
+    _persist_game_state(game)
     
     return True
 
 
-def process_wrong_answer(user_id, username, should_reset):
+def process_wrong_answer(user_id, username, should_reset, parsed_number=0, content='', channel_id=None):
     """Process a wrong answer."""
-    global next_number, last_correct_user, total_correct
+    game = _game(channel_id)
+    game.last_correct_user = None
+    stats = _update_user_stats(user_id, username, False)
+    if history_writer is not None:
+        history_writer.record(game.channel_id, parsed_number, user_id, False, content, 0, 0, clock())
     
-    last_correct_user = None
-    update_user_stats(user_id, username, False)
+    if should_reset:
+        game.next_number = 1
+        game.total_correct = 0
+    _publish_snapshot(game)
     
+    _persist_user_stats(user_id, stats)
     if should_reset:
-        next_number = 1
-        last_correct_user = None
-        total_correct = 0
-        
-        # Save game state to database (only if not in dev mode)
-        if not IS_DEV_MODE:
-            executor.submit(_write_game_state_to_db, {
-                'next_number': next_number,
-                'last_correct_user': last_correct_user,
-                'total_correct': total_correct,
-                'last_streak_milestone': last_streak_milestone,
-                'testing_mode': testing_mode,
-            })
-        else:
-            print(f"🔧 DEV MODE: Skipping game state save after wrong answer")
-        
-        return True
+        _persist_game_state(game)
+    
+    return should_reset
+
+
+AnswerOutcome = namedtuple('AnswerOutcome', [
+    'result',          # 'correct', 'wrong' or 'back_to_back'
+    'numbers',         # the numbers the message was parsed to
+    'expected',        # the next number when the answer was judged
+    'previous_stats',  # the user's stats before the answer (None if new)
+    'timed_out',       # back_to_back: the violation put the user in timeout
+    'should_reset',    # wrong: the coin flip reset the game
+    'streak_message',  # correct: milestone announcement, if one was reached
+])
+
+
+def commit_answer(user_id, username, numbers, content, types_used, parse_method, languages,
+                  channel_id=None):
+    """
+    Judge and apply an answer in a channel (a state command).
+    numbers are the consecutive numbers the message was parsed to; returns
+    an AnswerOutcome describing what to announce.
+    """
+    game = _game(channel_id)
+    expected = game.next_number
+    previous = user_stats.get(user_id)
     
-    return False
\ No newline at end of file
+    if numbers[0] != expected:
+        should_reset = random.choice([True, False])
+        process_wrong_answer(user_id, username, should_reset, numbers[0], content, game.channel_id)
+        return AnswerOutcome('wrong', numbers, expected, previous, False, should_reset, None)
+    
+    if game.last_correct_user == user_id and not game.testing_mode:
+        _, timed_out = record_back_to_back_violation(user_id, username)
+        return AnswerOutcome('back_to_back', numbers, expected, previous, timed_out, False, None)
+    
+    for number in numbers:
+        process_correct_answer(user_id, username, number, content, types_used, parse_method, languages,
+                               game.channel_id)
+    
+    streak_message, new_milestone = get_streak_message(game.total_correct, game.last_streak_milestone)
+    if streak_message:
+        set_last_streak_milestone(new_milestone, game.channel_id)
+    return AnswerOutcome('correct', numbers, expected, previous, False, False, streak_message)
+
+
+def commit_parsed(user_id, username, parsed, content, channel_id=None):
+    """
+    Commit a message interpreted ahead of time in a channel (a state command).
+    parsed is a parser.ParsedMessage; its cheap selection is redone here if
+    the next number changed since it was made. Returns (selection, outcome),
+    outcome being None if the message holds no number, or None if the
+    user's stats were evicted and must be loaded again first.
+    """
+    if not is_user_loaded(user_id):
+        return None
+    selection = parsed.select(_game(channel_id).next_number)
+    numbers, types_used, parse_method, _, languages, _ = selection
+    if not numbers:
+        return selection, None
+    return selection, commit_answer(user_id, username, numbers, content, types_used, parse_method, languages,
+                                    channel_id)
@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Persistent count history for the counting bot."""
+
+import mmap
+import os
+import queue
+import struct
+import threading
+import time
+from datetime import datetime
+from models import HistoryRecord
+
+# Longest input text stored per history row
+MAX_INPUT_LENGTH = 255
+
+# Queue poll result meaning "nothing arrived within flush_interval"
+_IDLE = object()
+
+
+class HistoryWriter:
+    """
+    Streams count history rows into the `count_history` table.
+
+    record() only puts a tuple on a queue; a background thread drains it and
+    writes batches with one multi-row INSERT, so the counting path never waits
+    on the database. Failed batches are kept and retried, up to max_pending rows.
+    """
+
+    CREATE_TABLE_SQL = """
+        CREATE TABLE IF NOT EXISTS count_history (
+            id BIGINT AUTO_INCREMENT PRIMARY KEY,
+            channel_id BIGINT NOT NULL,
+            number BIGINT NOT NULL,
+            user_id BIGINT NOT NULL,
+            correct BOOLEAN NOT NULL,
+            input_text VARCHAR(255) NOT NULL DEFAULT '',
+            types BIGINT NOT NULL DEFAULT 0,
+            method SMALLINT NOT NULL DEFAULT 0,
+            created_at DATETIME(3) NOT NULL,
+            INDEX idx_count_history_channel_number (channel_id, number),
+            INDEX idx_count_history_user (user_id, created_at)
+        ) CHARACTER SET utf8mb4
+    """
+
+    INSERT_SQL = """
+        INSERT INTO count_history
+        (channel_id, number, user_id, correct, input_text, types, method, created_at)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+    """
+
+    def __init__(self, connect, batch_size=500, flush_interval=2.0, max_pending=100000):
+        self.connect = connect
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue = queue.Queue()
+        self._pending = []
+        self._conn = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closed = False
+
+    def record(self, channel_id, number, user_id, correct, input_text, types, method, timestamp):
+        """Queue one history row of a channel's game (non-blocking)."""
+        if self._thread is None:
+            self._start()
+        self._queue.put((channel_id, number, user_id, correct, input_text[:MAX_INPUT_LENGTH],
+                         types, method, timestamp))
+
+    def close(self, timeout=10.0):
+        """Flush outstanding rows and stop the writer thread."""
+        self._closed = True
+        if self._thread is not None:
+            self._queue.put(None)
+            self._thread.join(timeout)
+        self._reset_connection()
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._closed:
+                self._thread = threading.Thread(target=self._run, name='history-writer', daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        last_flush = time.monotonic()
+        while True:
+            try:
+                row = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                row = _IDLE
+            
+            if row is None:
+                self._flush()
+                return
+            if row is not _IDLE:
+                self._pending.append(row)
+            
+            now = time.monotonic()
+            if len(self._pending) >= self.batch_size or now - last_flush >= self.flush_interval:
+                self._flush()
+                last_flush = now
+
+    def _flush(self):
+        """Write pending rows in batches; on error keep them for the next attempt."""
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            try:
+                if self._conn is None:
+                    self._conn = self.connect()
+                    with self._conn.cursor() as cursor:
+                        cursor.execute(self.CREATE_TABLE_SQL)
+                with self._conn.cursor() as cursor:
+                    cursor.executemany(self.INSERT_SQL, [
+                        row[:7] + (datetime.fromtimestamp(row[7]),) for row in batch
+                    ])
+                self._conn.commit()
+            except Exception as e:
+                print(f"❌ Error writing {len(batch)} history rows to database: {e}")
+                self._reset_connection()
+                if len(self._pending) > self.max_pending:
+                    dropped = len(self._pending) - self.max_pending
+                    del self._pending[:dropped]
+                    print(f"⚠️ History backlog full, dropped {dropped} oldest rows")
+                return
+            del self._pending[:len(batch)]
+
+    def _reset_connection(self):
+        if self._conn is not None:
+            try:
+                self._conn.close()
+            except Exception:
+                pass
+            self._conn = None
+
+
+# Fixed-width history file layout (little endian):
+#   counts.bin = header, then one record per accepted count, in order
+#   runs.idx   = one entry per game run: (index of its first record, first number)
+# Within a run numbers are consecutive, so a number's record sits at
+# run_start + (number - first_number), which makes lookups O(1).
+FILE_MAGIC = b'CNTH'
+FILE_VERSION = 1
+FILE_HEADER = struct.Struct('<4sHH8x')
+FILE_RECORD = struct.Struct('<QQdQH6x')  # number, user_id, timestamp, types, method
+RUN_ENTRY = struct.Struct('<QQ')  # first record index, first number
+
+
+class HistoryFile:
+    """
+    Append-only fixed-width count history file.
+
+    Every accepted count becomes one FILE_RECORD; a new run (game since the
+    last reset) starts whenever a number does not follow the previous one.
+    Use reader() to query it through mmap without loading it into memory.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.data_path = os.path.join(directory, 'counts.bin')
+        self.runs_path = os.path.join(directory, 'runs.idx')
+
+        self._data = open(self.data_path, 'ab+')
+        size = self._data.seek(0, os.SEEK_END)
+        if size < FILE_HEADER.size:
+            self._data.truncate(0)
+            self._data.write(FILE_HEADER.pack(FILE_MAGIC, FILE_VERSION, FILE_RECORD.size))
+            self._data.flush()
+            size = FILE_HEADER.size
+        else:
+            self._data.seek(0)
+            _check_header(self._data.read(FILE_HEADER.size), self.data_path)
+        # Drop a partial record left behind by a crash
+        self._count = (size - FILE_HEADER.size) // FILE_RECORD.size
+        self._data.truncate(FILE_HEADER.size + self._count * FILE_RECORD.size)
+
+        self._runs = open(self.runs_path, 'ab+')
+        runs_size = self._runs.seek(0, os.SEEK_END)
+        self._runs.truncate(runs_size - runs_size % RUN_ENTRY.size)
+        self._next_number = None
+        if runs_size >= RUN_ENTRY.size:
+            self._runs.seek(runs_size - runs_size % RUN_ENTRY.size - RUN_ENTRY.size)
+            run_start, first_number = RUN_ENTRY.unpack(self._runs.read(RUN_ENTRY.size))
+            if run_start < self._count:
+                self._next_number = first_number + (self._count - run_start)
+
+        self._reader = None
+
+    def append(self, record):
+        """Append a HistoryRecord, starting a new run if it breaks the sequence."""
+        if record.number != self._next_number:
+            self._runs.write(RUN_ENTRY.pack(self._count, record.number))
+            self._runs.flush()
+        self._data.write(FILE_RECORD.pack(record.number, record.user_id, record.timestamp,
+                                          record.types, record.method))
+        self._count += 1
+        self._next_number = record.number + 1
+
+    def flush(self):
+        self._data.flush()
+
+    def reader(self):
+        """Return a reader over everything appended so far."""
+        self.flush()
+        if self._reader is None:
+            self._reader = HistoryFileReader(self.directory)
+        else:
+            self._reader.refresh()
+        return self._reader
+
+    def close(self):
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self._data.close()
+        self._runs.close()
+
+
+class HistoryFileReader:
+    """
+    Read-only, memory-mapped view of a HistoryFile directory.
+
+    Lookups unpack a single record at a computed offset and iteration scans
+    the mapping sequentially; nothing is loaded into memory up front. Call
+    refresh() to see records appended after the reader was opened.
+    """
+
+    def __init__(self, directory):
+        self._data = open(os.path.join(directory, 'counts.bin'), 'rb')
+        self._runs = open(os.path.join(directory, 'runs.idx'), 'rb')
+        _check_header(self._data.read(FILE_HEADER.size), self._data.name)
+        self._data_map = self._runs_map = None
+        self.refresh()
+
+    def refresh(self):
+        """Re-map the files if they have grown."""
+        self._data_map = _remap(self._data, self._data_map)
+        self._runs_map = _remap(self._runs, self._runs_map)
+        data_size = len(self._data_map) if self._data_map is not None else 0
+        runs_size = len(self._runs_map) if self._runs_map is not None else 0
+        self._count = max(0, (data_size - FILE_HEADER.size) // FILE_RECORD.size)
+        self._run_count = runs_size // RUN_ENTRY.size
+
+    def __len__(self):
+        return self._count
+
+    def __iter__(self):
+        """Yield every record, oldest first."""
+        for index in range(self._count):
+            yield self._record(index)
+
+    def runs(self):
+        """Return [(first_number, length), ...] for every run, oldest first."""
+        return [self._run(run)[1:] for run in range(self._run_count)]
+
+    def iter_run(self, run=-1):
+        """Yield the records of one run (default: the latest), oldest first."""
+        if not self._run_count:
+            return
+        start, _, length = self._run(run % self._run_count)
+        for index in range(start, start + length):
+            yield self._record(index)
+
+    def lookup(self, number, run=-1):
+        """Return the record for number in one run (default: the latest), or None."""
+        if not self._run_count:
+            return None
+        start, first_number, length = self._run(run % self._run_count)
+        offset = number - first_number
+        if 0 <= offset < length:
+            return self._record(start + offset)
+        return None
+
+    def find(self, number):
+        """Return the most recent record for number across all runs, or None."""
+        for run in range(self._run_count - 1, -1, -1):
+            record = self.lookup(number, run)
+            if record is not None:
+                return record
+        return None
+
+    def close(self):
+        for mapping in (self._data_map, self._runs_map):
+            if mapping is not None:
+                mapping.close()
+        self._data.close()
+        self._runs.close()
+
+    def _run(self, run):
+        start, first_number = RUN_ENTRY.unpack_from(self._runs_map, run * RUN_ENTRY.size)
+        if run + 1 < self._run_count:
+            end = RUN_ENTRY.unpack_from(self._runs_map, (run + 1) * RUN_ENTRY.size)[0]
+        else:
+            end = self._count
+        return start, first_number, max(0, min(end, self._count) - start)
+
+    def _record(self, index):
+        return HistoryRecord(*FILE_RECORD.unpack_from(
+            self._data_map, FILE_HEADER.size + index * FILE_RECORD.size))
+
+
+def _check_header(header, path):
+    if len(header) < FILE_HEADER.size:
+        raise ValueError(f"{path} is not a count history file")
+    magic, version, record_size = FILE_HEADER.unpack(header)
+    if magic != FILE_MAGIC or version != FILE_VERSION or record_size != FILE_RECORD.size:
+        raise ValueError(f"{path} is not a count history file (version {version})")
+
+
+def _remap(file, mapping):
+    size = os.fstat(file.fileno()).st_size
+    if mapping is not None and len(mapping) == size:
+        return mapping
+    if mapping is not None:
+        mapping.close()
+    if size == 0:
+        return None
+    return mmap.mmap(file.fileno(), size, access=mmap.ACCESS_READ)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""In-memory indexes maintained alongside the user stats."""
+
+from bisect import bisect_left, insort
+
+
+class LeaderboardIndex:
+    """
+    Order-statistics index of users in leaderboard order, plus running totals.
+
+    Entries are kept in a list of sorted buckets (a sqrt-decomposed sorted
+    list), so updates touch a single bucket, the top N is read straight off
+    the front and a user's rank is a bisect plus a prefix sum over bucket sizes.
+
+    Players known only through aggregate totals (not loaded yet) can be
+    accounted for with add_untracked() and moved into the index with track().
+
+    `version` changes whenever the order, a player's counts or the totals
+    change, and only then.
+    """
+
+    BUCKET_SIZE = 256
+
+    def __init__(self):
+        self.version = 0
+        self.clear()
+
+    def clear(self):
+        """Remove all users and reset the totals."""
+        self.version += 1
+        self._buckets = []
+        self._maxes = []
+        self._entries = {}  # user_id -> (key, correct, wrong)
+        self._offsets = None
+        self._untracked_players = 0
+        self.total_correct = 0
+        self.total_wrong = 0
+
+    def __len__(self):
+        """Number of players, including untracked ones."""
+        return len(self._entries) + self._untracked_players
+
+    def __contains__(self, user_id):
+        return user_id in self._entries
+
+    @staticmethod
+    def sort_key(user_id, correct, wrong):
+        """Sort key matching the leaderboard order: correct, then accuracy."""
+        total = correct + wrong
+        accuracy = correct / total if total > 0 else 0
+        return (-correct, -accuracy, user_id)
+
+    @property
+    def untracked(self):
+        """Number of players only counted in the totals (see add_untracked)."""
+        return self._untracked_players
+
+    @property
+    def total_attempts(self):
+        return self.total_correct + self.total_wrong
+
+    def update(self, user_id, correct, wrong):
+        """Insert or move a user to match their current counts."""
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            old_key, old_correct, old_wrong = entry
+            if old_correct == correct and old_wrong == wrong:
+                return
+            self._discard(old_key)
+            self.total_correct -= old_correct
+            self.total_wrong -= old_wrong
+
+        self.version += 1
+        key = self.sort_key(user_id, correct, wrong)
+        self._insert(key)
+        self._entries[user_id] = (key, correct, wrong)
+        self.total_correct += correct
+        self.total_wrong += wrong
+
+    def add_untracked(self, players, correct, wrong):
+        """Count players that exist but are not in the index in the totals."""
+        self.version += 1
+        self._untracked_players += players
+        self.total_correct += correct
+        self.total_wrong += wrong
+
+    def track(self, user_id, correct, wrong):
+        """Move a player counted by add_untracked() into the index."""
+        if user_id not in self._entries and self._untracked_players > 0:
+            self._untracked_players -= 1
+            self.total_correct -= correct
+            self.total_wrong -= wrong
+        self.update(user_id, correct, wrong)
+
+    def remove(self, user_id):
+        """Remove a user from the index."""
+        entry = self._entries.pop(user_id, None)
+        if entry is None:
+            return
+        self.version += 1
+        key, correct, wrong = entry
+        self._discard(key)
+        self.total_correct -= correct
+        self.total_wrong -= wrong
+
+    def top(self, n):
+        """Return the user ids of the first n users in leaderboard order."""
+        result = []
+        for bucket in self._buckets:
+            for key in bucket:
+                if len(result) >= n:
+                    return result
+                result.append(key[2])
+        return result
+
+    def rank(self, user_id):
+        """Return the 1-based leaderboard rank of a user, or None."""
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        key = entry[0]
+        pos = bisect_left(self._maxes, key)
+        if self._offsets is None:
+            offsets = [0]
+            for bucket in self._buckets:
+                offsets.append(offsets[-1] + len(bucket))
+            self._offsets = offsets
+        return self._offsets[pos] + bisect_left(self._buckets[pos], key) + 1
+
+    def _insert(self, key):
+        self._offsets = None
+        if not self._buckets:
+            self._buckets.append([key])
+            self._maxes.append(key)
+            return
+
+        pos = bisect_left(self._maxes, key)
+        if pos == len(self._buckets):
+            pos -= 1
+        bucket = self._buckets[pos]
+        insort(bucket, key)
+        self._maxes[pos] = bucket[-1]
+
+        if len(bucket) > 2 * self.BUCKET_SIZE:
+            half = bucket[self.BUCKET_SIZE:]
+            del bucket[self.BUCKET_SIZE:]
+            self._buckets.insert(pos + 1, half)
+            self._maxes[pos] = bucket[-1]
+            self._maxes.insert(pos + 1, half[-1])
+
+    def _discard(self, key):
+        self._offsets = None
+        pos = bisect_left(self._maxes, key)
+        bucket = self._buckets[pos]
+        del bucket[bisect_left(bucket, key)]
+        if bucket:
+            self._maxes[pos] = bucket[-1]
+        else:
+            del self._buckets[pos]
+            del self._maxes[pos]
+
+
+class UsernameIndex:
+    """
+    Case-insensitive username -> user id index with prefix search.
+
+    Usernames change whenever a user answers under a new display name, so
+    update() moves the user between keys; several users may share a name.
+    """
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """Remove all users."""
+        self._ids_by_name = {}  # casefolded name -> set of user ids
+        self._name_by_id = {}  # user id -> casefolded name
+        self._sorted_names = []
+
+    def __len__(self):
+        return len(self._name_by_id)
+
+    @staticmethod
+    def normalize(name):
+        return name.strip().casefold()
+
+    def update(self, user_id, username):
+        """Record the current username of a user."""
+        name = self.normalize(username)
+        old_name = self._name_by_id.get(user_id)
+        if old_name == name:
+            return
+        if old_name is not None:
+            self._discard(user_id, old_name)
+
+        self._name_by_id[user_id] = name
+        ids = self._ids_by_name.get(name)
+        if ids is None:
+            self._ids_by_name[name] = {user_id}
+            insort(self._sorted_names, name)
+        else:
+            ids.add(user_id)
+
+    def remove(self, user_id):
+        """Remove a user from the index."""
+        name = self._name_by_id.pop(user_id, None)
+        if name is not None:
+            self._discard(user_id, name)
+
+    def lookup(self, name):
+        """Return the set of user ids currently using a name."""
+        return self._ids_by_name.get(self.normalize(name), set())
+
+    def search_prefix(self, prefix, limit=5):
+        """Return up to limit casefolded names starting with prefix, in order."""
+        prefix = self.normalize(prefix)
+        start = bisect_left(self._sorted_names, prefix)
+        return [name for name in self._sorted_names[start:start + limit]
+                if name.startswith(prefix)]
+
+    def _discard(self, user_id, name):
+        ids = self._ids_by_name[name]
+        ids.discard(user_id)
+        if not ids:
+            del self._ids_by_name[name]
+            del self._sorted_names[bisect_left(self._sorted_names, name)]
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Per-channel ingest queues for the counting bot's incoming messages."""
+
+import asyncio
+import time
+from collections import deque
+from metrics import LatencyStats
+
+# Messages waiting per channel before new ones are shed
+INGEST_QUEUE_LIMIT = 256
+
+# Waiting messages per channel above which chatter (messages that cannot be
+# a count or a command) is shed
+INGEST_CHATTER_LIMIT = 32
+
+# Messages per channel being prepared (parsed, user loaded) at once
+INGEST_CONCURRENCY = 8
+
+
+class IngestQueue:
+    """
+    Ordered, bounded queue of one channel's messages.
+
+    Each message goes through prepare(message), which may run for up to
+    `concurrency` messages at once (parsing, loading stats), and then
+    commit(message, prepared), which runs one message at a time in arrival
+    order. prepare returning None means the message is fully handled.
+
+    offer() never waits: once `limit` messages are waiting new ones are
+    shed, and chatter is shed earlier, at `chatter_limit`, so counts keep
+    their place under a burst of conversation.
+    """
+
+    def __init__(self, prepare, commit, limit=INGEST_QUEUE_LIMIT, chatter_limit=INGEST_CHATTER_LIMIT,
+                 concurrency=INGEST_CONCURRENCY, is_chatter=None, clock=time.monotonic):
+        self.prepare = prepare
+        self.commit = commit
+        self.limit = limit
+        self.chatter_limit = chatter_limit
+        self.is_chatter = is_chatter
+        self.clock = clock
+        self._slots = asyncio.Semaphore(concurrency)
+        self._waiting = deque()  # (message, time offered), not started yet
+        self._started = deque()  # (message, prepare task), in arrival order
+        self._feeder = None
+        self._committer = None
+        self.wait = LatencyStats()  # time from offer() to the start of prepare
+        self.accepted = 0
+        self.shed = 0
+        self.max_depth = 0
+
+    def depth(self):
+        """Messages offered and not committed yet."""
+        return len(self._waiting) + len(self._started)
+
+    def offer(self, message):
+        """Queue a message; return False if it was shed."""
+        waiting = len(self._waiting)
+        if waiting >= self.limit or (
+                waiting >= self.chatter_limit and self.is_chatter is not None and self.is_chatter(message)):
+            self.shed += 1
+            return False
+
+        self._waiting.append((message, self.clock()))
+        self.accepted += 1
+        self.max_depth = max(self.max_depth, self.depth())
+        if self._feeder is None:
+            self._feeder = asyncio.get_running_loop().create_task(self._feed())
+        return True
+
+    async def drain(self):
+        """Wait until every queued message has been committed."""
+        while self._feeder is not None or self._committer is not None:
+            await asyncio.gather(*(task for task in (self._feeder, self._committer) if task is not None))
+
+    async def _feed(self):
+        loop = asyncio.get_running_loop()
+        try:
+            while self._waiting:
+                await self._slots.acquire()
+                message, offered = self._waiting.popleft()
+                self.wait.record(self.clock() - offered)
+                self._started.append((message, loop.create_task(self.prepare(message))))
+                if self._committer is None:
+                    self._committer = loop.create_task(self._commit_in_order())
+        finally:
+            self._feeder = None
+
+    async def _commit_in_order(self):
+        try:
+            while self._started:
+                message, task = self._started[0]
+                try:
+                    prepared = await task
+                    if prepared is not None:
+                        await self.commit(message, prepared)
+                except Exception as e:
+                    print(f"❌ Error handling message {getattr(message, 'id', '?')}: {e}")
+                finally:
+                    self._started.popleft()
+                    self._slots.release()
+        finally:
+            self._committer = None
+
+
+class Ingest:
+    """One IngestQueue per channel, created on the first message."""
+
+    def __init__(self, prepare, commit, **options):
+        self.prepare = prepare
+        self.commit = commit
+        self.options = options
+        self.queues = {}  # channel id -> IngestQueue
+
+    def offer(self, message):
+        """Queue a message on its channel's queue; return False if it was shed."""
+        queue = self.queues.get(message.channel.id)
+        if queue is None:
+            queue = self.queues[message.channel.id] = IngestQueue(self.prepare, self.commit, **self.options)
+        return queue.offer(message)
+
+    async def drain(self):
+        """Wait until every channel's queued messages have been committed."""
+        await asyncio.gather(*(queue.drain() for queue in list(self.queues.values())))
+
+    def report(self):
+        """One line per channel: depth, shed messages and queue wait."""
+        lines = []
+        for channel_id, queue in sorted(self.queues.items()):
+            lines.append(f"channel {channel_id}: depth {queue.depth()} (max {queue.max_depth}), "
+                         f"{queue.accepted} accepted, {queue.shed} shed, "
+                         f"wait {queue.wait.mean * 1000:.1f} ms mean / {queue.wait.max * 1000:.1f} ms max")
+        return "\n".join(lines)
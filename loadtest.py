@@ -0,0 +1,281 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Drive bot.on_message with synthetic messages and measure the pipeline.
+
+No Discord connection and no database: the bot runs in development mode
+with in-memory state, and channels, messages and authors are fakes whose
+send() and add_reaction() take a configurable latency. The workload is
+either scripted (counts by rotating users, plus wrong answers, chatter and
+commands in the given proportions) or recorded (a JSONL channel log of
+messages, see replay.py), offered at a target rate.
+
+Every message is timed through the stages of the ingest pipeline:
+
+    queue wait   offered until its channel queue starts preparing it
+    prepare      parsing and loading the author
+    order wait   prepared until every earlier message was committed
+    commit       timeouts, commands and judging the answer
+    end to end   offered until judged (or answered, for commands)
+
+Queue wait plus order wait is what used to be waiting for the state lock.
+
+    python loadtest.py --messages 2000 --rate 200 --channels 2
+    python loadtest.py --log export.jsonl --rate 0
+"""
+
+import argparse
+import asyncio
+import contextlib
+import itertools
+import os
+import random
+import time
+from metrics import Histogram
+from replay import read_channel_log
+
+# Stages in pipeline order, as reported
+STAGES = ('queue wait', 'prepare', 'order wait', 'commit', 'end to end')
+
+CHATTER = ["lol", "nice one", "who's next?", "brb", "this channel is chaos", "gg"]
+COMMANDS = ["!lb", "!profile", "!who 3", "!stats"]
+
+
+class FakeUser:
+    def __init__(self, user_id, name):
+        self.id = user_id
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{user_id}>"
+
+
+class FakeChannel:
+    """Channel whose send() takes `latency` seconds."""
+
+    def __init__(self, channel_id, latency):
+        self.id = channel_id
+        self.latency = latency
+        self.sent = 0
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.latency)
+        self.sent += 1
+
+
+class FakeMessage:
+    """Message whose add_reaction() takes `latency` seconds."""
+
+    def __init__(self, message_id, author, channel, content, latency):
+        self.id = message_id
+        self.author = author
+        self.channel = channel
+        self.content = content
+        self.mentions = []
+        self.latency = latency
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(self.latency)
+
+
+def count_text(number, rng):
+    """A correct answer for number, in one of the forms players use."""
+    form = rng.random()
+    if form < 0.6 or number < 2:
+        return str(number)
+    if form < 0.8:
+        return f"{number - 1} + 1"
+    if form < 0.9:
+        return f"{number * 2} / 2"
+    return f"sqrt({number * number})"
+
+
+class LoadTest:
+    def __init__(self, bot, args):
+        self.bot = bot
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.clock = time.perf_counter
+        self.stages = {stage: Histogram() for stage in STAGES}
+        self.offered = {}   # message id -> time offered
+        self.prepared = {}  # message id -> time prepare finished
+        self.expected = {}  # channel id -> next number of the scripted count
+        self.shed = 0
+        self.last_judged = None
+
+    async def prepare(self, message):
+        started = self.clock()
+        self.stages['queue wait'].record(started - self.offered[message.id])
+        prepared = await self.bot.prepare_message(message)
+        done = self.clock()
+        self.stages['prepare'].record(done - started)
+        if prepared is None:
+            self._finish(message, done)
+        else:
+            self.prepared[message.id] = done
+        return prepared
+
+    async def commit(self, message, prepared):
+        started = self.clock()
+        self.stages['order wait'].record(started - self.prepared.pop(message.id))
+        await self.bot.commit_message(message, prepared)
+        done = self.clock()
+        self.stages['commit'].record(done - started)
+        self._finish(message, done)
+
+    def _finish(self, message, done):
+        self.stages['end to end'].record(done - self.offered.pop(message.id))
+        self.last_judged = done
+
+    async def offer(self, message):
+        self.offered[message.id] = self.clock()
+        if self.bot.ingest.offer(message):
+            return True
+        self.offered.pop(message.id)
+        self.shed += 1
+        return False
+
+    async def drain(self, channel_id=None):
+        """Wait until every offered message (of one channel, or all) was judged."""
+        if channel_id is None:
+            await self.bot.ingest.drain()
+        elif channel_id in self.bot.ingest.queues:
+            await self.bot.ingest.queues[channel_id].drain()
+
+    def scripted(self, channels, users):
+        """Yield (author, channel, content, kind) forever, kind being 'count', 'wrong', 'chatter' or 'command'."""
+        last_author = {}
+        while True:
+            channel = self.rng.choice(channels)
+            author = self.rng.choice([user for user in users if user is not last_author.get(channel.id)])
+            roll = self.rng.random()
+            if roll < self.args.commands:
+                yield author, channel, self.rng.choice(COMMANDS), 'command'
+            elif roll < self.args.commands + self.args.chatter:
+                yield author, channel, self.rng.choice(CHATTER), 'chatter'
+            else:
+                expected = self.expected.setdefault(
+                    channel.id, self.bot.game_logic.get_snapshot(channel.id).next_number)
+                if roll < self.args.commands + self.args.chatter + self.args.wrong:
+                    yield author, channel, str(expected + self.rng.randint(2, 9)), 'wrong'
+                else:
+                    self.expected[channel.id] = expected + 1
+                    last_author[channel.id] = author
+                    yield author, channel, count_text(expected, self.rng), 'count'
+
+    async def resync(self, channel):
+        """Wait for a channel's verdicts, then continue the count from its game."""
+        await self.drain(channel.id)
+        self.expected[channel.id] = self.bot.game_logic.get_snapshot(channel.id).next_number
+
+    async def run(self):
+        args = self.args
+        bot = self.bot
+        channels = [FakeChannel(channel_id, args.latency) for channel_id in sorted(bot.CHANNEL_IDS)]
+        if args.log:
+            users = {}
+            messages = []
+            channel_indexes = {}
+            for entry in read_channel_log(args.log):
+                author = users.setdefault(entry.author_id, FakeUser(entry.author_id, entry.author))
+                channel = channels[channel_indexes.setdefault(entry.channel, len(channel_indexes)) % len(channels)]
+                messages.append((author, channel, entry.content, None))
+            source = iter(messages)
+            total = min(args.messages, len(messages)) if args.messages else len(messages)
+        else:
+            users = [FakeUser(user_id, f"user{user_id}") for user_id in range(1, args.users + 1)]
+            source = self.scripted(channels, users)
+            total = args.messages
+
+        bot.ingest.prepare = self.prepare
+        bot.ingest.commit = self.commit
+        bot.bot_ready = True
+        bot.loop_monitor.start()
+
+        started = self.clock()
+        message_ids = itertools.count(1)
+        sent = 0
+        for author, channel, content, kind in itertools.islice(source, total):
+            if args.rate:
+                delay = started + sent / args.rate - self.clock()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            accepted = await self.offer(FakeMessage(next(message_ids), author, channel, content, args.latency))
+            sent += 1
+            if kind == 'wrong' or (kind == 'count' and not accepted):
+                # Whether the game reset is only known once the answer is judged
+                await self.resync(channel)
+
+        await self.drain()
+        judged = (self.last_judged or self.clock()) - started
+        drain_started = self.clock()
+        await bot.output.stop()
+        bot.loop_monitor.stop()
+        return sent, judged, self.clock() - drain_started, channels
+
+
+def report(test, sent, judged, drained, channels):
+    bot = test.bot
+    game_logic = bot.game_logic
+    leaderboard = game_logic.leaderboard
+    dispatcher = bot.output.reactions
+    print(f"{sent} messages offered, {test.shed} shed, judged in {judged:.2f}s "
+          f"({(sent - test.shed) / judged if judged else 0:.0f} messages/s)")
+    print(f"{leaderboard.total_correct} correct, {leaderboard.total_wrong} wrong, "
+          f"next numbers {[game_logic.get_snapshot(channel.id).next_number for channel in channels]}")
+    for stage in STAGES:
+        print(f"{stage:<11} {test.stages[stage].summary()}")
+    print(f"output: {sum(channel.sent for channel in channels)} messages sent "
+          f"({bot.output.coalesced} coalesced), {dispatcher.sent} reactions, "
+          f"{dispatcher.dropped} dropped, drained {drained:.2f}s after the last verdict")
+    report = bot.command_metrics.report()
+    if report:
+        print(report)
+    print(f"event loop {bot.loop_monitor.report()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--messages', type=int, default=1000, help="messages to send (a log: at most)")
+    parser.add_argument('--rate', type=float, default=200, help="messages per second, 0 for unthrottled")
+    parser.add_argument('--log', help="JSONL channel log to replay instead of the scripted workload")
+    parser.add_argument('--channels', type=int, default=1)
+    parser.add_argument('--users', type=int, default=50)
+    parser.add_argument('--wrong', type=float, default=0.01, help="share of wrong answers")
+    parser.add_argument('--chatter', type=float, default=0.1, help="share of chatter")
+    parser.add_argument('--commands', type=float, default=0.02, help="share of commands")
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per send or reaction")
+    parser.add_argument('--reaction-rate', type=float, default=0,
+                        help="reactions per second per channel, 0 for unlimited (Discord allows about 3.7)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--verbose', action='store_true', help="show the bot's own output")
+    args = parser.parse_args()
+
+    # In-memory development mode, with one counting channel per --channels.
+    # Set, not removed: load_dotenv() does not override what is already set, so
+    # .env cannot send the synthetic counts to the history file or turn on lazy
+    # user stats, which need the database
+    os.environ['ENVIRONMENT'] = 'dev'
+    os.environ['HISTORY_FILE_DIR'] = ''
+    os.environ['USER_CACHE_SIZE'] = '0'
+    os.environ['CHANNEL_DEV'] = '1'
+    os.environ['COUNTING_CHANNELS'] = ','.join(str(channel_id) for channel_id in range(2, args.channels + 1))
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with quiet:
+        import bot
+    from output import OutputStage, ReactionDispatcher
+    if args.reaction_rate:
+        bot.output = OutputStage(ReactionDispatcher(rate=args.reaction_rate), bot.output.coalesce_window)
+    else:
+        bot.output = OutputStage(ReactionDispatcher(rate=1e9, burst=1e9), bot.output.coalesce_window)
+
+    async def run():
+        test = LoadTest(bot, args)
+        with quiet:
+            results = await test.run()
+        report(test, *results)
+
+    asyncio.run(run())
+
+
+if __name__ == '__main__':
+    main()
@@ -1,16 +1,208 @@
 """Main entry point for the Discord counting bot."""
 
-from bot import run as run_discord
-from parser import executor
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+# Gateway shards to run. Above 1, main() supervises one worker process per
+# shard. Discord sends a shard only the guilds with
+# (guild_id >> 22) % SHARD_COUNT == shard_id, so each worker owns a fixed
+# set of channels, with its own games, parser pools and database writers.
+# A user can count in channels of several shards; workers write the counts
+# they added to the user's row rather than overwrite it (see
+# game_logic._unsaved_counts), so the database holds every shard's answers.
+# In memory, though, each worker only sees the answers given on its own
+# shard (plus what it read at startup or on a lazy load): !lb, !profile,
+# the totals and mistake messages are per shard until the worker restarts.
+SHARD_COUNT = int(os.getenv('SHARD_COUNT', 1))
+
+# Seconds without a status report before a worker is restarted; a worker
+# that is still starting up (logging in, loading state) gets longer
+HEARTBEAT_TIMEOUT = 120
+STARTUP_TIMEOUT = 600
+
+# Seconds between the supervisor's summaries of the workers' reports
+REPORT_INTERVAL = 300
+
+# Seconds before restarting a worker that stopped, doubled for every crash
+# without a report in between
+RESTART_DELAY = 5
+MAX_RESTART_DELAY = 300
+
+
+def run_bot(status_queue=None):
+    """Run the bot in this process, then flush everything it still holds."""
+    from bot import run as run_discord, shadow, loop_monitor
+    from parser import executor, parse_executor
+    import game_logic
 
-def main():
-    """Start the Discord bot."""
     try:
         # Run Discord bot in main thread
-        run_discord()        
+        run_discord(status_queue)
     finally:
+        # The loop is gone; the flushing below must not count as stalls
+        loop_monitor.stop()
         print("Shutting down thread pool...")
+        parse_executor.shutdown(wait=True)
         executor.shutdown(wait=True)
+        if shadow is not None:
+            shadow.close()
+            print(f"🔍 Shadow parser:\n{shadow.report()}")
+        if game_logic.USER_CACHE_SIZE:
+            print("Writing back cached user stats...")
+            game_logic.save_state()
+        game_logic.read_executor.shutdown(wait=True)
+        game_logic.executor.shutdown(wait=True)
+        if game_logic.history_writer is not None:
+            print("Flushing count history...")
+            game_logic.history_writer.close()
+        game_logic.close_history_files()
+
+
+def _stop(signum, frame):
+    # Stop like on Ctrl+C, so the bot still flushes its state
+    raise KeyboardInterrupt
+
+
+def run_worker(shard_id, shard_count, status_queue):
+    """Worker process: run the bot on one shard, reporting to status_queue."""
+    os.environ['SHARD_ID'] = str(shard_id)
+    os.environ['SHARD_COUNT'] = str(shard_count)
+    signal.signal(signal.SIGTERM, _stop)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # The supervisor stops workers
+    run_bot(status_queue)
+
+
+class Worker:
+    """The supervisor's view of one shard's worker process."""
+
+    def __init__(self, shard_id):
+        self.shard_id = shard_id
+        self.process = None
+        self.started = None
+        self.last_report = None
+        self.status = None
+        self.restart_delay = RESTART_DELAY
+        self.restart_at = None
+
+    def start(self, context, shard_count, status_queue, target):
+        self.process = context.Process(target=target, args=(self.shard_id, shard_count, status_queue),
+                                       name=f'shard-{self.shard_id}')
+        self.process.start()
+        self.started = time.monotonic()
+        self.last_report = None
+        self.restart_at = None
+        print(f"🚀 Started shard {self.shard_id} (pid {self.process.pid})")
+
+    def report(self, status, now):
+        self.status = status
+        self.last_report = now
+        self.restart_delay = RESTART_DELAY
+
+    def check(self, now):
+        """Stop a worker that went silent; return True if it should be started again."""
+        if self.process.is_alive():
+            if self.last_report is None:
+                silent, limit = now - self.started, STARTUP_TIMEOUT
+            else:
+                silent, limit = now - self.last_report, HEARTBEAT_TIMEOUT
+            if silent > limit:
+                print(f"⚠️ Shard {self.shard_id} sent no report for {silent:.0f}s, restarting it")
+                self.process.terminate()
+            return False
+
+        if self.restart_at is None:
+            print(f"❌ Shard {self.shard_id} exited with code {self.process.exitcode}, "
+                  f"restarting in {self.restart_delay}s")
+            self.restart_at = now + self.restart_delay
+            self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+        return now >= self.restart_at
+
+
+def summarize(workers):
+    """One line per worker plus totals, from their last reports."""
+    lines = []
+    totals = {'channels': 0, 'queued': 0, 'shed': 0, 'commands': 0, 'command_errors': 0}
+    for worker in workers:
+        status = worker.status
+        if status is None:
+            lines.append(f"shard {worker.shard_id}: no report yet")
+            continue
+        for key in totals:
+            totals[key] += status[key]
+        lines.append(f"shard {worker.shard_id}: {'ready' if status['ready'] else 'starting'}, "
+                     f"{status['latency'] * 1000:.0f} ms gateway latency, {status['channels']} channels, "
+                     f"{status['users']} users, {status['queued']} queued, {status['shed']} shed, "
+                     f"{status['pending_replies']} replies pending, {status['commands']} commands "
+                     f"({status['command_errors']} failed), {status['loop_lag'] * 1000:.0f} ms max loop lag "
+                     f"({status['loop_stalls']} stalls)")
+    lines.append(f"total: {totals['channels']} channels, {totals['queued']} queued, {totals['shed']} shed, "
+                 f"{totals['commands']} commands ({totals['command_errors']} failed)")
+    return "\n".join(lines)
+
+
+def supervise(shard_count, target=run_worker):
+    """
+    Run one worker process per shard and keep them healthy: restart workers
+    that exit or stop reporting, and log a summary of their reports.
+    """
+    import game_logic
+
+    # Migrate once here rather than racing in every worker
+    game_logic.migrate_database()
+
+    context = multiprocessing.get_context('spawn')
+    status_queue = context.Queue()
+    workers = [Worker(shard_id) for shard_id in range(shard_count)]
+    signal.signal(signal.SIGTERM, _stop)
+    try:
+        for worker in workers:
+            worker.start(context, shard_count, status_queue, target)
+
+        last_summary = time.monotonic()
+        while True:
+            try:
+                status = status_queue.get(timeout=1)
+            except queue.Empty:
+                status = None
+            now = time.monotonic()
+            if status is not None:
+                worker = workers[status['shard']]
+                # Ignore a late report from a process that was replaced
+                if status['pid'] == worker.process.pid:
+                    worker.report(status, now)
+
+            for worker in workers:
+                if worker.check(now):
+                    worker.start(context, shard_count, status_queue, target)
+
+            if now - last_summary >= REPORT_INTERVAL:
+                print(f"📈 Shards:\n{summarize(workers)}")
+                last_summary = now
+    except KeyboardInterrupt:
+        print("Stopping shards...")
+    finally:
+        for worker in workers:
+            if worker.process is not None and worker.process.is_alive():
+                worker.process.terminate()
+        for worker in workers:
+            if worker.process is not None:
+                worker.process.join(60)
+                if worker.process.is_alive():
+                    print(f"⚠️ Shard {worker.shard_id} did not stop, killing it")
+                    worker.process.kill()
+
+
+def main():
+    """Start the Discord bot, or supervise one process per shard."""
+    if SHARD_COUNT > 1:
+        supervise(SHARD_COUNT)
+    else:
+        import game_logic
+        game_logic.migrate_database()
+        run_bot()
 
 if __name__ == '__main__':
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Lightweight in-process counters and latency statistics."""
+
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+
+class LatencyStats:
+    """Call count, error count and latency of one operation."""
+
+    __slots__ = ('count', 'errors', 'total', 'max')
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds, error=False):
+        """Record one call that took `seconds`."""
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+        if error:
+            self.errors += 1
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    @property
+    def error_rate(self):
+        return self.errors / self.count if self.count else 0.0
+
+
+class Metrics:
+    """LatencyStats by name, created on first use."""
+
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self._stats = {}
+
+    def __getitem__(self, name):
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = LatencyStats()
+        return stats
+
+    def __iter__(self):
+        return iter(sorted(self._stats.items()))
+
+    @contextmanager
+    def time(self, name):
+        """Time the enclosed block under `name`; an exception counts as an error."""
+        started = self.clock()
+        try:
+            yield
+        except BaseException:
+            self[name].record(self.clock() - started, error=True)
+            raise
+        self[name].record(self.clock() - started)
+
+    def report(self):
+        """One line per operation, most expensive (total time) first."""
+        lines = []
+        for name, stats in sorted(self._stats.items(), key=lambda item: -item[1].total):
+            lines.append(f"{name}: {stats.count} calls, {stats.mean * 1000:.1f} ms mean, "
+                         f"{stats.max * 1000:.1f} ms max, {stats.error_rate:.1%} errors")
+        return "\n".join(lines)
+
+
+class Histogram:
+    """
+    Counts of values (seconds) in geometric buckets, for percentiles
+    without keeping every sample. Percentiles are accurate to one bucket
+    (a factor of `factor`).
+    """
+
+    def __init__(self, smallest=1e-5, largest=100.0, factor=1.25):
+        self.bounds = [smallest]
+        while self.bounds[-1] < largest:
+            self.bounds.append(self.bounds[-1] * factor)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, value):
+        """Record one value."""
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q):
+        """Upper bound of the bucket holding the q-th percentile (0-100); 0 when empty."""
+        if not self.count:
+            return 0.0
+        rank = q / 100 * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if count and seen >= rank:
+                return min(self.bounds[index], self.max) if index < len(self.bounds) else self.max
+        return self.max
+
+    def summary(self):
+        """Count, p50/p90/p99 and max in milliseconds, on one line."""
+        return (f"{self.count} samples, p50 {self.percentile(50) * 1000:.2f} ms, "
+                f"p90 {self.percentile(90) * 1000:.2f} ms, p99 {self.percentile(99) * 1000:.2f} ms, "
+                f"max {self.max * 1000:.2f} ms")
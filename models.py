@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Compact in-memory records for the counting bot."""
+
+from functools import lru_cache
+from constants import ACHIEVEMENT_BITS, ACHIEVEMENT_EMOJIS, PARSE_METHODS
+
+PARSE_METHOD_CODES = {method: code for code, method in enumerate(PARSE_METHODS)}
+
+# Achievements that render as an emoji, in display (alphabetical) order
+_RENDERED_ACHIEVEMENTS = [(ACHIEVEMENT_BITS[key], ACHIEVEMENT_EMOJIS[key])
+                          for key in sorted(ACHIEVEMENT_EMOJIS)]
+
+
+def achievements_to_mask(keys):
+    """Convert an iterable of achievement keys to a bitmask (unknown keys are ignored)."""
+    mask = 0
+    for key in keys:
+        mask |= ACHIEVEMENT_BITS.get(key, 0)
+    return mask
+
+
+def mask_to_achievements(mask):
+    """Convert an achievement bitmask back to a list of keys, in bit order."""
+    return [key for key, bit in ACHIEVEMENT_BITS.items() if mask & bit]
+
+
+@lru_cache(maxsize=1024)
+def achievement_emojis(mask):
+    """Render an achievement bitmask as a space separated emoji string (cached per mask)."""
+    return ' '.join(emoji for bit, emoji in _RENDERED_ACHIEVEMENTS if mask & bit)
+
+
+class UserStats:
+    """
+    Statistics for a single player.
+
+    Uses __slots__ and an integer achievement bitmask instead of a dict and a
+    set of strings; pack() gives the flat tuple used for database writes.
+    """
+
+    __slots__ = ('username', 'correct', 'wrong', 'streak', 'best_streak', 'achievements',
+                 'consecutive_wrong', 'back_to_back_violations', 'timeout_until')
+
+    def __init__(self, username, correct=0, wrong=0, streak=0, best_streak=0, achievements=0,
+                 consecutive_wrong=0, back_to_back_violations=0, timeout_until=0):
+        self.username = username
+        self.correct = correct
+        self.wrong = wrong
+        self.streak = streak
+        self.best_streak = best_streak
+        self.achievements = achievements
+        self.consecutive_wrong = consecutive_wrong
+        self.back_to_back_violations = back_to_back_violations
+        self.timeout_until = timeout_until
+
+    def __repr__(self):
+        return f"UserStats{self.pack()!r}"
+
+    def pack(self):
+        """Return the stats as a tuple, in constructor argument order."""
+        return (self.username, self.correct, self.wrong, self.streak, self.best_streak,
+                self.achievements, self.consecutive_wrong, self.back_to_back_violations,
+                self.timeout_until)
+
+    def copy(self):
+        return UserStats(*self.pack())
+
+    @classmethod
+    def from_row(cls, row):
+        """Build stats from a user_stats database row (dict cursor)."""
+        return cls(
+            row['username'],
+            row['correct'],
+            row['wrong'],
+            row['streak'],
+            row['best_streak'],
+            row['achievement_bits'],
+            row['consecutive_wrong'],
+            row['back_to_back_violations'],
+            row['timeout_until'],
+        )
+
+    @property
+    def achievement_keys(self):
+        return mask_to_achievements(self.achievements)
+
+
+class HistoryRecord:
+    """
+    One accepted count in the number history.
+
+    types is an achievement bitmask of the input types used and method a code
+    from constants.PARSE_METHODS; timestamp is a Unix epoch float.
+    """
+
+    __slots__ = ('number', 'user_id', 'timestamp', 'types', 'method')
+
+    def __init__(self, number, user_id, timestamp, types, method):
+        self.number = number
+        self.user_id = user_id
+        self.timestamp = timestamp
+        self.types = types
+        self.method = method
+
+    def __repr__(self):
+        return (f"HistoryRecord({self.number!r}, {self.user_id!r}, {self.timestamp!r}, "
+                f"{self.types!r}, {self.method!r})")
+
+    @classmethod
+    def create(cls, number, user_id, types_used, parse_method, timestamp):
+        """Build a record from parser output."""
+        return cls(number, user_id, timestamp,
+                   achievements_to_mask(types_used or ('integer',)),
+                   PARSE_METHOD_CODES.get(parse_method, 0))
+
+    @property
+    def type_keys(self):
+        return mask_to_achievements(self.types)
+
+    @property
+    def method_name(self):
+        return PARSE_METHODS[self.method]
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Event loop lag monitor with a watchdog for blocking calls."""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque, namedtuple
+from metrics import Histogram
+
+# Seconds between lag measurements
+LOOP_LAG_INTERVAL = 0.1
+
+# Lag (seconds) above which the loop counts as blocked and its stack is captured
+LOOP_LAG_THRESHOLD = 0.25
+
+# Captured stalls kept for report()
+MAX_STALLS = 10
+
+Stall = namedtuple('Stall', 'seconds stack')
+
+
+class LoopMonitor:
+    """
+    Measures how late the event loop runs a task that sleeps every
+    `interval` seconds; that lag is how long anything on the loop may
+    have waited behind a blocking call.
+
+    A watchdog thread checks the same deadline from outside the loop.
+    Once the loop is more than `threshold` late, the watchdog captures the
+    stack of the loop's thread while it is still blocked, so the stall is
+    reported with the call that caused it rather than after it returned.
+    """
+
+    def __init__(self, interval=LOOP_LAG_INTERVAL, threshold=LOOP_LAG_THRESHOLD,
+                 max_stalls=MAX_STALLS, clock=time.monotonic):
+        self.interval = interval
+        self.threshold = threshold
+        self.clock = clock
+        self.lag = Histogram()
+        self.slow = 0
+        self.stalls = deque(maxlen=max_stalls)
+        self._due = None
+        self._loop_thread = None
+        self._task = None
+        self._watchdog = None
+        self._stopping = threading.Event()
+
+    def start(self):
+        """Start measuring the running loop (again, after stop())."""
+        if self._task is not None and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._due = self.clock() + self.interval
+        self._stopping = threading.Event()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, args=(self._stopping,),
+                                          name='loop-watchdog', daemon=True)
+        self._watchdog.start()
+
+    def stop(self):
+        """Stop measuring; call before the loop is stopped on purpose."""
+        self._stopping.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _measure(self):
+        try:
+            while True:
+                self._due = self.clock() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(self.clock() - self._due, 0.0)
+                self.lag.record(lag)
+                if lag > self.threshold:
+                    self.slow += 1
+        finally:
+            # Cancelled with the loop: the watchdog has nothing left to watch
+            self._stopping.set()
+
+    def _watch(self, stopping):
+        captured = None  # Deadline whose stall was already captured
+        while not stopping.wait(self.interval):
+            due = self._due
+            late = self.clock() - due
+            if late > self.threshold and due != captured:
+                captured = due
+                self.capture(late)
+
+    def capture(self, late):
+        """Record the loop thread's current stack as a stall of `late` seconds so far."""
+        frame = sys._current_frames().get(self._loop_thread)
+        stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+        self.stalls.append(Stall(late, stack))
+        print(f"⚠️ Event loop blocked for {late * 1000:.0f} ms, in:\n{stack}")
+
+    def report(self):
+        """Lag percentiles, the number of slow ticks and the latest stall's stack."""
+        lines = [f"lag {self.lag.summary()}, {self.slow} over {self.threshold * 1000:.0f} ms"]
+        if self.stalls:
+            latest = self.stalls[-1]
+            lines.append(f"latest stall ({latest.seconds * 1000:.0f} ms so far) in:\n{latest.stack.rstrip()}")
+        return "\n".join(lines)
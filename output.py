@@ -0,0 +1,308 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Ordered output stage for the counting bot's replies."""
+
+import asyncio
+import time
+from collections import deque
+
+# Discord allows about one reaction every 0.25 s per channel; the bucket
+# keeps a small margin so network jitter does not push requests over it
+REACTION_INTERVAL = 0.25
+REACTION_RATE = 1 / (REACTION_INTERVAL + 0.02)
+REACTION_BURST = 1
+
+# Reaction requests in flight per channel at once
+REACTION_PIPELINE = 4
+
+# Queued reactions per channel above which cosmetic ones are dropped
+COSMETIC_BACKLOG = 8
+
+# Discord's limit on the text of one message
+MAX_MESSAGE_LENGTH = 2000
+
+
+class Reply:
+    """
+    Everything the bot says in response to one message, in order.
+
+    Handlers build a Reply while deciding (without awaiting anything) and
+    hand it to OutputStage.emit(); the Discord calls happen later.
+    """
+
+    __slots__ = ('message', 'channel', 'actions')
+
+    def __init__(self, message, channel=None):
+        self.message = message
+        self.channel = channel if channel is not None else message.channel
+        self.actions = []  # ('react', (emoji, cosmetic)) or ('send', (content, embed))
+
+    def __bool__(self):
+        return bool(self.actions)
+
+    def react(self, emoji, cosmetic=False):
+        """Add a reaction to the message; cosmetic ones may be dropped under load."""
+        self.actions.append(('react', (emoji, cosmetic)))
+        return self
+
+    def send(self, content=None, embed=None):
+        """Send a message (text and/or embed) to the channel."""
+        self.actions.append(('send', (content, embed)))
+        return self
+
+
+def coalesce(sends):
+    """
+    Merge [(content, embed), ...] into as few messages as possible, in order.
+    Texts are joined line by line up to MAX_MESSAGE_LENGTH and an embed
+    rides along with the text before it.
+    """
+    messages = []
+    content = embed = None
+    for text, new_embed in sends:
+        if text is not None:
+            if embed is not None or (content is not None
+                                     and len(content) + 1 + len(text) > MAX_MESSAGE_LENGTH):
+                messages.append((content, embed))
+                content = embed = None
+            content = text if content is None else f"{content}\n{text}"
+        if new_embed is not None:
+            if embed is not None:
+                messages.append((content, embed))
+                content = None
+            embed = new_embed
+    if content is not None or embed is not None:
+        messages.append((content, embed))
+    return messages
+
+
+class TokenBucket:
+    """Allows `rate` operations per second, in bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=1, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_take(self):
+        """Take a token if one is available; return True on success."""
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def wait_time(self):
+        """Seconds until a token is available."""
+        self._refill()
+        return max(0.0, (1 - self._tokens) / self.rate)
+
+    async def take(self):
+        """Wait for a token and take it."""
+        while not self.try_take():
+            await asyncio.sleep(self.wait_time())
+
+
+class _ReactionRoute:
+    """Rate limit state and queue of one channel's reactions."""
+
+    __slots__ = ('bucket', 'slots', 'queue', 'task')
+
+    def __init__(self, rate, burst, pipeline):
+        self.bucket = TokenBucket(rate, burst)
+        self.slots = asyncio.Semaphore(pipeline)
+        self.queue = deque()  # (message, emoji)
+        self.task = None
+
+
+class ReactionDispatcher:
+    """
+    Adds reactions concurrently, within Discord's per-channel rate limit.
+
+    Every channel (the bucket Discord uses for the reaction route) gets a
+    token bucket and a queue served by its own task. A request starts as
+    soon as a token is available, with up to `pipeline` in flight, instead
+    of waiting for the previous response. Duplicate emojis for a message
+    are skipped, and cosmetic reactions are dropped while a channel's queue
+    is backed up.
+    """
+
+    def __init__(self, rate=REACTION_RATE, burst=REACTION_BURST,
+                 pipeline=REACTION_PIPELINE, cosmetic_backlog=COSMETIC_BACKLOG):
+        self.rate = rate
+        self.burst = burst
+        self.pipeline = pipeline
+        self.cosmetic_backlog = cosmetic_backlog
+        self._routes = {}  # channel id -> _ReactionRoute
+        self._requests = set()
+        self.sent = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def dispatch(self, message, reactions):
+        """Queue [(emoji, cosmetic), ...] for a message, in order."""
+        channel_id = message.channel.id
+        route = self._routes.get(channel_id)
+        if route is None:
+            route = self._routes[channel_id] = _ReactionRoute(self.rate, self.burst, self.pipeline)
+        
+        seen = set()
+        for emoji, cosmetic in reactions:
+            if emoji in seen:
+                continue
+            seen.add(emoji)
+            if cosmetic and len(route.queue) >= self.cosmetic_backlog:
+                self.dropped += 1
+                continue
+            route.queue.append((message, emoji))
+        
+        if route.queue and route.task is None:
+            route.task = asyncio.get_running_loop().create_task(self._serve(route))
+
+    def backlog(self):
+        """Number of reactions queued and not started yet."""
+        return sum(len(route.queue) for route in self._routes.values())
+
+    async def drain(self):
+        """Wait until every queued reaction has been sent (or has failed)."""
+        while True:
+            tasks = [route.task for route in self._routes.values() if route.task is not None]
+            tasks.extend(self._requests)
+            if not tasks:
+                return
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _serve(self, route):
+        loop = asyncio.get_running_loop()
+        try:
+            while route.queue:
+                await route.bucket.take()
+                await route.slots.acquire()
+                message, emoji = route.queue.popleft()
+                request = loop.create_task(self._react(route, message, emoji))
+                self._requests.add(request)
+                request.add_done_callback(self._requests.discard)
+        finally:
+            route.task = None
+
+    async def _react(self, route, message, emoji):
+        try:
+            await message.add_reaction(emoji)
+            self.sent += 1
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Error adding reaction {emoji}: {e}")
+        finally:
+            route.slots.release()
+
+
+class _OutputRoute:
+    """Queue of one channel's replies and the task delivering them."""
+
+    __slots__ = ('queue', 'task')
+
+    def __init__(self):
+        self.queue = asyncio.Queue()
+        self.task = None
+
+
+class OutputStage:
+    """
+    Delivers Replies in the order they were emitted, per channel.
+
+    emit() only queues, so the state lock is never held across Discord API
+    latency. Every channel gets its own queue and task making the calls,
+    like the channel's game gets its own actor: replies keep the order
+    their messages were judged in, and a channel whose sends are slow or
+    rate limited does not hold up the others. Reactions are handed to a
+    ReactionDispatcher and go out concurrently with the messages. A failing
+    call is logged and skipped.
+
+    The messages of a reply are coalesced into as few sends as possible.
+    With a coalesce_window (seconds) a channel's task also waits that long
+    after a reply and merges the messages of every reply queued meanwhile,
+    which saves API calls when the channel is busy.
+    """
+
+    def __init__(self, reactions=None, coalesce_window=0):
+        self.reactions = reactions if reactions is not None else ReactionDispatcher()
+        self.coalesce_window = coalesce_window
+        self._routes = {}  # channel id -> _OutputRoute
+        self.sent = 0
+        self.coalesced = 0
+
+    def emit(self, reply):
+        """Queue a Reply for delivery; empty replies are dropped."""
+        if not reply:
+            return
+        route = self._routes.get(reply.channel.id)
+        if route is None:
+            route = self._routes[reply.channel.id] = _OutputRoute()
+        if route.task is None or route.task.done():
+            route.task = asyncio.get_running_loop().create_task(self._run(route))
+        route.queue.put_nowait(reply)
+
+    def pending(self):
+        """Number of replies waiting to be delivered, over all channels."""
+        return sum(route.queue.qsize() for route in self._routes.values())
+
+    async def stop(self):
+        """Deliver the queued replies and reactions, then stop."""
+        tasks = []
+        for route in self._routes.values():
+            if route.task is not None and not route.task.done():
+                route.queue.put_nowait(None)
+                tasks.append(route.task)
+        await asyncio.gather(*tasks)
+        self._routes.clear()
+        await self.reactions.drain()
+
+    async def _run(self, route):
+        queue = route.queue
+        while True:
+            reply = await queue.get()
+            if reply is None:
+                return
+            replies = [reply]
+            stopping = False
+            if self.coalesce_window > 0:
+                await asyncio.sleep(self.coalesce_window)
+                while not queue.empty():
+                    reply = queue.get_nowait()
+                    if reply is None:
+                        stopping = True
+                        break
+                    replies.append(reply)
+            await self._deliver(replies)
+            if stopping:
+                return
+
+    async def _deliver(self, replies):
+        sends_by_channel = {}
+        for reply in replies:
+            reactions = [payload for kind, payload in reply.actions if kind == 'react']
+            if reactions:
+                self.reactions.dispatch(reply.message, reactions)
+            sends = [payload for kind, payload in reply.actions if kind == 'send']
+            if sends:
+                sends_by_channel.setdefault(reply.channel, []).extend(sends)
+        
+        for channel, sends in sends_by_channel.items():
+            messages = coalesce(sends)
+            self.coalesced += len(sends) - len(messages)
+            for content, embed in messages:
+                try:
+                    if embed is not None:
+                        await channel.send(content, embed=embed)
+                    else:
+                        await channel.send(content)
+                    self.sent += 1
+                except Exception as e:
+                    print(f"❌ Error sending reply: {e}")
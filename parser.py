@@ -6,6 +6,7 @@ import re
 import math
 import random
 import concurrent.futures
+import threading
 from word2number import w2n
 from simpleeval import simple_eval, NumberTooHigh
 from constants import MATH_CONSTANTS, MULTILANG_NUMBERS, ROMAN_NUMERALS
@@ -13,6 +14,25 @@ from constants import MATH_CONSTANTS, MULTILANG_NUMBERS, ROMAN_NUMERALS
 # Thread pool for safe expression evaluation
 executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
 
+# Per thread replacement of executor (see set_evaluation_executor)
+_evaluation = threading.local()
+
+# Thread pool for interpreting messages off the event loop (see interpret_message)
+parse_executor = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+
+
+def set_evaluation_executor(pool):
+    """
+    Evaluate the expressions of messages parsed in the calling thread on
+    pool rather than on executor, e.g. so a shadow engine does not compete
+    with the live parser for it.
+    """
+    _evaluation.executor = pool
+
+
+def _evaluation_executor():
+    return getattr(_evaluation, 'executor', executor)
+
 
 def evaluate_expression_safe(expression):
     """Safely evaluate a mathematical expression."""
@@ -491,7 +511,7 @@ def get_all_possible_interpretations(text):
             expr_processed, expr_languages = preprocess_expression(math_version)
             all_languages_math = set(expr_languages)
             
-            future = executor.submit(evaluate_expression_safe, process_factorials(expr_processed))
+            future = _evaluation_executor().submit(evaluate_expression_safe, process_factorials(expr_processed))
             result = future.result(timeout=0.5)
             
             if result is not None and isinstance(result, (int, float)):
@@ -516,7 +536,7 @@ def get_all_possible_interpretations(text):
             all_languages.update(expr_languages)
             expr_with_factorials = process_factorials(expr_processed)
             
-            future = executor.submit(evaluate_expression_safe, expr_with_factorials)
+            future = _evaluation_executor().submit(evaluate_expression_safe, expr_with_factorials)
             result = future.result(timeout=0.5)
             
             if result is not None and isinstance(result, (int, float)):
@@ -578,32 +598,55 @@ def get_all_possible_interpretations(text):
     return interpretations
     
 
-def parse_number_with_context(text, expected_number):
-    """Parse a number from text with context awareness."""
+def interpret_number(text):
+    """
+    Do the expensive, context-free part of parsing a number.
+    Returns (result, candidates) for select_number(): result is a finished
+    parse when it cannot depend on the expected number, otherwise
+    candidates holds (interpretations, input_types).
+    """
     text = text.strip()
     
     if not starts_with_parseable(text):
-        return None, set(), 'starts_with_non_parseable', None, set()
+        return (None, set(), 'starts_with_non_parseable', None, set()), None
     
     if re.match(r'^\d+$', text):
-        return int(text), {'integer'}, 'simple_integer', None, set()
+        return (int(text), {'integer'}, 'simple_integer', None, set()), None
     
     if re.match(r'^[-+]?\d*[.,]\d+$', text):
         try:
             value = float(text.replace(',', '.'))
             rounded = round(value)
             if rounded > 0:
-                return rounded, {'decimal'}, 'simple_decimal', None, set()
+                return (rounded, {'decimal'}, 'simple_decimal', None, set()), None
         except ValueError:
             pass
     
     interpretations = get_all_possible_interpretations(text)
     
     if not interpretations:
-        return None, set(), 'no_valid_interpretation', None, set()
+        return (None, set(), 'no_valid_interpretation', None, set()), None
     
     if interpretations[0][1] == 'evaluation_timeout':
-        return None, set(), 'evaluation_timeout', None, set()
+        return (None, set(), 'evaluation_timeout', None, set()), None
+    
+    return None, (interpretations, analyze_input_types(text))
+
+
+def candidate_numbers(interpreted):
+    """Return the numbers an interpret_number() result can select to."""
+    result, candidates = interpreted
+    if result is not None:
+        return {result[0]} if result[0] is not None else set()
+    return {interp[0] for interp in candidates[0]}
+
+
+def select_number(interpreted, expected_number):
+    """Pick the number for expected_number from an interpret_number() result (cheap)."""
+    result, candidates = interpreted
+    if result is not None:
+        return result
+    interpretations, input_types = candidates
     
     # CRITICAL: Check for context matches FIRST
     context_matches = [interp for interp in interpretations if interp[0] == expected_number]
@@ -617,11 +660,11 @@ def parse_number_with_context(text, expected_number):
         for preferred_type in priority_order:
             for value, interp_type, desc, random_info, languages in context_matches:
                 if interp_type == preferred_type:
-                    return (value, analyze_input_types(text), f'context_match_{interp_type}', 
+                    return (value, input_types, f'context_match_{interp_type}', 
                            random_info, languages)
         
         # If no preferred type found, return first context match
-        return (context_matches[0][0], analyze_input_types(text), 
+        return (context_matches[0][0], input_types, 
                f'context_match_{context_matches[0][1]}', 
                context_matches[0][3], context_matches[0][4])
     
@@ -630,11 +673,16 @@ def parse_number_with_context(text, expected_number):
                       'constant', 'extracted', 'multilang']:
         for interp in interpretations:
             if interp[1] == prio_type:
-                return (interp[0], analyze_input_types(text), f'priority_{prio_type}', 
+                return (interp[0], input_types, f'priority_{prio_type}', 
                        interp[3], interp[4])
     
     value, interp_type, desc, random_info, languages = interpretations[0]
-    return value, analyze_input_types(text), f'fallback_{interp_type}', random_info, languages
+    return value, input_types, f'fallback_{interp_type}', random_info, languages
+
+
+def parse_number_with_context(text, expected_number):
+    """Parse a number from text with context awareness."""
+    return select_number(interpret_number(text), expected_number)
 
 
 def parse_multiple_numbers_with_context(text, expected_start):
@@ -692,4 +740,105 @@ def parse_multiple_numbers_with_context(text, expected_start):
         all_types.add('multiple')
     
     return (parsed_numbers, all_types, 'multiple_consecutive' if len(parsed_numbers) > 1 else 'single', 
-            all_random_info if all_random_info else None, all_languages, len(parsed_numbers))
\ No newline at end of file
+            all_random_info if all_random_info else None, all_languages, len(parsed_numbers))
+
+
+def parse_message_with_context(text, expected):
+    """
+    Parse a message the direct way: consecutive numbers, else one number.
+    Returns the same tuple as ParsedMessage.select(), which must agree with it.
+    """
+    multiple = parse_multiple_numbers_with_context(text, expected)
+    if multiple[0]:
+        return multiple
+    num, types, method, random_info, languages = parse_number_with_context(text, expected)
+    if num is None:
+        return None, types, method, random_info, languages, 0
+    return [num], types, method, random_info, languages, 1
+
+
+class ParsedMessage:
+    """
+    A message interpreted without context, plus its selection for one next number.
+
+    interpret_message() does the expensive work (evaluation, word parsing)
+    once; select() only picks among the stored interpretations, so it is
+    cheap to redo when the next number changed while the message was parsed.
+    """
+    
+    __slots__ = ('parts', 'whole', 'expected', 'selection')
+    
+    def __init__(self, parts, whole):
+        self.parts = parts  # interpret_number() results of the leading parts
+        self.whole = whole  # interpret_number() result of the whole message
+        self.expected = None
+        self.selection = None
+    
+    def select(self, expected):
+        """
+        Return (numbers, types, parse_method, random_info, languages, count)
+        for the given next number, like parse_multiple_numbers_with_context()
+        falling back to parse_number_with_context(). numbers is None if the
+        message holds no number.
+        """
+        if expected != self.expected or self.selection is None:
+            self.selection = self._select(expected)
+            self.expected = expected
+        return self.selection
+    
+    def _select(self, expected):
+        parsed_numbers = []
+        all_types = set()
+        all_languages = set()
+        all_random_info = []
+        
+        current_expected = expected
+        for part in self.parts:
+            num, types, method, random_info, languages = select_number(part, current_expected)
+            if num is None or num != current_expected:
+                break
+            parsed_numbers.append(num)
+            all_types.update(types)
+            all_languages.update(languages)
+            if random_info:
+                all_random_info.extend(random_info)
+            current_expected += 1
+        
+        if parsed_numbers:
+            if len(parsed_numbers) > 1:
+                all_types.add('multiple')
+            return (parsed_numbers, all_types,
+                    'multiple_consecutive' if len(parsed_numbers) > 1 else 'single',
+                    all_random_info if all_random_info else None, all_languages, len(parsed_numbers))
+        
+        # Fall back to reading the whole message as one number
+        num, types, method, random_info, languages = select_number(self.whole, expected)
+        if num is None:
+            return None, types, method, random_info, languages, 0
+        return [num], types, method, random_info, languages, 1
+
+
+def interpret_message(text):
+    """
+    Interpret a message for ParsedMessage.select(), without knowing the next number.
+    Slow (may evaluate expressions), so run it in parse_executor.
+    """
+    text = text.strip()
+    
+    # Same split and 10 number limit as parse_multiple_numbers_with_context()
+    parts = [part.strip() for part in re.split(r'\s+', text)[:10] if part.strip()]
+    
+    interpreted_parts = []
+    whole = None
+    for part in parts:
+        interpreted = interpret_number(part)
+        if part == text:
+            whole = interpreted
+        # A part that cannot be any number ends every consecutive run
+        if not candidate_numbers(interpreted):
+            break
+        interpreted_parts.append(interpreted)
+    
+    if whole is None:
+        whole = interpret_number(text)
+    return ParsedMessage(interpreted_parts, whole)
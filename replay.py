@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+Replay an exported channel log through the parser and game logic.
+
+The log is JSONL, one message per line:
+
+    {"author": "alice", "content": "12", "timestamp": 1700000000.0}
+
+with optional "author_id" (otherwise ids are given out by author name)
+and "channel" (messages without one share the default channel). Timestamps
+are Unix seconds or ISO 8601 strings (without a zone they are UTC).
+Messages are judged with the same rules as the bot's on_message, without
+Discord or the database: authors in timeout are refused, commands are
+skipped (except !testing, which changes the game), and everything else is
+interpreted and committed. Time is the log's timestamps, and --seed
+fixes the coin flips, so the same log always gives the same outcome.
+
+Writes one verdict per message (--verdicts), the final state (--state),
+and reports messages per second. With --compare, the verdicts are
+checked against a previous run's, e.g. of another parser version:
+
+    python replay.py export.jsonl --verdicts new.jsonl --compare old.jsonl
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import random
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime, timezone
+
+LogEntry = namedtuple('LogEntry', 'author_id author content timestamp channel')
+
+# Differences shown by --compare
+MAX_DIFFERENCES_SHOWN = 20
+
+
+def parse_timestamp(value):
+    """Unix seconds from a log timestamp: a number, or a string of one or in ISO 8601."""
+    if value is None or isinstance(value, (int, float)):
+        return value
+    try:
+        return float(value)
+    except ValueError:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def read_channel_log(path):
+    """Yield the LogEntries of a JSONL channel log."""
+    author_ids = {}
+    with open(path, encoding='utf-8') as log:
+        for line in log:
+            if not line.strip():
+                continue
+            entry = json.loads(line)
+            author = str(entry['author'])
+            author_id = entry.get('author_id') or author_ids.setdefault(author, len(author_ids) + 1)
+            yield LogEntry(int(author_id), author, entry['content'], parse_timestamp(entry.get('timestamp')),
+                           entry.get('channel'))
+
+
+class ReplayClock:
+    """The game's clock during a replay, so timeouts follow the log's timestamps."""
+
+    def __init__(self):
+        self.now = None
+
+    def __call__(self):
+        return self.now if self.now is not None else time.time()
+
+    @contextlib.contextmanager
+    def installed(self, game_logic):
+        """Make this the clock of game_logic (see game_logic.clock) meanwhile."""
+        previous, game_logic.clock = game_logic.clock, self
+        try:
+            yield self
+        finally:
+            game_logic.clock = previous
+
+
+def judge(entry, game_logic, interpret_message, find_command, check_user_timeout):
+    """Judge one message like on_message; return its verdict as a dict."""
+    content = entry.content.strip()
+    channel_id = entry.channel
+    verdict = {'author': entry.author, 'content': entry.content}
+
+    user_stat = game_logic.get_snapshot().user_stats.get(entry.author_id)
+    is_timeout, _ = check_user_timeout(user_stat, game_logic.clock())
+    if is_timeout:
+        verdict['verdict'] = 'timeout'
+        return verdict
+
+    command = find_command(content)
+    if command is not None:
+        verdict['verdict'] = 'command'
+        if command.name == '!testing':
+            verdict['testing_mode'] = game_logic.toggle_testing_mode(channel_id)
+        return verdict
+
+    parsed = interpret_message(content)
+
+    selection, outcome = game_logic.commit_parsed(entry.author_id, entry.author, parsed, content, channel_id)
+    numbers, types_used, parse_method, _, _, _ = selection
+    verdict['method'] = parse_method
+    if outcome is None:
+        verdict['verdict'] = 'ignored'
+        return verdict
+    verdict.update(verdict=outcome.result, numbers=outcome.numbers, expected=outcome.expected,
+                   types=sorted(types_used))
+    if outcome.result == 'wrong':
+        verdict['reset'] = outcome.should_reset
+    return verdict
+
+
+def final_state(game_logic):
+    """The games and user stats after the replay, as plain data."""
+    return {
+        'channels': {
+            str(channel_id): {
+                'next_number': game.next_number,
+                'last_correct_user': game.last_correct_user,
+                'total_correct': game.total_correct,
+                'last_streak_milestone': game.last_streak_milestone,
+                'testing_mode': game.testing_mode,
+            }
+            for channel_id, game in sorted(game_logic.games.items(), key=lambda item: str(item[0]))
+        },
+        'users': {
+            str(user_id): {
+                'username': stats.username,
+                'correct': stats.correct,
+                'wrong': stats.wrong,
+                'streak': stats.streak,
+                'best_streak': stats.best_streak,
+                'achievements': sorted(stats.achievement_keys),
+            }
+            for user_id, stats in sorted(game_logic.user_stats.items())
+        },
+    }
+
+
+def compare(verdicts, path):
+    """Print how verdicts differ from those in a previous run's file; return the count."""
+    with open(path, encoding='utf-8') as previous_file:
+        previous = [json.loads(line) for line in previous_file if line.strip()]
+    differences = [(index, old, new) for index, (old, new) in enumerate(zip(previous, verdicts)) if old != new]
+    if len(previous) != len(verdicts):
+        print(f"⚠️ {len(previous)} verdicts in {path}, {len(verdicts)} now")
+    print(f"{len(differences)} of {min(len(previous), len(verdicts))} verdicts differ from {path}")
+    for index, old, new in differences[:MAX_DIFFERENCES_SHOWN]:
+        print(f"  #{index} {new['content']!r}:\n    was {json.dumps(old, ensure_ascii=False)}"
+              f"\n    now {json.dumps(new, ensure_ascii=False)}")
+    return len(differences)
+
+
+def replay(entries, seed=0, verbose=False):
+    """
+    Judge every entry in order; return (verdicts, final state, seconds spent).
+    Imports the game in development mode, so call it once per process.
+    """
+    # Set, not removed: load_dotenv() would put a removed variable back from
+    # .env, and the replay's counts would go to the real history file. Lazy
+    # user stats would load every author from the database, which dev mode
+    # does not have
+    os.environ['ENVIRONMENT'] = 'dev'
+    os.environ['HISTORY_FILE_DIR'] = ''
+    os.environ['USER_CACHE_SIZE'] = '0'
+    quiet = contextlib.nullcontext() if verbose else contextlib.redirect_stdout(open(os.devnull, 'w'))
+    with quiet:
+        import game_logic
+        from parser import interpret_message
+        from commands import find_command
+        from utils import check_user_timeout
+
+    random.seed(seed)
+    verdicts = []
+    clock = ReplayClock()
+    with clock.installed(game_logic), quiet:
+        started = time.perf_counter()
+        for entry in entries:
+            clock.now = entry.timestamp
+            verdicts.append(judge(entry, game_logic, interpret_message, find_command, check_user_timeout))
+        elapsed = time.perf_counter() - started
+    return verdicts, final_state(game_logic), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('log', help="JSONL channel log")
+    parser.add_argument('--verdicts', help="write one verdict per message to this JSONL file")
+    parser.add_argument('--state', help="write the final state to this JSON file")
+    parser.add_argument('--compare', help="verdicts of a previous run to compare with")
+    parser.add_argument('--seed', type=int, default=0, help="seed for the coin flips and random()")
+    parser.add_argument('--verbose', action='store_true', help="show the game's own output")
+    args = parser.parse_args()
+
+    entries = list(read_channel_log(args.log))
+    verdicts, state, elapsed = replay(entries, args.seed, args.verbose)
+
+    counts = {}
+    for verdict in verdicts:
+        counts[verdict['verdict']] = counts.get(verdict['verdict'], 0) + 1
+    print(f"{len(entries)} messages in {elapsed:.2f}s ({len(entries) / elapsed if elapsed else 0:.0f} messages/s)")
+    print(", ".join(f"{count} {name}" for name, count in sorted(counts.items())))
+    for channel_id, game in state['channels'].items():
+        print(f"channel {channel_id}: next number {game['next_number']}")
+
+    if args.verdicts:
+        with open(args.verdicts, 'w', encoding='utf-8') as out:
+            for verdict in verdicts:
+                out.write(json.dumps(verdict, ensure_ascii=False) + "\n")
+    if args.state:
+        with open(args.state, 'w', encoding='utf-8') as out:
+            json.dump(state, out, ensure_ascii=False, indent=2)
+    if args.compare and compare(verdicts, args.compare):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
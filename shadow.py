@@ -0,0 +1,128 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""Shadow runs of a candidate parser engine next to the live one."""
+
+import concurrent.futures
+import json
+import time
+from collections import deque
+from metrics import Histogram
+from parser import ParsedMessage, parse_message_with_context, set_evaluation_executor
+
+# Candidate parser engines: fn(text, expected) -> the tuple
+# ParsedMessage.select() returns. 'direct' is
+# parse_number_with_context/parse_multiple_numbers_with_context.
+ENGINES = {
+    'direct': parse_message_with_context,
+}
+
+# Name of the bot's own parser in timings and divergences
+LIVE = 'live'
+
+# Shadow runs waiting at most; further messages are not checked
+SHADOW_BACKLOG = 100
+
+# Divergences kept in memory for report()
+MAX_DIVERGENCES = 50
+
+
+def _jsonable(selection):
+    numbers, types, method, random_info, languages, count = selection
+    return {'numbers': numbers, 'types': sorted(types), 'method': method,
+            'languages': sorted(languages), 'count': count}
+
+
+class ShadowParser:
+    """
+    Checks a candidate engine against the live parser on real messages.
+
+    observe() takes a judged message as the bot interpreted it and how
+    long interpret_message() took, and hands it to one background thread.
+    That thread times the live selection for the expected number, so the
+    live timing covers the same work as the candidate's full parse with
+    context, then runs and times the candidate and records a divergence
+    if its result differs from the live selection. The
+    candidate evaluates expressions on its own pool, so it never competes
+    with the live parser for parser.executor. Nothing is awaited on the
+    message path, and once `backlog` messages wait further ones are
+    skipped. Messages using random() cannot be compared and are skipped
+    as well. Both engines are timed on the checked messages only.
+
+    Divergences are kept (the latest `max_divergences`) and, with a
+    log_path, appended to a JSONL file with the offending input.
+    """
+
+    def __init__(self, candidate, engines=ENGINES, log_path=None,
+                 backlog=SHADOW_BACKLOG, max_divergences=MAX_DIVERGENCES):
+        self.candidate_name = candidate
+        self.candidate = engines[candidate]
+        self.log_path = log_path
+        self.backlog = backlog
+        self._evaluations = concurrent.futures.ThreadPoolExecutor(max_workers=1,
+                                                                  thread_name_prefix='shadow-eval')
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix='shadow',
+            initializer=set_evaluation_executor, initargs=(self._evaluations,))
+        # Each written by one thread only: observe() and the shadow thread
+        self._submitted = 0
+        self._done = 0
+        self.timings = {LIVE: Histogram(), candidate: Histogram()}
+        self.divergences = deque(maxlen=max_divergences)
+        self.checked = 0
+        self.diverged = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def observe(self, text, expected, parsed, interpret_seconds=None):
+        """
+        Check the candidate on a message the bot interpreted to parsed,
+        taking interpret_seconds, and judged for expected.
+        """
+        selection = parsed.select(expected)
+        if self._submitted - self._done >= self.backlog or selection[3]:
+            self.skipped += 1
+            return
+        self._submitted += 1
+        self._executor.submit(self._check, text, expected, parsed, selection, interpret_seconds)
+
+    def close(self):
+        """Finish the queued checks and stop the threads."""
+        self._executor.shutdown(wait=True)
+        self._evaluations.shutdown(wait=True)
+
+    def _check(self, text, expected, parsed, selection, interpret_seconds):
+        try:
+            if interpret_seconds is not None:
+                # A fresh copy, as parsed has its selection for expected cached
+                started = time.perf_counter()
+                ParsedMessage(parsed.parts, parsed.whole).select(expected)
+                self.timings[LIVE].record(interpret_seconds + time.perf_counter() - started)
+            started = time.perf_counter()
+            result = self.candidate(text, expected)
+            self.timings[self.candidate_name].record(time.perf_counter() - started)
+            self.checked += 1
+            live = _jsonable(selection)
+            candidate = _jsonable(result)
+            if live != candidate:
+                self.diverged += 1
+                divergence = {'input': text, 'expected': expected,
+                              LIVE: live, self.candidate_name: candidate}
+                self.divergences.append(divergence)
+                if self.log_path:
+                    with open(self.log_path, 'a', encoding='utf-8') as log:
+                        log.write(json.dumps(divergence, ensure_ascii=False) + "\n")
+        except Exception as e:
+            self.failed += 1
+            print(f"❌ Shadow parser {self.candidate_name} failed on {text!r}: {e}")
+        finally:
+            self._done += 1
+
+    def report(self):
+        """Counts, the timings of both engines and the latest divergence."""
+        lines = [f"{self.candidate_name} vs {LIVE}: {self.checked} checked, "
+                 f"{self.diverged} diverged, {self.skipped} skipped, {self.failed} failed"]
+        for name, histogram in self.timings.items():
+            lines.append(f"{name:<8} {histogram.summary()}")
+        if self.divergences:
+            lines.append(f"latest divergence: {json.dumps(self.divergences[-1], ensure_ascii=False)}")
+        return "\n".join(lines)
@@ -0,0 +1,52 @@
+"""Unit tests for the state actor."""
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from actor import StateActor
+
+
+class StateActorTest(unittest.TestCase):
+    """Unit tests for the serial game state actor"""
+
+    def test_runs_commands_in_order(self):
+        """Test commands run one at a time in submission order"""
+        order = []
+
+        async def scenario():
+            actor = StateActor()
+            first = actor.submit(order.append, 1)
+            second = actor.call(order.append, 2)
+            self.assertEqual(order, [])  # Nothing runs until the caller yields
+            await asyncio.gather(second, first)
+            self.assertEqual(await actor.call(len, order), 2)
+            await actor.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(order, [1, 2])
+
+    def test_errors_reach_the_caller(self):
+        """Test a failing command raises in its caller and the actor keeps going"""
+        async def scenario():
+            actor = StateActor()
+            # Not assertRaises: it clears the traceback frames, which
+            # would finalize the actor's own suspended task
+            try:
+                await actor.call(divmod, 1, 0)
+                raised = False
+            except ZeroDivisionError:
+                raised = True
+            result = await actor.call(divmod, 7, 2)
+            await actor.stop()
+            return raised, result
+
+        self.assertEqual(asyncio.run(scenario()), (True, (3, 1)))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,155 @@
+"""Unit tests for the bot's message pipeline."""
+
+import unittest
+import asyncio
+import contextlib
+import io
+import time
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Never touch the database or a real channel from tests
+os.environ['ENVIRONMENT'] = 'dev'
+os.environ.setdefault('CHANNEL_DEV', '0')
+
+import bot
+import game_logic
+from actor import StateActor
+from ingest import Ingest
+from output import OutputStage
+from models import UserStats
+
+
+class FakeUser:
+    def __init__(self, user_id):
+        self.id = user_id
+        self.name = self.display_name = f'user{user_id}'
+        self.mention = f'<@{user_id}>'
+
+
+class FakeChannel:
+    """Records what is sent to it"""
+
+    def __init__(self, log):
+        self.id = game_logic.DEFAULT_CHANNEL_ID
+        self.log = log
+
+    async def send(self, content=None, embed=None):
+        self.log.append(('send', content, embed))
+
+
+class FakeMessage:
+    """Records reactions added to it"""
+
+    def __init__(self, message_id, user_id, content, channel):
+        self.id = message_id
+        self.author = FakeUser(user_id)
+        self.content = content
+        self.channel = channel
+        self.mentions = []
+
+    async def add_reaction(self, emoji):
+        self.channel.log.append(('react', self.id, emoji))
+
+
+class PipelineTest(unittest.TestCase):
+    """Unit tests for prepare_message and commit_message run through bot.ingest"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        self.saved = (bot.state_actor, bot.channel_actors, bot.output, bot.ingest, bot.shadow,
+                      game_logic.commit_parsed)
+        # Actors and queues are bound to the event loop of the test that uses them
+        bot.state_actor = StateActor()
+        bot.channel_actors = {}
+        bot.output = OutputStage()
+        bot.ingest = Ingest(bot.prepare_message, bot.commit_message, is_chatter=bot.is_chatter)
+        self.log = []
+        self.channel = FakeChannel(self.log)
+
+    def tearDown(self):
+        (bot.state_actor, bot.channel_actors, bot.output, bot.ingest, bot.shadow,
+         game_logic.commit_parsed) = self.saved
+        game_logic.reset_game(preserve_stats=False)
+
+    def _run(self, messages):
+        """Offer (user id, content) messages in order and wait until every reply is out."""
+        async def run():
+            for message_id, (user_id, content) in enumerate(messages, 1):
+                self.assertTrue(bot.ingest.offer(FakeMessage(message_id, user_id, content, self.channel)))
+            await bot.ingest.drain()
+            await bot.output.stop()
+            for actor in [bot.state_actor, *bot.channel_actors.values()]:
+                await actor.stop()
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            asyncio.run(run())
+        return output.getvalue()
+
+    def _reactions(self, message_id):
+        return [entry[2] for entry in self.log if entry[0] == 'react' and entry[1] == message_id]
+
+    def test_answers_are_judged_in_arrival_order(self):
+        """Test answers prepared concurrently are committed in the order they arrived"""
+        self._run([(1, '1'), (2, 'one + one'), (1, '3'), (2, '2 + 2')])
+        self.assertEqual(game_logic.get_snapshot().next_number, 5)
+        self.assertEqual(game_logic.user_stats[1].correct, 2)
+        self.assertEqual(game_logic.user_stats[2].correct, 2)
+        for message_id in range(1, 5):
+            self.assertIn('✅', self._reactions(message_id))
+
+    def test_timeout_is_checked_before_commands(self):
+        """Test an author in timeout gets neither their command nor their answer"""
+        game_logic.install_user_stats(1, UserStats('user1', timeout_until=time.time() + 60))
+        self._run([(1, '!lb'), (1, '1'), (2, '!lb')])
+
+        sends = [entry for entry in self.log if entry[0] == 'send']
+        self.assertEqual(len(sends), 3)
+        self.assertIn('timeout', sends[0][1])
+        self.assertIn('timeout', sends[1][1])
+        self.assertIsNotNone(sends[2][2])  # The leaderboard embed
+        self.assertEqual(self._reactions(1), ['⏰'])
+        self.assertEqual(game_logic.get_snapshot().next_number, 1)
+
+    def test_reloads_an_evicted_author(self):
+        """Test an answer whose author was evicted is retried, then skipped if it keeps failing"""
+        commit_parsed = game_logic.commit_parsed
+        calls = []
+
+        def evicted_once(user_id, *args):
+            calls.append(user_id)
+            return None if len(calls) == 1 else commit_parsed(user_id, *args)
+
+        game_logic.commit_parsed = evicted_once
+        self._run([(1, '1')])
+        self.assertEqual(calls, [1, 1])
+        self.assertEqual(game_logic.get_snapshot().next_number, 2)
+
+        calls.clear()
+        game_logic.commit_parsed = lambda user_id, *args: calls.append(user_id)
+        output = self._run([(2, '2')])
+        self.assertEqual(len(calls), bot.COMMIT_ATTEMPTS)
+        self.assertIn("skipped '2'", output)
+        self.assertEqual(game_logic.get_snapshot().next_number, 2)
+
+    def test_shadow_observes_the_live_selection(self):
+        """Test the shadow parser gets the message as judged and the live parse time"""
+        observed = []
+
+        class Shadow:
+            def observe(self, *args):
+                observed.append(args)
+
+        bot.shadow = Shadow()
+        self._run([(1, '1'), (2, 'hello')])
+        self.assertEqual([(text, expected, parsed.select(expected)[0]) for text, expected, parsed, _ in observed],
+                         [('1', 1, [1]), ('hello', 2, None)])
+        self.assertTrue(all(seconds > 0 for *_, seconds in observed))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
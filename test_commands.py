@@ -0,0 +1,179 @@
+"""Unit tests for the bot commands."""
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Never touch the database or a real channel from tests
+os.environ['ENVIRONMENT'] = 'dev'
+os.environ.setdefault('CHANNEL_DEV', '0')
+
+import game_logic
+import commands
+from actor import StateActor
+from output import Reply
+from metrics import Metrics, Histogram
+
+
+class EmbedCacheTest(unittest.TestCase):
+    """Unit tests for the leaderboard and profile embed caches"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        commands._leaderboard_embed = (None, None)
+        commands._profile_embeds.clear()
+
+    def _count(self, user_id, number):
+        game_logic.commit_answer(user_id, f'user{user_id}', [number], str(number),
+                                 {'integer'}, 'simple_integer', set())
+
+    def test_leaderboard_embed_cached_per_version(self):
+        """Test the leaderboard is rendered again only after the state changed"""
+        self._count(1, 1)
+        embed = commands.get_leaderboard_embed()
+        self.assertIs(commands.get_leaderboard_embed(), embed)
+        self.assertIsNone(embed.timestamp)
+
+        # Game changes that leave the leaderboard alone keep the embed
+        game_logic.set_last_streak_milestone(10)
+        game_logic.touch_user(1)
+        self.assertIs(commands.get_leaderboard_embed(), embed)
+
+        self._count(2, 2)
+        updated = commands.get_leaderboard_embed()
+        self.assertIsNot(updated, embed)
+        self.assertIn('user2', updated.fields[0].value)
+
+    def test_profile_embed_cached_per_user_version(self):
+        """Test a profile is rendered again when the user's stats or rank change"""
+        self._count(1, 1)
+        self._count(2, 2)
+        stats = game_logic.get_snapshot().user_stats[2]
+        embed = commands.get_profile_embed(2, stats)
+        self.assertIs(commands.get_profile_embed(2, stats), embed)
+
+        # Someone else overtaking the user changes their rank
+        self._count(3, 3)
+        self._count(1, 4)
+        self._count(3, 5)
+        self.assertEqual(game_logic.get_user_rank(2), 3)
+        self.assertIsNot(commands.get_profile_embed(2, stats), embed)
+
+        embed = commands.get_profile_embed(2, stats)
+        self._count(2, 6)
+        stats = game_logic.get_snapshot().user_stats[2]
+        self.assertIsNot(commands.get_profile_embed(2, stats), embed)
+
+
+class FakeExecutor:
+    """Records submitted calls instead of running them"""
+
+    def __init__(self):
+        self.calls = []
+
+    def submit(self, fn, *args):
+        self.calls.append(fn.__name__)
+
+
+class FakeChannel:
+    id = game_logic.DEFAULT_CHANNEL_ID
+
+
+class FakeMessage:
+    def __init__(self):
+        self.channel = FakeChannel()
+        self.mentions = []
+
+
+class CommandPersistenceTest(unittest.TestCase):
+    """Unit tests for which database writes commands cause"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        for user_id in range(1, 6):
+            game_logic.commit_answer(user_id, f'user{user_id}', [user_id], str(user_id),
+                                     {'integer'}, 'simple_integer', set())
+        self.saved = (game_logic.IS_DEV_MODE, game_logic.executor)
+        game_logic.IS_DEV_MODE = False
+        game_logic.executor = FakeExecutor()
+
+    def tearDown(self):
+        game_logic.IS_DEV_MODE, game_logic.executor = self.saved
+        game_logic.reset_game(preserve_stats=False)
+
+    def _run(self, content):
+        async def run():
+            actor = StateActor()
+            reply = Reply(FakeMessage())
+            entry = commands.find_command(content)
+            self.assertIsNotNone(entry)
+            await commands.run_command(entry, commands.CommandContext(reply.message, content, reply, actor, None))
+            await actor.stop()
+            return reply
+        return asyncio.run(run())
+
+    def test_leaderboard_never_writes(self):
+        """Test showing the leaderboard queues no database writes"""
+        for content in ('!lb', '!stats', '!leaderboard'):
+            reply = self._run(content)
+            self.assertEqual(len(reply.actions), 1)
+        self.assertEqual(game_logic.executor.calls, [])
+
+    def test_testing_writes_only_game_state(self):
+        """Test toggling testing mode writes the game state row and no user rows"""
+        self._run('!testing')
+        self.assertTrue(game_logic.get_snapshot().testing_mode)
+        self.assertEqual(game_logic.executor.calls, ['_write_game_state_to_db'])
+        self._run('!testing')
+
+
+class CommandRouterTest(unittest.TestCase):
+    """Unit tests for finding and timing commands"""
+
+    def test_find_command(self):
+        """Test commands are found by their first word, counts are not commands"""
+        self.assertEqual(commands.find_command('!LB').name, '!lb')
+        self.assertEqual(commands.find_command('!leaderboard').name, '!lb')
+        self.assertEqual(commands.find_command('!who 12').name, '!who')
+        self.assertEqual(commands.find_command('!profile @someone').name, '!profile')
+        self.assertIsNone(commands.find_command('!whoever'))
+        self.assertIsNone(commands.find_command('42'))
+        self.assertIsNone(commands.find_command('!5'))
+
+    def test_metrics_count_latency_and_errors(self):
+        """Test every run is timed and failures are counted as errors"""
+        ticks = iter([0.0, 0.5, 1.0, 3.0])
+        metrics = Metrics(clock=lambda: next(ticks))
+        with metrics.time('!ok'):
+            pass
+        with self.assertRaises(ValueError):
+            with metrics.time('!ok'):
+                raise ValueError
+
+        stats = metrics['!ok']
+        self.assertEqual((stats.count, stats.errors), (2, 1))
+        self.assertEqual(stats.mean, 1.25)
+        self.assertEqual(stats.max, 2.0)
+        self.assertEqual(stats.error_rate, 0.5)
+        self.assertIn('!ok: 2 calls', metrics.report())
+
+    def test_histogram_percentiles(self):
+        """Test percentiles are found within one bucket"""
+        histogram = Histogram(factor=1.1)
+        self.assertEqual(histogram.percentile(99), 0.0)
+        for value in range(1, 101):
+            histogram.record(value / 1000)
+        self.assertEqual((histogram.count, histogram.max), (100, 0.1))
+        self.assertAlmostEqual(histogram.mean, 0.0505)
+        for q in (50, 90, 99):
+            self.assertGreaterEqual(histogram.percentile(q), q / 1000)
+            self.assertLessEqual(histogram.percentile(q), q / 1000 * 1.1)
+        self.assertEqual(histogram.percentile(100), 0.1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
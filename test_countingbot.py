@@ -9,6 +9,8 @@ sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
 from parser import (
     parse_number_with_context,
+    parse_multiple_numbers_with_context,
+    interpret_message,
     try_parse_multilang_number,
     preprocess_expression,
     extract_first_number_from_text,
@@ -799,7 +801,72 @@ class CountingBotTest(unittest.TestCase):
             self.assertEqual(result, expected, f"'{text}' should evaluate to {expected}")
             self.assertIn('math', types)
             self.assertIn('la', languages)  # Latin for Roman numerals
-        
+    
+    def test_interpreted_message_matches_direct_parsing(self):
+        """Test that selecting from an interpreted message equals parsing with context"""
+        for text in ["5", "5 6 7", "twenty one", "five apples", "IV", "2*3", "hello", "3 5"]:
+            parsed = interpret_message(text)
+            for expected in (3, 4, 5, 6, 21):
+                numbers, types, method, _, languages, count = parsed.select(expected)
+                multiple = parse_multiple_numbers_with_context(text, expected)
+                if multiple[0]:
+                    self.assertEqual((numbers, types, method, languages, count),
+                                     (multiple[0], multiple[1], multiple[2], multiple[4], multiple[5]),
+                                     f"'{text}' with {expected}")
+                else:
+                    single = parse_number_with_context(text, expected)
+                    self.assertEqual(numbers, [single[0]] if single[0] is not None else None,
+                                     f"'{text}' with {expected}")
+                    self.assertEqual(method, single[2])
+    
+    def test_interpreted_message_reselects_for_new_expected(self):
+        """Test that a stale selection is redone for a changed next number"""
+        parsed = interpret_message("4 5")
+        self.assertEqual(parsed.select(4)[0], [4, 5])
+        self.assertEqual(parsed.select(4)[2], 'multiple_consecutive')
+        self.assertEqual(parsed.select(3)[0], [4])
+        self.assertEqual(parsed.select(3)[2], 'priority_extracted')
+        
+        parsed = interpret_message("eleven")
+        self.assertEqual(parsed.select(11)[0], [11])
+        self.assertEqual(parsed.select(12)[0], [11])
+    
+    def test_shadow_parser_records_divergences(self):
+        """Test that a shadow engine is checked against the live selection"""
+        import parser
+        from shadow import ShadowParser, ENGINES
+        texts = ["5", "5 6 7", "twenty one", "five apples", "IV", "2*3", "hello", "3 5"]
+        
+        shadow = ShadowParser('direct')
+        for text in texts:
+            shadow.observe(text, 5, interpret_message(text), 0.001)
+        shadow.close()
+        self.assertEqual((shadow.checked, shadow.diverged, shadow.failed), (len(texts), 0, 0))
+        self.assertEqual(shadow.timings['direct'].count, len(texts))
+        # interpret_message() is not run again; its time comes from the bot,
+        # the selection for the expected number is timed on top of it
+        self.assertEqual(shadow.timings['live'].count, len(texts))
+        self.assertGreater(shadow.timings['live'].total, 0.001 * len(texts))
+        
+        # The candidate evaluates expressions on its own pool
+        pools = []
+        
+        def off_by_one(text, expected):
+            pools.append(parser._evaluation_executor())
+            return [expected + 1], set(), 'fake', None, set(), 1
+        
+        shadow = ShadowParser('off_by_one', engines=dict(ENGINES, off_by_one=off_by_one))
+        shadow.observe("5", 5, interpret_message("5"))
+        shadow.observe("random(1,10)", 5, interpret_message("random(1,10)"))
+        shadow.close()
+        self.assertEqual((shadow.checked, shadow.diverged, shadow.skipped), (1, 1, 1))
+        self.assertEqual(shadow.divergences[0]['input'], "5")
+        self.assertEqual(shadow.divergences[0]['live']['numbers'], [5])
+        self.assertEqual(shadow.divergences[0]['off_by_one']['numbers'], [6])
+        self.assertIn("1 diverged", shadow.report())
+        self.assertIsNot(pools[0], parser.executor)
+        self.assertIs(parser._evaluation_executor(), parser.executor)
+
 if __name__ == '__main__':
     # Run all tests
     unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,544 @@
+"""Unit tests for the Discord Counting Bot game state management."""
+
+import unittest
+import concurrent.futures
+import contextlib
+import io
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the tests away from the database
+os.environ['ENVIRONMENT'] = 'dev'
+
+import game_logic
+from models import UserStats, HistoryRecord, achievements_to_mask
+from parser import interpret_message
+from test_history import FakeConnection
+
+
+class GameLogicTest(unittest.TestCase):
+    """Unit tests for game state snapshots and mutations"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+
+    def test_snapshot_versions(self):
+        """Test that every mutation publishes a new snapshot"""
+        before = game_logic.get_snapshot()
+        game_logic.process_correct_answer(1, 'alice', 1, '1', {'integer'}, 'simple_integer', set())
+        after = game_logic.get_snapshot()
+
+        self.assertGreater(after.version, before.version)
+        self.assertEqual(before.next_number, 1)
+        self.assertEqual(after.next_number, 2)
+        self.assertEqual(after.last_correct_user, 1)
+        self.assertEqual(after.total_correct, 1)
+
+    def test_user_records_are_copy_on_write(self):
+        """Test that published user records are replaced, not mutated"""
+        game_logic.process_correct_answer(1, 'alice', 1, '1', {'integer'}, 'simple_integer', set())
+        old_record = game_logic.get_snapshot().user_stats[1]
+
+        game_logic.process_correct_answer(1, 'alice', 2, 'two', {'text'}, 'priority_written', {'en'})
+        new_record = game_logic.get_snapshot().user_stats[1]
+
+        self.assertIsNot(old_record, new_record)
+        self.assertEqual(old_record.correct, 1)
+        self.assertEqual(new_record.correct, 2)
+        self.assertNotIn('en', old_record.achievement_keys)
+        self.assertIn('en', new_record.achievement_keys)
+
+    def test_snapshot_user_stats_read_only(self):
+        """Test that snapshots do not allow mutating user stats"""
+        snapshot = game_logic.get_snapshot()
+        with self.assertRaises(TypeError):
+            snapshot.user_stats[1] = {}
+
+    def test_snapshot_user_stats_are_live(self):
+        """Test that an old snapshot keeps its game fields but sees current user records"""
+        game_logic.process_correct_answer(1, 'alice', 1, '1', {'integer'}, 'simple_integer', set())
+        old = game_logic.get_snapshot()
+        record = old.user_stats[1]
+        game_logic.process_correct_answer(2, 'bob', 2, '2', {'integer'}, 'simple_integer', set())
+
+        self.assertEqual(old.next_number, 2)
+        self.assertIn(2, old.user_stats)
+        self.assertEqual(record.correct, 1)
+
+    def test_back_to_back_violation_timeout(self):
+        """Test that repeated back-to-back answers lead to a timeout"""
+        for expected in range(1, 5):
+            violations, timed_out = game_logic.record_back_to_back_violation(1, 'alice')
+            self.assertEqual(violations, expected)
+            self.assertFalse(timed_out)
+
+        violations, timed_out = game_logic.record_back_to_back_violation(1, 'alice')
+        self.assertEqual(violations, 5)
+        self.assertTrue(timed_out)
+        self.assertGreater(game_logic.get_snapshot().user_stats[1].timeout_until, 0)
+
+    def test_history_ring_buffer(self):
+        """Test that history keeps only the most recent compact records"""
+        capacity = game_logic.HISTORY_CAPACITY
+        for number in range(1, capacity + 6):
+            game_logic.process_correct_answer(number % 2, 'alice', number, str(number),
+                                              {'integer'}, 'simple_integer', set())
+
+        history = list(game_logic.get_history())
+        self.assertEqual(len(history), capacity)
+        self.assertEqual(history[0].number, 6)
+        self.assertEqual(history[-1].number, capacity + 5)
+        self.assertEqual(history[-1].type_keys, ['integer'])
+        self.assertEqual(history[-1].method_name, 'simple_integer')
+
+    def test_history_record_unknown_method(self):
+        """Test that unknown parse methods and empty types get safe defaults"""
+        record = HistoryRecord.create(7, 1, set(), 'something_new', 0.0)
+        self.assertEqual(record.method_name, 'unknown')
+        self.assertEqual(record.type_keys, ['integer'])
+
+    def test_wrong_answer_reset(self):
+        """Test that a wrong answer with reset restarts the count"""
+        game_logic.process_correct_answer(1, 'alice', 1, '1', {'integer'}, 'simple_integer', set())
+        self.assertTrue(game_logic.process_wrong_answer(2, 'bob', True))
+
+        snapshot = game_logic.get_snapshot()
+        self.assertEqual(snapshot.next_number, 1)
+        self.assertIsNone(snapshot.last_correct_user)
+        self.assertEqual(snapshot.user_stats[2].wrong, 1)
+
+    def test_commit_answer_outcomes(self):
+        """Test that commit_answer judges answers against the current state"""
+        args = ('12', {'integer'}, 'simple_integer', set())
+
+        outcome = game_logic.commit_answer(1, 'alice', [1, 2], *args)
+        self.assertEqual(outcome.result, 'correct')
+        self.assertEqual(outcome.expected, 1)
+        self.assertIsNone(outcome.previous_stats)
+
+        outcome = game_logic.commit_answer(1, 'alice', [3], *args)
+        self.assertEqual(outcome.result, 'back_to_back')
+        self.assertEqual(outcome.previous_stats.correct, 2)
+        self.assertEqual(game_logic.get_snapshot().next_number, 3)
+
+        outcome = game_logic.commit_answer(2, 'bob', [7], *args)
+        self.assertEqual(outcome.result, 'wrong')
+        self.assertEqual(outcome.expected, 3)
+        self.assertEqual(game_logic.get_snapshot().next_number, 1 if outcome.should_reset else 3)
+
+    def test_commit_parsed_reselects_when_stale(self):
+        """Test a message parsed against an old next number is judged on the current one"""
+        parsed = interpret_message('2 3')
+        self.assertEqual(parsed.select(game_logic.get_snapshot().next_number)[0], [2])
+
+        game_logic.commit_answer(1, 'alice', [1], '1', {'integer'}, 'simple_integer', set())
+        selection, outcome = game_logic.commit_parsed(2, 'bob', parsed, '2 3')
+        self.assertEqual(selection[0], [2, 3])
+        self.assertEqual(outcome.result, 'correct')
+        self.assertEqual(game_logic.get_snapshot().next_number, 4)
+
+        selection, outcome = game_logic.commit_parsed(1, 'alice', interpret_message('hello'), 'hello')
+        self.assertIsNone(selection[0])
+        self.assertIsNone(outcome)
+
+    def test_commit_answer_streak_milestone(self):
+        """Test that reaching a milestone is announced once"""
+        for number in range(1, 10):
+            game_logic.commit_answer(number % 2, 'p', [number], str(number), {'integer'}, 'simple_integer', set())
+        outcome = game_logic.commit_answer(0, 'p', [10], '10', {'integer'}, 'simple_integer', set())
+        self.assertIsNotNone(outcome.streak_message)
+        self.assertEqual(game_logic.get_snapshot().last_streak_milestone, 10)
+
+
+class ChannelGameTest(unittest.TestCase):
+    """Unit tests for independent per-channel games"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        self.saved = (game_logic.IS_DEV_MODE, game_logic.executor)
+
+    def tearDown(self):
+        game_logic.IS_DEV_MODE, game_logic.executor = self.saved
+        for channel_id in (101, 102):
+            game_logic.games.pop(channel_id, None)
+        game_logic.reset_game(preserve_stats=False)
+
+    def _count(self, channel_id, user_id, number):
+        return game_logic.commit_answer(user_id, f'user{user_id}', [number], str(number),
+                                        {'integer'}, 'simple_integer', set(), channel_id)
+
+    def test_channels_count_independently(self):
+        """Test each channel has its own count and history but users are shared"""
+        game_logic.activate_channel(101, None)
+        game_logic.activate_channel(102, {'next_number': 40, 'last_correct_user': None,
+                                          'total_correct': 39, 'last_streak_milestone': 0,
+                                          'testing_mode': False})
+        self.assertEqual(self._count(101, 1, 1).result, 'correct')
+        self.assertEqual(self._count(102, 1, 40).result, 'correct')
+        self.assertEqual(self._count(101, 2, 2).result, 'correct')
+
+        self.assertEqual(game_logic.get_snapshot(101).next_number, 3)
+        self.assertEqual(game_logic.get_snapshot(102).next_number, 41)
+        self.assertEqual(game_logic.find_count(40, 102).user_id, 1)
+        self.assertIsNone(game_logic.find_count(40, 101))
+        self.assertEqual(game_logic.get_snapshot(102).user_stats[1].correct, 2)
+
+        # Testing mode is per channel
+        game_logic.toggle_testing_mode(101)
+        self.assertTrue(game_logic.get_snapshot(101).testing_mode)
+        self.assertFalse(game_logic.get_snapshot(102).testing_mode)
+
+    def test_activation_keeps_a_running_game(self):
+        """Test a late activation does not replace a game that is already counting"""
+        game_logic.activate_channel(101, None)
+        self._count(101, 1, 1)
+        game_logic.activate_channel(101, None)
+        self.assertEqual(game_logic.get_snapshot(101).next_number, 2)
+        self.assertTrue(game_logic.is_channel_active(101))
+        self.assertFalse(game_logic.is_channel_active(102))
+
+    def test_game_state_written_per_channel(self):
+        """Test each channel's game state row is written with its channel id"""
+        game_logic.IS_DEV_MODE = False
+        game_logic.executor = FakeExecutor()
+        game_logic.activate_channel(101, None)
+        self._count(101, 1, 1)
+        self.assertEqual(game_logic.executor.calls[-1], ('_write_game_state_to_db', (101, {
+            'next_number': 2, 'last_correct_user': 1, 'total_correct': 1,
+            'last_streak_milestone': 0, 'testing_mode': False})))
+
+        game_logic.executor.calls.clear()
+        game_logic.save_state()
+        written = sorted(args[0] for name, args in game_logic.executor.calls
+                         if name == '_write_game_state_to_db')
+        self.assertEqual(written, sorted([game_logic.DEFAULT_CHANNEL_ID, 101]))
+
+    def test_failed_user_write_counts_are_written_again(self):
+        """Test the counts of a failed user write ride along with the next write"""
+        def connect():
+            raise ConnectionError('database went away')
+
+        game_logic.IS_DEV_MODE = False
+        game_logic.executor = FakeExecutor()
+        saved_connect, game_logic.get_db_connection = game_logic.get_db_connection, connect
+        try:
+            self._count(None, 1, 1)
+            name, args = game_logic.executor.calls[0]
+            with contextlib.redirect_stdout(io.StringIO()):
+                game_logic._write_user_stats_to_db(*args)
+        finally:
+            game_logic.get_db_connection = saved_connect
+        self._count(None, 2, 2)
+        self._count(None, 1, 3)
+        writes = [(args[0], args[2]) for name, args in game_logic.executor.calls
+                  if name == '_write_user_stats_to_db']
+        self.assertEqual(writes, [(1, [1, 0, 0]), (2, [1, 0, 0]), (1, [2, 0, 0])])
+
+        # Without further answers, save_state writes them
+        game_logic._failed_user_writes.append((2, game_logic.user_stats[2].pack(), [1, 0, 0]))
+        game_logic.executor.calls.clear()
+        game_logic.save_state()
+        self.assertEqual([args[2] for name, args in game_logic.executor.calls
+                          if name == '_write_user_stats_to_db'], [[1, 0, 0]])
+
+    def test_history_rows_carry_the_channel(self):
+        """Test accepted and rejected counts are streamed with their channel id"""
+        rows = []
+
+        class Writer:
+            def record(self, *row):
+                rows.append(row[:4])
+
+        saved, game_logic.history_writer = game_logic.history_writer, Writer()
+        try:
+            game_logic.activate_channel(101, None)
+            self._count(101, 1, 1)
+            self._count(None, 2, 5)
+        finally:
+            game_logic.history_writer = saved
+        self.assertEqual(rows, [(101, 1, 1, True), (game_logic.DEFAULT_CHANNEL_ID, 5, 2, False)])
+
+    def test_user_stats_written_as_added_counts(self):
+        """Test user writes carry each answer's counts and save_state rewrites nobody"""
+        game_logic.IS_DEV_MODE = False
+        game_logic.executor = FakeExecutor()
+        game_logic.activate_channel(101, None)
+        self._count(101, 1, 1)
+        self._count(101, 1, 2)  # Back to back
+        self._count(101, 2, 5)
+        writes = [(args[0], args[2]) for name, args in game_logic.executor.calls
+                  if name == '_write_user_stats_to_db']
+        self.assertEqual(writes, [(1, [1, 0, 0]), (1, [0, 1, 1]), (2, [0, 1, 0])])
+
+        game_logic.executor.calls.clear()
+        game_logic.save_state()
+        self.assertEqual(game_logic.executor.user_writes(), [])
+
+
+class MigrationCursor:
+    """Serves the columns and rows of a MigrationConnection and records statements"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.result = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        self.conn.statements.append(' '.join(sql.split()))
+        if 'information_schema' in sql:
+            self.result = [{'COLUMN_NAME': name, 'COLUMN_TYPE': column_type, 'IS_NULLABLE': nullable}
+                           for name, (column_type, nullable) in self.conn.columns.items()]
+        elif sql.startswith('SELECT user_id, achievements'):
+            self.result = [{'user_id': user_id, 'achievements': value} for user_id, value in self.conn.rows]
+
+    def fetchall(self):
+        return self.result
+
+    def executemany(self, sql, rows):
+        self.conn.updates.extend(rows)
+
+
+class MigrationConnection:
+    """A user_stats table with the legacy JSON achievements column"""
+
+    def __init__(self, rows, legacy='achievements'):
+        self.columns = {'user_id': ('bigint', 'NO'), 'username': ('varchar(255)', 'YES'),
+                        legacy: ('text', 'NO')}
+        self.rows = rows
+        self.statements = []
+        self.updates = []
+
+    def cursor(self):
+        return MigrationCursor(self)
+
+    def commit(self):
+        pass
+
+
+class AchievementMigrationTest(unittest.TestCase):
+    """Unit tests for moving achievements from JSON to the bitmask column"""
+
+    def _migrate(self, rows, legacy='achievements'):
+        conn = MigrationConnection(rows, legacy)
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            game_logic.migrate_achievements_column(conn)
+        return conn, output.getvalue()
+
+    def test_converts_and_keeps_legacy_column(self):
+        """Test clean rows are converted and the JSON column is renamed, not dropped"""
+        conn, _ = self._migrate([(1, '["math", "fr"]'), (2, '[]'), (3, 'null')])
+        self.assertEqual(conn.updates, [(achievements_to_mask(['math', 'fr']), 1)])
+        self.assertIn('ALTER TABLE user_stats RENAME COLUMN achievements TO achievements_legacy',
+                      conn.statements)
+        self.assertFalse(any('DROP COLUMN' in statement for statement in conn.statements))
+        # New rows leave the legacy column out, so it must not be NOT NULL
+        modify = conn.statements.index('ALTER TABLE user_stats MODIFY COLUMN achievements text NULL')
+        self.assertLess(modify, conn.statements.index(
+            'ALTER TABLE user_stats RENAME COLUMN achievements TO achievements_legacy'))
+
+    def test_unreachable_database_does_not_stop_the_start(self):
+        """Test migrate_database logs a connection error instead of raising it"""
+        def connect():
+            raise ConnectionError('database went away')
+
+        saved = (game_logic.IS_DEV_MODE, game_logic.get_db_connection)
+        game_logic.IS_DEV_MODE, game_logic.get_db_connection = False, connect
+        output = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(output):
+                game_logic.migrate_database()
+        finally:
+            game_logic.IS_DEV_MODE, game_logic.get_db_connection = saved
+        self.assertIn('Could not migrate the database', output.getvalue())
+
+    def test_adds_channel_to_count_history(self):
+        """Test count_history gets a channel column once, and only if the table exists"""
+        conn = MigrationConnection([])
+        conn.columns = {'id': ('bigint', 'NO'), 'number': ('bigint', 'NO')}
+        with contextlib.redirect_stdout(io.StringIO()):
+            game_logic.migrate_count_history_channels(conn)
+        self.assertTrue(any('ADD INDEX idx_count_history_channel_number (channel_id, number)' in statement
+                            for statement in conn.statements))
+
+        for columns in ({}, {'id': ('bigint', 'NO'), 'channel_id': ('bigint', 'NO')}):
+            conn = MigrationConnection([])
+            conn.columns = columns
+            game_logic.migrate_count_history_channels(conn)
+            self.assertEqual(len(conn.statements), 1)
+
+    def test_makes_renamed_column_nullable(self):
+        """Test a column renamed while still NOT NULL is made nullable on the next start"""
+        conn, _ = self._migrate([], legacy='achievements_legacy')
+        self.assertIn('ALTER TABLE user_stats MODIFY COLUMN achievements_legacy text NULL', conn.statements)
+        self.assertFalse(any('RENAME' in statement for statement in conn.statements))
+
+    def test_keeps_column_when_rows_are_not_understood(self):
+        """Test unknown keys and unreadable rows are logged and the column is left alone"""
+        conn, output = self._migrate([(1, '["math", "klingon"]'), (2, '{not json'), (3, '["nl"]')])
+        self.assertEqual(conn.updates, [(achievements_to_mask(['math']), 1),
+                                        (achievements_to_mask(['nl']), 3)])
+        self.assertFalse(any('RENAME' in statement or 'DROP' in statement for statement in conn.statements))
+        self.assertIn('ALTER TABLE user_stats MODIFY COLUMN achievements text NULL', conn.statements)
+        self.assertIn('User 1: unknown achievements klingon', output)
+        self.assertIn('User 2: unreadable achievements', output)
+
+
+class FakeExecutor:
+    """Records submitted calls instead of running them"""
+
+    def __init__(self):
+        self.calls = []
+        self.futures = []
+
+    def submit(self, fn, *args):
+        self.calls.append((fn.__name__, args))
+        self.futures.append(concurrent.futures.Future())
+        return self.futures[-1]
+
+    def user_writes(self):
+        return [args[0] for name, args in self.calls if name == '_write_user_stats_to_db']
+
+
+class LazyUserStatsTest(unittest.TestCase):
+    """Unit tests for on-demand user stats loading with LRU residency"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        self.saved = (game_logic.USER_CACHE_SIZE, game_logic.LEADERBOARD_SIZE,
+                      game_logic.IS_DEV_MODE, game_logic.executor)
+        game_logic.USER_CACHE_SIZE = 3
+        game_logic.LEADERBOARD_SIZE = 1
+        game_logic.IS_DEV_MODE = False
+        game_logic.executor = FakeExecutor()
+
+    def tearDown(self):
+        (game_logic.USER_CACHE_SIZE, game_logic.LEADERBOARD_SIZE,
+         game_logic.IS_DEV_MODE, game_logic.executor) = self.saved
+        game_logic.reset_game(preserve_stats=False)
+
+    def _answer(self, user_id, number):
+        game_logic.process_correct_answer(user_id, f'user{user_id}', number, str(number),
+                                          {'integer'}, 'simple_integer', set())
+
+    def test_evicts_least_recently_used_with_write_back(self):
+        """Test users beyond the cache size are written back and evicted"""
+        self._answer(1, 1)
+        self._answer(1, 2)  # User 1 leads the leaderboard and stays pinned
+        for number, user_id in enumerate([2, 3, 4, 5], 3):
+            self._answer(user_id, number)
+
+        self.assertEqual(game_logic.executor.user_writes(), [2, 3])
+        self.assertEqual(set(game_logic.user_stats), {1, 4, 5})
+        self.assertFalse(game_logic.is_user_loaded(2))
+
+        # Evicted users are read back only after their write-back
+        write = game_logic.pending_user_write(2)
+        index = next(i for i, (name, args) in enumerate(game_logic.executor.calls)
+                     if name == '_write_user_stats_to_db' and args[0] == 2)
+        self.assertIs(write, game_logic.executor.futures[index])
+        write.set_result(None)
+        self.assertIsNone(game_logic.pending_user_write(2))
+        self.assertIsNone(game_logic.find_user_by_name('user2'))
+
+        # Totals and ranks still include evicted users
+        self.assertEqual(len(game_logic.leaderboard), 5)
+        self.assertEqual(game_logic.leaderboard.total_correct, 6)
+        self.assertEqual(game_logic.get_leaderboard(1)[0][0], 1)
+
+        # Remaining changes are written by save_state
+        game_logic.save_state()
+        self.assertEqual(sorted(game_logic.executor.user_writes()[2:]), [1, 4, 5])
+
+    def test_installed_user_is_never_evicted_at_once(self):
+        """Test a fetched user stays resident even when every other user is pinned"""
+        game_logic.LEADERBOARD_SIZE = 3
+        for number, user_id in enumerate([1, 2, 3], 1):
+            self._answer(user_id, number)
+        game_logic.install_user_stats(9, UserStats('nine'))
+        self.assertTrue(game_logic.is_user_loaded(9))
+        self.assertEqual(set(game_logic.user_stats), {1, 2, 3, 9})
+
+    def test_install_fetched_user_tracks_totals(self):
+        """Test stats fetched on demand replace their share of the loaded totals"""
+        game_logic.leaderboard.add_untracked(10, 100, 20)
+        game_logic.install_user_stats(7, UserStats('seven', correct=30, wrong=5))
+
+        self.assertTrue(game_logic.is_user_loaded(7))
+        self.assertEqual(len(game_logic.leaderboard), 10)
+        self.assertEqual(game_logic.leaderboard.total_correct, 100)
+        self.assertEqual(game_logic.find_user_by_name('SEVEN'), 7)
+        # Nine players are not loaded, so nobody's rank is known
+        self.assertIsNone(game_logic.get_user_rank(7))
+
+        self._answer(7, 1)
+        self.assertEqual(game_logic.leaderboard.total_correct, 101)
+
+    def test_failed_fetch_is_not_a_missing_user(self):
+        """Test a database error is raised rather than taken for a user without stats"""
+        def connect():
+            raise ConnectionError('database went away')
+
+        saved = game_logic.get_db_connection
+        game_logic.get_db_connection = connect
+        try:
+            with self.assertRaises(ConnectionError):
+                game_logic.fetch_user_stats(9)
+            with self.assertRaises(ConnectionError):
+                game_logic.fetch_user_id_by_name('nine')
+        finally:
+            game_logic.get_db_connection = saved
+        self.assertFalse(game_logic.is_user_loaded(9))
+
+    def test_missing_users_are_remembered(self):
+        """Test users without stats are not fetched again until they count"""
+        self.assertFalse(game_logic.is_user_loaded(9))
+        game_logic.install_user_stats(9, None)
+        self.assertTrue(game_logic.is_user_loaded(9))
+        self.assertNotIn(9, game_logic.user_stats)
+
+
+class StreamUserStatsTest(unittest.TestCase):
+    """Unit tests for streaming user stats in after the game state"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        self.saved_connect = game_logic.get_db_connection
+        rows = [(uid, f'user{uid}', uid, 1, 0, 2, 0, 0, 0, 0) for uid in range(1, 6)]
+        game_logic.get_db_connection = lambda: FakeConnection(rows)
+        game_logic._loading_users = True
+
+    def tearDown(self):
+        game_logic.get_db_connection = self.saved_connect
+        game_logic._loading_users = False
+        game_logic.reset_game(preserve_stats=False)
+
+    def test_streams_chunks_and_keeps_newer_records(self):
+        """Test chunks are installed without overwriting users fetched meanwhile"""
+        self.assertFalse(game_logic.is_user_loaded(3))
+        game_logic.install_user_stats(3, UserStats('fresh', correct=50))
+
+        chunks = list(game_logic.stream_user_stats(chunk_size=2))
+        self.assertEqual([len(chunk) for chunk in chunks], [2, 2, 1])
+        for chunk in chunks:
+            game_logic.install_loaded_users(chunk)
+        self.assertFalse(game_logic.is_user_loaded(42))
+
+        game_logic.finish_user_load()
+        self.assertTrue(game_logic.is_user_loaded(42))
+        self.assertEqual(game_logic.user_stats[3].username, 'fresh')
+        self.assertEqual(game_logic.user_stats[5].best_streak, 2)
+        self.assertEqual(game_logic.get_leaderboard(1)[0][0], 3)
+        self.assertEqual(game_logic.find_user_by_name('USER4'), 4)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,159 @@
+"""Unit tests for the count history writer and history file."""
+
+import unittest
+import shutil
+import tempfile
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models import HistoryRecord
+from history import HistoryWriter, HistoryFile, HistoryFileReader
+
+
+class FakeCursor:
+    """Records executemany batches and serves rows for a FakeConnection"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.rows = list(conn.rows)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        pass
+
+    def fetchone(self):
+        return {'players': len(self.rows)}
+
+    def fetchmany(self, size):
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        return chunk
+
+    def executemany(self, sql, rows):
+        if self.conn.fail_next:
+            self.conn.fail_next -= 1
+            raise ConnectionError('database went away')
+        self.conn.batches.append(list(rows))
+
+
+class FakeConnection:
+    """Minimal stand-in for a PyMySQL connection"""
+
+    def __init__(self, rows=()):
+        self.batches = []
+        self.fail_next = 0
+        self.rows = rows
+
+    def cursor(self, cursorclass=None):
+        return FakeCursor(self)
+
+    def commit(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class HistoryWriterTest(unittest.TestCase):
+    """Unit tests for the batched count history writer"""
+
+    def test_batches_and_flushes_on_close(self):
+        """Test rows are written in multi-row batches and flushed on close"""
+        conn = FakeConnection()
+        writer = HistoryWriter(lambda: conn, batch_size=4, flush_interval=60)
+        for number in range(1, 11):
+            writer.record(7, number, 42, True, 'x' * 300, 0, 1, 1700000000.0)
+        writer.close()
+
+        rows = [row for batch in conn.batches for row in batch]
+        self.assertEqual([row[:2] for row in rows], [(7, number) for number in range(1, 11)])
+        self.assertTrue(all(len(batch) <= 4 for batch in conn.batches))
+        self.assertEqual(len(rows[0][4]), 255)
+
+    def test_retries_failed_batches(self):
+        """Test a failed batch is kept and written on the next flush"""
+        conn = FakeConnection()
+        conn.fail_next = 1
+        writer = HistoryWriter(lambda: conn, batch_size=100, flush_interval=60)
+        writer.record(7, 1, 42, True, '1', 0, 1, 1700000000.0)
+        writer.record(8, 2, 43, False, 'three', 0, 0, 1700000001.0)
+        writer.close()  # First flush fails; rows stay pending
+        self.assertEqual(conn.batches, [])
+
+        writer._flush()
+        self.assertEqual([row[:2] for row in conn.batches[0]], [(7, 1), (8, 2)])
+
+
+class HistoryFileTest(unittest.TestCase):
+    """Unit tests for the memory-mapped fixed-width history file"""
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def _append_run(self, history_file, numbers, user_id):
+        for number in numbers:
+            history_file.append(HistoryRecord.create(number, user_id, {'integer'},
+                                                     'simple_integer', 1700000000.0 + number))
+
+    def test_lookup_by_number_per_run(self):
+        """Test O(1) lookups within runs and across resets"""
+        history_file = HistoryFile(self.directory)
+        self._append_run(history_file, range(1, 51), 1)
+        self._append_run(history_file, range(1, 11), 2)  # Game reset
+
+        reader = history_file.reader()
+        self.assertEqual(reader.runs(), [(1, 50), (1, 10)])
+        self.assertEqual(reader.lookup(5).user_id, 2)
+        self.assertEqual(reader.lookup(5, run=0).user_id, 1)
+        self.assertIsNone(reader.lookup(20))
+        self.assertEqual(reader.find(20).user_id, 1)
+        self.assertEqual(reader.find(20).method_name, 'simple_integer')
+        self.assertIsNone(reader.find(51))
+
+        # New appends become visible to the same reader
+        self._append_run(history_file, [11], 3)
+        self.assertEqual(history_file.reader().lookup(11).user_id, 3)
+        history_file.close()
+
+    def test_reopen_continues_run(self):
+        """Test reopening the file continues the current run"""
+        history_file = HistoryFile(self.directory)
+        self._append_run(history_file, range(1, 6), 1)
+        history_file.close()
+
+        history_file = HistoryFile(self.directory)
+        self._append_run(history_file, range(6, 9), 1)
+        history_file.close()
+
+        reader = HistoryFileReader(self.directory)
+        self.assertEqual(reader.runs(), [(1, 8)])
+        self.assertEqual([record.number for record in reader], list(range(1, 9)))
+        reader.close()
+
+    def test_truncates_partial_record(self):
+        """Test a torn write at the end of the file is discarded"""
+        history_file = HistoryFile(self.directory)
+        self._append_run(history_file, range(1, 4), 1)
+        history_file.close()
+        with open(os.path.join(self.directory, 'counts.bin'), 'ab') as data:
+            data.write(b'\x00' * 7)
+
+        history_file = HistoryFile(self.directory)
+        self._append_run(history_file, [4], 1)
+        reader = history_file.reader()
+        self.assertEqual([record.number for record in reader.iter_run()], [1, 2, 3, 4])
+        history_file.close()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,107 @@
+"""Unit tests for the leaderboard and username indexes."""
+
+import unittest
+import random
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the tests away from the database
+os.environ['ENVIRONMENT'] = 'dev'
+
+import game_logic
+from indexes import LeaderboardIndex, UsernameIndex
+
+
+class LeaderboardIndexTest(unittest.TestCase):
+    """Unit tests for the incrementally maintained leaderboard index"""
+
+    def test_matches_full_sort(self):
+        """Test that ranks and top N match a full sort after random updates"""
+        rng = random.Random(42)
+        index = LeaderboardIndex()
+        index.BUCKET_SIZE = 4  # Force plenty of bucket splits
+        counts = {}
+
+        for _ in range(2000):
+            uid = rng.randrange(60)
+            if uid in counts and rng.random() < 0.05:
+                index.remove(uid)
+                del counts[uid]
+                continue
+            correct, wrong = counts.get(uid, (0, 0))
+            if rng.random() < 0.7:
+                correct += 1
+            else:
+                wrong += 1
+            counts[uid] = (correct, wrong)
+            index.update(uid, correct, wrong)
+
+        expected = sorted(counts, key=lambda uid: LeaderboardIndex.sort_key(uid, *counts[uid]))
+        self.assertEqual(index.top(10), expected[:10])
+        self.assertEqual(index.top(len(expected) + 5), expected)
+        for position, uid in enumerate(expected, 1):
+            self.assertEqual(index.rank(uid), position)
+
+        self.assertEqual(len(index), len(counts))
+        self.assertEqual(index.total_correct, sum(c for c, _ in counts.values()))
+        self.assertEqual(index.total_wrong, sum(w for _, w in counts.values()))
+
+    def test_game_logic_keeps_index_in_sync(self):
+        """Test that answering updates the leaderboard and totals"""
+        game_logic.reset_game(preserve_stats=False)
+        game_logic.process_correct_answer(1, 'alice', 1, '1', {'integer'}, 'simple_integer', set())
+        game_logic.process_correct_answer(2, 'bob', 2, '2', {'integer'}, 'simple_integer', set())
+        game_logic.process_correct_answer(2, 'bob', 3, '3', {'integer'}, 'simple_integer', set())
+        game_logic.process_wrong_answer(1, 'alice', False)
+
+        self.assertEqual([uid for uid, _ in game_logic.get_leaderboard(10)], [2, 1])
+        self.assertEqual(game_logic.get_user_rank(1), 2)
+        self.assertEqual(game_logic.leaderboard.total_attempts, 4)
+        self.assertEqual(game_logic.leaderboard.total_correct, 3)
+
+
+class UsernameIndexTest(unittest.TestCase):
+    """Unit tests for the case-insensitive username index"""
+
+    def test_lookup_rename_and_duplicates(self):
+        """Test lookups follow renames and keep users sharing a name"""
+        index = UsernameIndex()
+        index.update(1, 'Alice')
+        index.update(2, 'alice')
+        index.update(3, 'Bob')
+        self.assertEqual(index.lookup('ALICE'), {1, 2})
+
+        index.update(1, 'Alicia')
+        self.assertEqual(index.lookup('alice'), {2})
+        self.assertEqual(index.lookup('alicia'), {1})
+
+        index.remove(2)
+        self.assertEqual(index.lookup('alice'), set())
+        self.assertEqual(len(index), 2)
+
+    def test_prefix_search(self):
+        """Test prefix search returns matching names in order"""
+        index = UsernameIndex()
+        for uid, name in enumerate(['Charlie', 'carol', 'Bob', 'Carl', 'dave']):
+            index.update(uid, name)
+        self.assertEqual(index.search_prefix('Car'), ['carl', 'carol'])
+        self.assertEqual(index.search_prefix('c', limit=2), ['carl', 'carol'])
+        self.assertEqual(index.search_prefix('zed'), [])
+
+    def test_game_logic_profile_lookup(self):
+        """Test finding users by their latest name through game_logic"""
+        game_logic.reset_game(preserve_stats=False)
+        game_logic.process_correct_answer(1, 'Alice', 1, '1', {'integer'}, 'simple_integer', set())
+        game_logic.process_correct_answer(2, 'Alfred', 2, '2', {'integer'}, 'simple_integer', set())
+        game_logic.process_correct_answer(1, 'Alicia', 3, '3', {'integer'}, 'simple_integer', set())
+
+        self.assertIsNone(game_logic.find_user_by_name('alice'))
+        self.assertEqual(game_logic.find_user_by_name('ALICIA'), 1)
+        self.assertEqual(game_logic.suggest_usernames('al'), ['Alfred', 'Alicia'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
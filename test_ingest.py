@@ -0,0 +1,94 @@
+"""Unit tests for the ordered ingest queues."""
+
+import unittest
+import asyncio
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from ingest import Ingest, IngestQueue
+from test_output import FakeChannel, FakeMessage
+
+
+class IngestQueueTest(unittest.TestCase):
+    """Unit tests for the per-channel ordered ingest queues"""
+
+    def _queue(self, log, **options):
+        preparing = set()
+        most = [0]
+
+        async def prepare(message):
+            preparing.add(message)
+            most[0] = max(most[0], len(preparing))
+            # Later messages finish preparing first
+            await asyncio.sleep(0.001 * (10 - int(message.content)))
+            preparing.discard(message)
+            if message.content == '3':
+                raise ValueError('broken')
+            return message.content
+
+        async def commit(message, prepared):
+            log.append(prepared)
+
+        return IngestQueue(prepare, commit, **options), most
+
+    def test_commits_in_arrival_order_with_bounded_concurrency(self):
+        """Test messages prepared concurrently are still committed in order"""
+        log = []
+
+        async def scenario():
+            queue, most = self._queue(log, concurrency=3)
+            for number in range(1, 8):
+                self.assertTrue(queue.offer(FakeMessage(log, content=str(number))))
+            await queue.drain()
+            return queue, most[0]
+
+        queue, most = asyncio.run(scenario())
+        self.assertEqual(log, ['1', '2', '4', '5', '6', '7'])  # 3 failed and was skipped
+        self.assertEqual(most, 3)
+        self.assertEqual((queue.accepted, queue.wait.count, queue.depth()), (7, 7, 0))
+
+    def test_sheds_chatter_before_counts(self):
+        """Test chatter is shed at its lower limit and everything at the full limit"""
+        log = []
+
+        async def scenario():
+            queue, _ = self._queue(log, limit=4, chatter_limit=2, concurrency=1,
+                                   is_chatter=lambda message: message.content == '9')
+            offered = [queue.offer(FakeMessage(log, content=content))
+                       for content in ['1', '2', '9', '4', '5', '9', '6']]
+            await queue.drain()
+            return queue, offered
+
+        queue, offered = asyncio.run(scenario())
+        self.assertEqual(offered, [True, True, False, True, True, False, False])
+        self.assertEqual(log, ['1', '2', '4', '5'])
+        self.assertEqual((queue.shed, queue.max_depth), (3, 4))
+
+    def test_channels_have_separate_queues(self):
+        """Test each channel gets its own queue"""
+        log = []
+
+        async def prepare(message):
+            return message.content
+
+        async def commit(message, prepared):
+            log.append((message.channel.id, prepared))
+
+        async def scenario():
+            ingest = Ingest(prepare, commit, limit=1)
+            first, second = FakeChannel(log, channel_id=1), FakeChannel(log, channel_id=2)
+            self.assertTrue(ingest.offer(FakeMessage(log, first, content='a')))
+            self.assertTrue(ingest.offer(FakeMessage(log, second, content='b')))
+            await ingest.drain()
+            return ingest
+
+        ingest = asyncio.run(scenario())
+        self.assertEqual(sorted(log), [(1, 'a'), (2, 'b')])
+        self.assertIn('channel 2: depth 0 (max 1), 1 accepted, 0 shed', ingest.report())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
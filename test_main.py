@@ -0,0 +1,104 @@
+"""Unit tests for the shard supervisor."""
+
+import unittest
+import contextlib
+import io
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import main
+
+
+class FakeProcess:
+    """Stands in for a worker process; alive until it exits or is terminated"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.alive = False
+        self.exitcode = None
+
+    def start(self):
+        self.alive = True
+
+    def is_alive(self):
+        return self.alive
+
+    def terminate(self):
+        self.alive = False
+        self.exitcode = -15
+
+
+class FakeContext:
+    """Creates FakeProcesses with increasing pids"""
+
+    def __init__(self):
+        self.processes = []
+
+    def Process(self, target, args, name):
+        self.processes.append(FakeProcess(len(self.processes) + 1))
+        return self.processes[-1]
+
+
+class SupervisorTest(unittest.TestCase):
+    """Unit tests for the shard supervisor's health checks and restarts"""
+
+    def setUp(self):
+        self.context = FakeContext()
+        self.worker = main.Worker(0)
+        self.enterContext(contextlib.redirect_stdout(io.StringIO()))
+        self._start(0)
+
+    def _start(self, now):
+        self.worker.start(self.context, 1, None, None)
+        self.worker.started = now
+
+    def test_terminates_silent_workers(self):
+        """Test a worker is stopped once it reports nothing for too long"""
+        process = self.worker.process
+        self.assertFalse(self.worker.check(main.STARTUP_TIMEOUT - 1))
+        self.assertTrue(process.is_alive())
+        self.worker.report({'shard': 0}, main.STARTUP_TIMEOUT - 1)
+
+        # Once it reported, the shorter heartbeat timeout applies
+        self.assertFalse(self.worker.check(main.STARTUP_TIMEOUT + main.HEARTBEAT_TIMEOUT - 2))
+        self.assertTrue(process.is_alive())
+        self.assertFalse(self.worker.check(main.STARTUP_TIMEOUT + main.HEARTBEAT_TIMEOUT))
+        self.assertFalse(process.is_alive())
+
+        # Terminated, it is restarted like a worker that exited
+        self.assertFalse(self.worker.check(1000))
+        self.assertTrue(self.worker.check(1000 + main.RESTART_DELAY))
+
+    def test_terminates_workers_that_never_start(self):
+        """Test a worker that never reports is stopped after the startup timeout"""
+        self.assertFalse(self.worker.check(main.STARTUP_TIMEOUT + 1))
+        self.assertFalse(self.worker.process.is_alive())
+
+    def test_restart_backoff(self):
+        """Test restarts wait longer after every crash, up to a limit, until a report"""
+        now = 0
+        delays = []
+        for _ in range(9):
+            self.worker.process.alive = False
+            now += 1
+            self.assertFalse(self.worker.check(now))
+            restart_at = self.worker.restart_at
+            self.assertFalse(self.worker.check(restart_at - 0.5))
+            self.assertTrue(self.worker.check(restart_at))
+            delays.append(restart_at - now)
+            now = restart_at
+            self._start(now)
+        self.assertEqual(delays, [5, 10, 20, 40, 80, 160, 300, 300, 300])
+        self.assertEqual(len(self.context.processes), 10)
+
+        self.worker.report({'shard': 0}, now)
+        self.worker.process.alive = False
+        self.assertFalse(self.worker.check(now + 1))
+        self.assertEqual(self.worker.restart_at, now + 1 + main.RESTART_DELAY)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,67 @@
+"""Unit tests for the compact user stats and history records."""
+
+import unittest
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from models import (UserStats, achievements_to_mask, mask_to_achievements, achievement_emojis)
+from constants import ACHIEVEMENT_BIT_POSITIONS, ACHIEVEMENT_EMOJIS
+
+
+class UserStatsTest(unittest.TestCase):
+    """Unit tests for the compact UserStats record"""
+
+    def test_achievement_mask_round_trip(self):
+        """Test converting achievement keys to a bitmask and back"""
+        mask = achievements_to_mask(['math', 'nl', 'polyglot', 'integer', 'unknown'])
+        self.assertEqual(sorted(mask_to_achievements(mask)), ['integer', 'math', 'nl', 'polyglot'])
+        self.assertEqual(achievements_to_mask([]), 0)
+
+    def test_bit_positions_are_stable_and_complete(self):
+        """Test every achievement has a unique bit that fits in a signed BIGINT"""
+        self.assertTrue(set(ACHIEVEMENT_EMOJIS) <= set(ACHIEVEMENT_BIT_POSITIONS))
+        positions = list(ACHIEVEMENT_BIT_POSITIONS.values())
+        self.assertEqual(len(positions), len(set(positions)))
+        self.assertTrue(all(0 <= bit < 63 for bit in positions))
+        # Persisted values must never move
+        self.assertEqual(ACHIEVEMENT_BIT_POSITIONS['en'], 0)
+        self.assertEqual(ACHIEVEMENT_BIT_POSITIONS['polyglot'], 18)
+
+    def test_achievement_emoji_rendering(self):
+        """Test rendering a mask as emojis in alphabetical key order"""
+        mask = achievements_to_mask(['sqrt', 'fr', 'integer'])
+        expected = ' '.join([ACHIEVEMENT_EMOJIS['fr'], ACHIEVEMENT_EMOJIS['sqrt']])
+        self.assertEqual(achievement_emojis(mask), expected)
+        self.assertIs(achievement_emojis(mask), achievement_emojis(mask))
+        self.assertEqual(achievement_emojis(achievements_to_mask(['integer'])), '')
+
+    def test_from_row_and_pack(self):
+        """Test building stats from a database row and packing them for writes"""
+        row = {
+            'username': 'alice', 'correct': 5, 'wrong': 2, 'streak': 3, 'best_streak': 4,
+            'achievement_bits': achievements_to_mask(['math', 'fr']), 'consecutive_wrong': 0,
+            'back_to_back_violations': 1, 'timeout_until': 0,
+        }
+        stats = UserStats.from_row(row)
+        self.assertEqual(stats.correct, 5)
+        self.assertEqual(sorted(stats.achievement_keys), ['fr', 'math'])
+
+        packed = stats.pack()
+        self.assertEqual(packed[0], 'alice')
+        self.assertEqual(UserStats(*packed).pack(), packed)
+
+        clone = stats.copy()
+        clone.correct += 1
+        self.assertEqual(stats.correct, 5)
+
+    def test_no_instance_dict(self):
+        """Test that UserStats uses slots rather than a per-instance dict"""
+        with self.assertRaises(AttributeError):
+            UserStats('alice').extra = 1
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
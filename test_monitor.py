@@ -0,0 +1,44 @@
+"""Unit tests for the event loop lag monitor."""
+
+import unittest
+import asyncio
+import contextlib
+import io
+import time
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from monitor import LoopMonitor
+
+
+class LoopMonitorTest(unittest.TestCase):
+    """Unit tests for the event loop lag monitor"""
+
+    def test_captures_blocking_call(self):
+        """Test a blocked loop is measured and caught with the blocking call's stack"""
+        monitor = LoopMonitor(interval=0.01, threshold=0.05)
+
+        def block_the_loop():
+            time.sleep(0.3)
+
+        async def run():
+            monitor.start()
+            await asyncio.sleep(0.05)
+            block_the_loop()
+            await asyncio.sleep(0.05)
+            monitor.stop()
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            asyncio.run(run())
+        self.assertGreaterEqual(monitor.slow, 1)
+        self.assertGreaterEqual(monitor.lag.max, 0.2)
+        self.assertEqual(len(monitor.stalls), 1)
+        self.assertIn('block_the_loop', monitor.stalls[0].stack)
+        self.assertIn('latest stall', monitor.report())
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,172 @@
+"""Unit tests for the reply output stage, reactions and rate limiting."""
+
+import unittest
+import asyncio
+import time
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from output import Reply, OutputStage, ReactionDispatcher, TokenBucket, coalesce, MAX_MESSAGE_LENGTH
+
+
+class FakeChannel:
+    """Records messages sent through it, taking delay seconds per call"""
+
+    def __init__(self, log, delay=0, channel_id=1):
+        self.log = log
+        self.delay = delay
+        self.id = channel_id
+
+    async def send(self, content=None, embed=None):
+        await asyncio.sleep(self.delay)
+        self.log.append(('send', content))
+
+
+class FakeMessage:
+    """Records reactions added to it"""
+
+    def __init__(self, log, channel=None, fail_emoji=None, delay=0, content=''):
+        self.log = log
+        self.channel = channel if channel is not None else FakeChannel(log)
+        self.content = content
+        self.fail_emoji = fail_emoji
+        self.delay = delay
+
+    async def add_reaction(self, emoji):
+        await asyncio.sleep(self.delay)
+        if emoji == self.fail_emoji:
+            raise RuntimeError('Unknown Emoji')
+        self.log.append(('react', emoji))
+
+
+class OutputStageTest(unittest.TestCase):
+    """Unit tests for the ordered reply output stage"""
+
+    def test_delivers_replies_in_emit_order(self):
+        """Test replies are delivered in order and failures do not stop the stage"""
+        log = []
+
+        async def scenario():
+            stage = OutputStage()
+            slow = FakeMessage(log, FakeChannel(log, delay=0.01), fail_emoji='🤯')
+            fast = FakeMessage(log, FakeChannel(log))
+            stage.emit(Reply(slow).react('🤯').react('✅').send('first'))
+            stage.emit(Reply(fast))  # Empty, dropped
+            stage.emit(Reply(fast).send('second'))
+            self.assertEqual(stage.pending(), 2)
+            await stage.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual([entry for entry in log if entry[0] == 'send'],
+                         [('send', 'first'), ('send', 'second')])
+        self.assertIn(('react', '✅'), log)
+        self.assertNotIn(('react', '🤯'), log)
+
+    def test_slow_channel_does_not_block_others(self):
+        """Test each channel's replies are delivered by their own task"""
+        log = []
+
+        async def scenario():
+            stage = OutputStage()
+            slow = FakeChannel(log, delay=0.05, channel_id=1)
+            fast = FakeChannel(log, channel_id=2)
+            stage.emit(Reply(FakeMessage(log, slow)).send('slow 1'))
+            stage.emit(Reply(FakeMessage(log, slow)).send('slow 2'))
+            stage.emit(Reply(FakeMessage(log, fast)).send('fast'))
+            self.assertEqual(stage.pending(), 3)
+            await stage.stop()
+
+        asyncio.run(scenario())
+        self.assertEqual(log, [('send', 'fast'), ('send', 'slow 1'), ('send', 'slow 2')])
+
+    def test_coalesces_announcements(self):
+        """Test a reply's messages, and with a window several replies', become one send"""
+        log = []
+
+        async def scenario():
+            channel = FakeChannel(log)
+            stage = OutputStage(coalesce_window=0.01)
+            stage.emit(Reply(FakeMessage(log, channel)).react('✅').send('🎲 rolls').send('🗣️ POLYGLOT!'))
+            stage.emit(Reply(FakeMessage(log, channel)).send('🎉 streak'))
+            await stage.stop()
+            return stage
+
+        stage = asyncio.run(scenario())
+        self.assertEqual([entry for entry in log if entry[0] == 'send'],
+                         [('send', '🎲 rolls\n🗣️ POLYGLOT!\n🎉 streak')])
+        self.assertEqual((stage.sent, stage.coalesced), (1, 2))
+
+    def test_coalesce_limits(self):
+        """Test merging respects the message length and keeps embeds in place"""
+        embed, other = object(), object()
+        self.assertEqual(coalesce([('a', None), (None, embed), ('b', None)]),
+                         [('a', embed), ('b', None)])
+        self.assertEqual(coalesce([(None, embed), (None, other)]), [(None, embed), (None, other)])
+        long_text = 'x' * (MAX_MESSAGE_LENGTH - 1)
+        self.assertEqual(coalesce([(long_text, None), ('y', None)]), [(long_text, None), ('y', None)])
+
+
+class TokenBucketTest(unittest.TestCase):
+    """Unit tests for the token bucket rate limiter"""
+
+    def test_refills_at_rate(self):
+        """Test tokens are spent in bursts and refill over time"""
+        now = [0.0]
+        bucket = TokenBucket(rate=4, capacity=2, clock=lambda: now[0])
+        self.assertTrue(bucket.try_take())
+        self.assertTrue(bucket.try_take())
+        self.assertFalse(bucket.try_take())
+        self.assertAlmostEqual(bucket.wait_time(), 0.25)
+
+        now[0] = 0.25
+        self.assertTrue(bucket.try_take())
+        now[0] = 10.0
+        self.assertTrue(bucket.try_take())
+        self.assertTrue(bucket.try_take())
+        self.assertFalse(bucket.try_take())
+
+
+class ReactionDispatcherTest(unittest.TestCase):
+    """Unit tests for the rate limited reaction dispatcher"""
+
+    def test_pipelines_within_rate_limit(self):
+        """Test reactions overlap in flight but start no faster than the rate"""
+        log = []
+
+        async def scenario():
+            dispatcher = ReactionDispatcher(rate=100, burst=1, pipeline=4)
+            message = FakeMessage(log, FakeChannel(log), delay=0.05)
+            started = time.monotonic()
+            dispatcher.dispatch(message, [('✅', False), ('🇳🇱', True), ('✅', False), ('🔢', True)])
+            await dispatcher.drain()
+            return dispatcher, time.monotonic() - started
+
+        dispatcher, elapsed = asyncio.run(scenario())
+        self.assertEqual(log, [('react', '✅'), ('react', '🇳🇱'), ('react', '🔢')])
+        self.assertEqual(dispatcher.sent, 3)
+        # Three 50 ms requests one after another would take 150 ms
+        self.assertLess(elapsed, 0.12)
+        self.assertGreaterEqual(elapsed, 0.02 + 0.05)
+
+    def test_drops_cosmetic_reactions_under_load(self):
+        """Test cosmetic reactions are dropped once a channel is backed up"""
+        log = []
+
+        async def scenario():
+            dispatcher = ReactionDispatcher(rate=1000, cosmetic_backlog=2)
+            message = FakeMessage(log, FakeChannel(log))
+            dispatcher.dispatch(message, [('✅', False), ('🅰️', False), ('🇳🇱', True), ('❌', False)])
+            self.assertEqual(dispatcher.backlog(), 3)
+            await dispatcher.drain()
+            return dispatcher
+
+        dispatcher = asyncio.run(scenario())
+        self.assertEqual(dispatcher.dropped, 1)
+        self.assertEqual([emoji for _, emoji in log], ['✅', '🅰️', '❌'])
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
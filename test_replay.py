@@ -0,0 +1,111 @@
+"""Unit tests for replaying channel logs."""
+
+import unittest
+import json
+import shutil
+import subprocess
+import tempfile
+import time
+import sys
+import os
+
+# Add the current directory to the path so we can import our modules
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Keep the tests away from the database
+os.environ['ENVIRONMENT'] = 'dev'
+
+import game_logic
+import replay
+from parser import interpret_message
+from commands import find_command
+from utils import check_user_timeout
+
+
+class ReplayTest(unittest.TestCase):
+    """Unit tests for replaying a channel log"""
+
+    def setUp(self):
+        game_logic.reset_game(preserve_stats=False)
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+        game_logic.reset_game(preserve_stats=False)
+
+    def test_judges_like_on_message(self):
+        """Test a log is judged in order, with commands skipped and log timestamps"""
+        path = os.path.join(self.directory, 'log.jsonl')
+        lines = [{'author': 'ann', 'content': '1', 'timestamp': 100.0},
+                 {'author': 'bob', 'content': '1 + 1', 'timestamp': 101.0},
+                 {'author': 'bob', 'content': '3', 'timestamp': 102.0},
+                 {'author': 'ann', 'content': '!lb', 'timestamp': 103.0},
+                 {'author': 'ann', 'content': 'hello', 'timestamp': 104.0}]
+        with open(path, 'w') as log:
+            log.write('\n'.join(json.dumps(line) for line in lines))
+
+        entries = list(replay.read_channel_log(path))
+        self.assertEqual([entry.author_id for entry in entries], [1, 2, 2, 1, 1])
+        verdicts = self._judge(entries)
+
+        self.assertEqual([verdict['verdict'] for verdict in verdicts],
+                         ['correct', 'correct', 'back_to_back', 'command', 'ignored'])
+        self.assertEqual(verdicts[1]['numbers'], [2])
+        self.assertEqual(next(game_logic.get_history()).timestamp, 100.0)
+        state = replay.final_state(game_logic)
+        self.assertEqual(state['channels'][str(game_logic.DEFAULT_CHANNEL_ID)]['next_number'], 3)
+        self.assertEqual(state['users']['2']['wrong'], 1)
+
+    def test_iso_timestamps_drive_timeouts(self):
+        """Test ISO 8601 timestamps are read and timeouts follow them, commands included"""
+        path = os.path.join(self.directory, 'log.jsonl')
+        times = ['2024-05-01T12:00:00Z', '2024-05-01T12:00:01+00:00', '2024-05-01T14:00:02+02:00',
+                 '2024-05-01T12:00:03', '1714564804', 1714564805.5,
+                 '2024-05-01T12:00:10Z', '2024-05-01T12:00:11Z', '2024-05-01T12:00:40Z']
+        contents = ['1', '2', '2', '2', '2', '2', '!lb', '2', '2']
+        with open(path, 'w') as log:
+            log.write('\n'.join(json.dumps({'author': 'ann', 'content': content, 'timestamp': timestamp})
+                                for content, timestamp in zip(contents, times)))
+
+        entries = list(replay.read_channel_log(path))
+        self.assertEqual([entry.timestamp for entry in entries],
+                         [1714564800.0, 1714564801.0, 1714564802.0, 1714564803.0, 1714564804.0,
+                          1714564805.5, 1714564810.0, 1714564811.0, 1714564840.0])
+        verdicts = self._judge(entries)
+
+        # The fifth back-to-back answer times ann out for 30 seconds of log time
+        self.assertEqual([verdict['verdict'] for verdict in verdicts],
+                         ['correct'] + ['back_to_back'] * 5 + ['timeout', 'timeout', 'back_to_back'])
+        # ... and every further one for 30 seconds from its own timestamp
+        self.assertEqual(game_logic.user_stats[1].timeout_until, 1714564840.0 + 30)
+        self.assertIs(game_logic.clock, time.time)
+
+    def _judge(self, entries):
+        verdicts = []
+        with replay.ReplayClock().installed(game_logic) as clock:
+            for entry in entries:
+                clock.now = entry.timestamp
+                verdicts.append(replay.judge(entry, game_logic, interpret_message, find_command,
+                                             check_user_timeout))
+        return verdicts
+
+
+    def test_command_line_ignores_storage_settings_from_dotenv(self):
+        """Test a replay neither appends to the history file nor loads users lazily as .env says"""
+        history_dir = os.path.join(self.directory, 'history')
+        with open(os.path.join(self.directory, '.env'), 'w') as env:
+            env.write(f"HISTORY_FILE_DIR={history_dir}\nUSER_CACHE_SIZE=100\n")
+        with open(os.path.join(self.directory, 'log.jsonl'), 'w') as log:
+            log.write(json.dumps({'author': 'ann', 'content': '1', 'timestamp': 100.0}))
+
+        environment = {key: value for key, value in os.environ.items()
+                       if key not in ('ENVIRONMENT', 'HISTORY_FILE_DIR', 'USER_CACHE_SIZE')}
+        result = subprocess.run([sys.executable, replay.__file__, 'log.jsonl'], cwd=self.directory,
+                                env=environment, capture_output=True, text=True, timeout=60)
+        self.assertEqual(result.returncode, 0, result.stderr)
+        self.assertIn('1 correct', result.stdout)
+        self.assertFalse(os.path.exists(history_dir))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
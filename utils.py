@@ -12,13 +12,13 @@ def get_mistake_severity(user_stats):
     if not user_stats:
         return 'gentle'
     
-    total = user_stats['correct'] + user_stats['wrong']
-    consecutive_wrong = user_stats.get('consecutive_wrong', 0)
+    total = user_stats.correct + user_stats.wrong
+    consecutive_wrong = user_stats.consecutive_wrong
     
     if total == 0:
         return 'gentle'
     
-    accuracy = user_stats['correct'] / total
+    accuracy = user_stats.correct / total
     
     if consecutive_wrong >= 5 or (consecutive_wrong >= 3 and accuracy < 0.3):
         return 'brutal'
@@ -43,21 +43,23 @@ def get_streak_message(total, last_milestone):
     return None, last_milestone
 
 
-def check_user_timeout(user_stats):
-    """Check if a user is in timeout."""
+def check_user_timeout(user_stats, now=None):
+    """Check if a user is in timeout (at now, by default the current time)."""
     if not user_stats:
         return False, 0
     
-    timeout_until = user_stats.get('timeout_until', 0)
-    if timeout_until > time.time():
-        return True, int(timeout_until - time.time())
+    if now is None:
+        now = time.time()
+    timeout_until = user_stats.timeout_until
+    if timeout_until > now:
+        return True, int(timeout_until - now)
     
     return False, 0
 
 
-def apply_timeout(user_stats, seconds):
-    """Apply a timeout to a user."""
-    user_stats['timeout_until'] = time.time() + seconds
+def apply_timeout(user_stats, seconds, now=None):
+    """Apply a timeout to a user, starting at now (by default the current time)."""
+    user_stats.timeout_until = (time.time() if now is None else now) + seconds
     return user_stats
 
 